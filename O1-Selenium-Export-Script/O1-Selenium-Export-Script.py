@@ -1,15 +1,36 @@
+import argparse
+import base64
+import collections
+import contextlib
+import functools
+import hashlib
+import heapq
+import html
+import inspect
 import json
 import logging
 import os
 import pickle
+import queue
+import re
+import shutil
+import sqlite3
 import sys
+import tempfile
+import threading
 import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from os import environ as env
-from zipfile import ZipFile
+from urllib.parse import parse_qsl, urlencode, urlparse, urlsplit, urlunsplit
+from zipfile import BadZipFile, ZipFile
 
 import colorlog
+import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
@@ -23,9 +44,12 @@ from selenium.common.exceptions import (
 )
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.remote.remote_connection import LOGGER
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
+from urllib3.util.retry import Retry
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
@@ -49,11 +73,62 @@ MENU_WAIT_TIME = 10  # menu wait time in sec
 DEFAULT_WEBDRIVER_WAIT_TIME = 30  # default wait time in sec for webdriver
 SHORT_WEBDRIVER_WAIT_TIME = 15  # short wait time in seconds for webdriver
 REFRESH_WAIT_TIME = 5  # refresh wait time in sec
+# wait time in sec for the archived container after the table rows rendered,
+# cut short once the form toolbar is rendered if its xpath is set
+ARCHIVED_WAIT_TIME = float(env.get("ARCHIVED_WAIT_TIME", 1))
+# floor delay in sec before checking a ui condition, replaces fixed delays
+UI_FLOOR_DELAY = float(env.get("UI_FLOOR_DELAY", 0.1))
+# time saved by waiting for ui conditions instead of fixed delays
+WAIT_STATS = {"lock": threading.Lock(), "waits": 0, "saved": 0.0}
 MAX_RETRY = 3  # max number of retries for export
+# default number of forms per table page, used when no page size can be found
+PAGE_SIZE = int(env.get("PAGE_SIZE", 25))
+# max number of forms per table page to switch to, 0 for the largest offered
+MAX_PAGE_SIZE = int(env.get("MAX_PAGE_SIZE", 0))
+# query parameters of the forms table url holding the page number and page size,
+# set them to jump straight to a page by url instead of clicking page items
+PAGE_URL_PARAM = env.get("PAGE_URL_PARAM", "")
+PAGE_SIZE_URL_PARAM = env.get("PAGE_SIZE_URL_PARAM", "")
+# number of threads post-processing completed downloads, 0 to do it inline
+POSTPROCESS_WORKERS = int(env.get("POSTPROCESS_WORKERS", 2))
+# max number of completed downloads waiting to be post-processed
+POSTPROCESS_QUEUE_SIZE = int(env.get("POSTPROCESS_QUEUE_SIZE", 8))
+# number of threads extracting members of a downloaded zip file
+EXTRACT_WORKERS = int(env.get("EXTRACT_WORKERS", min(8, os.cpu_count() or 1)))
+# number of processes checking exported files with --verify
+VERIFY_WORKERS = int(env.get("VERIFY_WORKERS", os.cpu_count() or 1))
+# max time in sec for a download to complete
+DOWNLOAD_TIMEOUT = int(env.get("DOWNLOAD_TIMEOUT", 1200))
+# max time in sec for a download to start after clicking export, the web app
+# builds the zip of a big export before it starts, so defaults to the total
+DOWNLOAD_START_TIMEOUT = int(env.get("DOWNLOAD_START_TIMEOUT", DOWNLOAD_TIMEOUT))
+# max time in sec without any bytes received before a download is stalled
+DOWNLOAD_STALL_TIMEOUT = int(env.get("DOWNLOAD_STALL_TIMEOUT", 60))
+# interval in sec between checks of the session cookies expiry while exporting
+SESSION_CHECK_INTERVAL = int(env.get("SESSION_CHECK_INTERVAL", 60))
+# refresh the session when its cookies expire within this many sec, 0 to turn off
+SESSION_REFRESH_MARGIN = int(env.get("SESSION_REFRESH_MARGIN", 600))
+# cookies not part of the login session, e.g. short lived analytics cookies
+IGNORED_COOKIES = ("_gat_gtag_UA_17568443_1",)
+# learned timeouts (--adaptive-timeouts): timeout is the p99 of the observed
+# times of an operation times this factor, from at least min samples, kept
+# between min timeout and max scale times the fixed timeout
+ADAPTIVE_TIMEOUT_FACTOR = float(env.get("ADAPTIVE_TIMEOUT_FACTOR", 3))
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(env.get("ADAPTIVE_TIMEOUT_MIN_SAMPLES", 20))
+ADAPTIVE_TIMEOUT_MIN = float(env.get("ADAPTIVE_TIMEOUT_MIN", 5))
+ADAPTIVE_TIMEOUT_MAX_SCALE = float(env.get("ADAPTIVE_TIMEOUT_MAX_SCALE", 4))
+# number of latest samples kept per operation
+ADAPTIVE_TIMEOUT_SAMPLES = 500
 # Build absolute path to output folder in current directory
 OUTPUT_PATH = os.path.join(os.getcwd(), env.get("OUTPUT_DIR_NAME"))
 # Build absolute path to temp download folder in current directory
 TEMP_OUTPUT_PATH = os.path.join(OUTPUT_PATH, env.get("TEMP_DIR_NAME"))
+# Build content store and run snapshots folder paths, inside the output
+# folder as hard links only work within a drive
+CONTENT_STORE_DIR = os.path.join(
+    OUTPUT_PATH, env.get("CONTENT_STORE_DIR_NAME", "_Content_Store")
+)
+SNAPSHOT_DIR = os.path.join(OUTPUT_PATH, env.get("SNAPSHOT_DIR_NAME", "_Snapshots"))
 # Build export log directory path
 EXPORT_LOG_DIR = os.path.join(os.getcwd(), env.get("EXPORT_LOG_DIR_NAME"))
 # Build export log messages file for skipped/failed downloads path
@@ -62,8 +137,25 @@ export_log_file = "{}_{}".format(
     time.strftime("%d-%m-%Y_%H-%M-%S", time.localtime()), env.get("EXPORT_LOG_NAME")
 )
 EXPORT_LOG_FILE = os.path.join(EXPORT_LOG_DIR, export_log_file)
+# Build export state database path, kept between runs for --resume
+EXPORT_STATE_FILE = os.path.join(
+    EXPORT_LOG_DIR, env.get("EXPORT_STATE_NAME", "export_state.db")
+)
 # global EXPORT_LOG dict object
 EXPORT_LOG = {}
+# lock for EXPORT_LOG, shared between export workers
+EXPORT_LOG_LOCK = threading.Lock()
+# pages of each form type handed off to download or post-process and not
+# recorded yet, and if all of its pages are handed off
+PENDING_PAGES = {}
+# number of pages of each project failed after being handed off
+FAILED_PAGES = {}
+# number of browser sessions exporting projects in parallel
+WORKERS = int(env.get("WORKERS", 1))
+# per thread worker context (e.g. download folder of the worker's browser)
+WORKER = threading.local()
+# dev mode, if true, will not run in headless mode
+DEV_MODE = env.get("dev_mode").lower() == "true"
 
 #   CREDENTIALS  #
 USERNAME = env.get("O1_email")
@@ -74,10 +166,64 @@ BENTLEY_LOGIN_URL = env.get("BENTLEY_LOGIN_URL")
 ALL_SYNCHRO_URL = env.get("ALL_SYNCHRO_URL")
 PROJ_URL_PLACEHOLDER = env.get("PROJ_URL_PLACEHOLDER")
 
+#   HTTP ENGINE   #
+# backend api of the web app, used by the http export engine
+# no default, --engine http only calls a base url set explicitly
+API_BASE_URL = env.get("API_BASE_URL")
+API_PROJECT_PATH = env.get("API_PROJECT_PATH", "/api/projects/{project_id}")
+API_FORM_TYPES_PATH = env.get(
+    "API_FORM_TYPES_PATH", "/api/projects/{project_id}/form-types"
+)
+API_FORMS_PATH = env.get(
+    "API_FORMS_PATH", "/api/projects/{project_id}/form-types/{form_type_id}/forms"
+)
+API_EXPORT_EXCEL_PATH = env.get(
+    "API_EXPORT_EXCEL_PATH",
+    "/api/projects/{project_id}/form-types/{form_type_id}/export/excel",
+)
+API_EXPORT_PDF_PATH = env.get(
+    "API_EXPORT_PDF_PATH",
+    "/api/projects/{project_id}/form-types/{form_type_id}/export/pdf",
+)
+# number of concurrent requests of the http export engine
+HTTP_WORKERS = int(env.get("HTTP_WORKERS", 4))
+# number of forms exported to pdf per request
+HTTP_PDF_BATCH_SIZE = int(env.get("HTTP_PDF_BATCH_SIZE", 25))
+# remote debugging port of the warm browser daemon that export runs attach to
+DAEMON_PORT = int(env.get("DAEMON_PORT", 9222))
+# chrome profile folder of the browser daemon, keeps its logged in session
+DAEMON_PROFILE_DIR = os.path.join(
+    os.getcwd(), env.get("DAEMON_PROFILE_DIR_NAME", "Chrome_Daemon_Profile")
+)
+# interval in sec the browser daemon checks that chrome is still running
+DAEMON_CHECK_INTERVAL = 30
+# url patterns blocked by the lean browser profile, comma separated
+LEAN_BLOCKED_URLS = env.get(
+    "LEAN_BLOCKED_URLS",
+    "*google-analytics.com*,*googletagmanager.com*,*.png,*.jpg,*.jpeg,*.gif,"
+    "*.webp,*.ico,*.woff,*.woff2,*.ttf,*.otf,*.mp4,*.webm",
+)
+# number of top time sinks listed in the trace summary at the end of a run
+TRACE_TOP = int(env.get("TRACE_TOP", 10))
+# number of times each project page is loaded per profile by --benchmark-lean
+BENCHMARK_RUNS = int(env.get("BENCHMARK_RUNS", 3))
+# time in sec the project index found by discovery is used before crawling again
+DISCOVERY_TTL = float(env.get("DISCOVERY_TTL_HOURS", 24)) * 3600
+# local port of the live metrics and status endpoint, 0 to turn it off
+METRICS_PORT = int(env.get("METRICS_PORT", 0))
+# interval in sec between status lines logged while the metrics are on
+METRICS_LOG_INTERVAL = int(env.get("METRICS_LOG_INTERVAL", 300))
+# window in sec over which forms per minute and the eta are measured
+METRICS_RATE_WINDOW = 900
+
 
 #   Selenium webdriver options  #
-def get_options(dev=False):
+def get_options(dev=False, download_dir=TEMP_OUTPUT_PATH, daemon=False):
     options = webdriver.ChromeOptions()
+    if daemon is True:
+        # let export runs attach to the browser, keep the session in a profile
+        options.add_argument("--remote-debugging-port={}".format(DAEMON_PORT))
+        options.add_argument("--user-data-dir={}".format(DAEMON_PROFILE_DIR))
     # run in headless mode if dev is False, else run foreground mode
     if dev is False:
         options.add_argument("--headless")
@@ -113,7 +259,7 @@ def get_options(dev=False):
     options.add_experimental_option(
         "prefs",
         {
-            "download.default_directory": TEMP_OUTPUT_PATH,
+            "download.default_directory": download_dir,
             "profile.default_content_settings.popups": 0,
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
@@ -121,14 +267,22 @@ def get_options(dev=False):
     )
     options.add_experimental_option("excludeSwitches", ["enable-logging"])
     options.add_argument("--log-level=3")
+    if DOWNLOAD_POOL.enabled:
+        # network events to capture download urls from
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if LEAN_PROFILE.enabled:
+        LEAN_PROFILE.add_options(options)
     return options
 
 
-# Get chrome webdriver options
-if env.get("dev_mode").lower() == "true":
-    OPTIONS = get_options(dev=True)
-else:
-    OPTIONS = get_options()
+def get_attach_options():
+    """Options to attach to the running browser daemon"""
+    options = webdriver.ChromeOptions()
+    options.debugger_address = "127.0.0.1:{}".format(DAEMON_PORT)
+    if DOWNLOAD_POOL.enabled:
+        # network events to capture download urls from
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
 
 
 #   Custom Exceptions   #
@@ -174,6 +328,40 @@ class ProjectUrlsFileNotFoundError(CustomException):
         super().__init__(message)
 
 
+class PagesFailedError(CustomException):
+    "Raised when exported pages failed to download or process in the background"
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class ApiResponseError(CustomException):
+    "Raised when an api response is not what the http export engine expects"
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class FormState(Enum):
+    "State of a form type page"
+
+    ACTIVE = "active"  # form type has forms
+    ARCHIVED = "archived"  # form type is archived and has forms
+    EMPTY = "empty"  # form type has no forms
+    UNKNOWN = "unknown"  # form type page could not be opened
+
+
+class DownloadStart(Enum):
+    "Download not handed off to the download pool"
+
+    IN_BROWSER = "in browser"  # generated in the page, left to the browser
+    NOT_STARTED = "not started"  # no download started before the timeout
+
+
+# Form types in the nav bar that are not exported
+IGNORED_FORM_TYPES = ("My work", "Work by items")
+
+
 # All Selenium Exceptions to catch
 SELENIUM_ERROR = (
     TimeoutException,
@@ -194,72 +382,2898 @@ IGNORED_EXCEPTIONS = (
 # All Exceptions Classes
 ALL_ERRORS = SELENIUM_ERROR + (Exception, OSError)
 
-# Get xpaths and css selectors for elements
-table_rows = env.get("table_row")
-table_row_title = env.get("table_row_title")
-three_dots = env.get("three_dots")
-export_to_pdf = env.get("export_to_pdf")
-tippy_box = env.get("tippy_box")
-archive_export_pdf = env.get("archive_export_pdf")
-select_all_box = env.get("select_all_box")
-export_btn_xpath = env.get("export_btn_xpath")
-archive_export_excel = env.get("archive_export_excel")
-export_excel = env.get("export_excel")
-total_forms_item = env.get("total_forms_item")
-table_rows = env.get("table_rows")
-page_item = env.get("page_item")
-active_page_item = env.get("active_page_item")
-next_page_item = env.get("next_page_item")
-export_modal = env.get("export_modal")
-checkboxes_xpath_dict = {
-    "Comments": env.get("comments_box"),
-    "Audit trail": env.get("audit_trail_box"),
-    "Images": env.get("images_box"),
-    "Export attachments": env.get("export_attachments_box"),
-}
+# Get xpaths and css selectors for elements
+table_rows = env.get("table_row")
+table_row_title = env.get("table_row_title")
+three_dots = env.get("three_dots")
+export_to_pdf = env.get("export_to_pdf")
+tippy_box = env.get("tippy_box")
+archive_export_pdf = env.get("archive_export_pdf")
+select_all_box = env.get("select_all_box")
+export_btn_xpath = env.get("export_btn_xpath")
+archive_export_excel = env.get("archive_export_excel")
+export_excel = env.get("export_excel")
+total_forms_item = env.get("total_forms_item")
+table_rows = env.get("table_rows")
+# all rows in table body, table_rows only points to the first row
+table_body_rows = env.get("table_body_rows", table_rows.rsplit("[", 1)[0])
+row_checkbox = env.get("row_checkbox", "./td[1]/label/input")
+page_item = env.get("page_item")
+active_page_item = env.get("active_page_item")
+next_page_item = env.get("next_page_item")
+page_size_btn = env.get(
+    "page_size_btn", "//div[contains(@class, 'btn-hc-pagination-page-size')]//button"
+)
+page_size_option = env.get(
+    "page_size_option", "//*[contains(@id, 'tippy')]//li[contains(., 'per page')]"
+)
+export_modal = env.get("export_modal")
+empty_container = env.get("empty_container")
+archived_container = env.get("archived_container")
+# element rendered together with the archived container, e.g. the toolbar
+form_toolbar = env.get("form_toolbar")
+all_proj_div = env.get("all_proj_div")
+project_link = env.get("project_link", "//a[contains(@href, '/home')]")
+checkboxes_xpath_dict = {
+    "Comments": env.get("comments_box"),
+    "Audit trail": env.get("audit_trail_box"),
+    "Images": env.get("images_box"),
+    "Export attachments": env.get("export_attachments_box"),
+}
+# xpaths of the elements read by the page state script
+PAGE_STATE_XPATHS = {
+    "rows": table_body_rows,
+    "active_page": active_page_item,
+    "page_item": page_item,
+    "total_forms": total_forms_item,
+    "select_all": select_all_box,
+    "archived": archived_container,
+    "empty": empty_container,
+    "toolbar": form_toolbar,
+    "checkboxes": checkboxes_xpath_dict,
+}
+# reads the state of the page in a single webdriver round trip
+PAGE_STATE_SCRIPT = """
+const xpaths = arguments[0];
+const withRows = arguments[1];
+function find(xpath) {
+    return xpath ? document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue : null;
+}
+function findAll(xpath) {
+    const nodes = [];
+    if (!xpath) return nodes;
+    const result = document.evaluate(
+        xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+    return nodes;
+}
+function text(node) {
+    return node ? node.innerText.trim() : null;
+}
+const rows = findAll(xpaths.rows);
+const selectAll = find(xpaths.select_all);
+const checkboxes = {};
+for (const [name, xpath] of Object.entries(xpaths.checkboxes)) {
+    const checkbox = find(xpath);
+    checkboxes[name] = checkbox ? checkbox.checked : null;
+}
+const project = document.querySelector(".description-text");
+return {
+    row_count: rows.length,
+    row_texts: withRows ? rows.map(row => row.innerText) : null,
+    active_page: text(find(xpaths.active_page)),
+    page_items: findAll(xpaths.page_item).map(item => [text(item), item]),
+    total_forms: text(find(xpaths.total_forms)),
+    select_all: selectAll ? selectAll.checked : null,
+    checkboxes: checkboxes,
+    archived: find(xpaths.archived) !== null,
+    empty: find(xpaths.empty) !== null,
+    toolbar: find(xpaths.toolbar) !== null,
+    project_name: project ? project.getAttribute("title") : null,
+};
+"""
+# reads the url and title of the page, to tell if the session lapsed
+SESSION_STATE_SCRIPT = "return [location.href, document.title];"
+# reads the url and text of the project links and scrolls to the last one, so
+# lazy loaded lists load their next projects
+PROJECT_LINKS_SCRIPT = """
+const result = document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+const links = [];
+for (let i = 0; i < result.snapshotLength; i++) {
+    const link = result.snapshotItem(i);
+    links.push([link.href, link.innerText.trim()]);
+}
+if (links.length) result.snapshotItem(links.length - 1).scrollIntoView();
+return links;
+"""
+# ticks the checkboxes not ticked yet, returns names of the ones not found
+CHECK_CHECKBOXES_SCRIPT = """
+const missing = [];
+for (const [name, xpath] of Object.entries(arguments[0])) {
+    const checkbox = document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    if (!checkbox) {
+        missing.push(name);
+    } else if (!checkbox.checked) {
+        checkbox.click();
+    }
+}
+return missing;
+"""
+# clicks the checkbox of each row index, returns the clicked checkboxes
+CLICK_ROWS_SCRIPT = """
+const [rowsXpath, checkboxXpath, rowIndexes] = arguments;
+const rows = document.evaluate(
+    rowsXpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+const clicked = [];
+for (const rowIndex of rowIndexes) {
+    const row = rows.snapshotItem(rowIndex);
+    const checkbox = row && document.evaluate(
+        checkboxXpath, row, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    if (checkbox) {
+        checkbox.click();
+        clicked.push(checkbox);
+    }
+}
+return clicked;
+"""
+
+
+class Tracer:
+    """
+    Records a span for each traced step and each webdriver command, tagged
+    with project, form type and page, written as jsonl or a chrome trace
+    """
+
+    # arguments of traced functions recorded as span tags
+    TAGS = ("project_url", "proj_name", "form_type", "page")
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        self.events = []
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.start_time = time.time()
+        self.original_execute = None
+
+    def start(self, trace_file):
+        """Start tracing and profiling webdriver commands"""
+        self.enabled = True
+        self.trace_file = trace_file
+        self.start_time = time.time()
+        if self.original_execute is None:
+            # time every command sent to chromedriver
+            self.original_execute = WebDriver.execute
+            tracer = self
+
+            def execute(driver, driver_command, params=None):
+                with tracer.span(
+                    driver_command, cat="webdriver", caller=tracer.find_caller()
+                ):
+                    return tracer.original_execute(driver, driver_command, params)
+
+            WebDriver.execute = execute
+
+    def stop(self):
+        """Stop tracing, write the trace file and log the top time sinks"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self.original_execute is not None:
+            WebDriver.execute = self.original_execute
+            self.original_execute = None
+        self.write()
+        self.summary()
+
+    @staticmethod
+    def find_caller():
+        """Name of the function in this script that issued the command"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == __file__ and not code.co_name.startswith("_"):
+                if code.co_name not in ("execute", "wrapper", "span"):
+                    return code.co_name
+            frame = frame.f_back
+        return "unknown"
+
+    @contextlib.contextmanager
+    def span(self, name, cat="step", **tags):
+        """Record the time spent in the with block as a span"""
+        if not self.enabled:
+            yield
+            return
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        # child spans inherit the tags of their parent span
+        if stack:
+            tags = dict(stack[-1]["tags"], **tags)
+        entry = {"tags": tags, "child_time": 0.0}
+        stack.append(entry)
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            stack.pop()
+            if stack:
+                stack[-1]["child_time"] += duration
+            self.record(name, cat, start_time, duration, entry)
+
+    def record(self, name, cat, start_time, duration, entry):
+        """Add span event and add its time to the stats"""
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": int((start_time - self.start_time) * 1e6),
+            "dur": int(duration * 1e6),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "thread": thread.name,
+            "args": {key: str(value) for key, value in entry["tags"].items()},
+        }
+        if cat == "webdriver":
+            key = (cat, "{} @ {}".format(name, entry["tags"].get("caller")))
+        else:
+            key = (cat, name)
+        with self.lock:
+            self.events.append(event)
+            stats = self.stats.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] += duration - entry["child_time"]
+
+    def write(self):
+        """Write spans to the trace file, chrome trace if it ends with .json"""
+        if not self.trace_file:
+            return
+        with self.lock:
+            events = list(self.events)
+        with open(self.trace_file, "w") as f:
+            if self.trace_file.endswith(".json"):
+                # load in chrome://tracing or https://ui.perfetto.dev
+                threads = {(event["tid"], event["thread"]) for event in events}
+                metadata = [
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": os.getpid(),
+                        "tid": tid,
+                        "args": {"name": thread_name},
+                    }
+                    for tid, thread_name in threads
+                ]
+                json.dump({"traceEvents": metadata + events}, f)
+            else:
+                for event in events:
+                    f.write(json.dumps(event) + "\n")
+        LOG.info("Trace: {} Spans written to {}".format(len(events), self.trace_file))
+
+    def summary(self, top=TRACE_TOP):
+        """Log the top steps and webdriver commands by total time"""
+        with self.lock:
+            stats = dict(self.stats)
+        for cat, title in (("step", "Steps"), ("webdriver", "WebDriver Commands")):
+            rows = sorted(
+                ((name, stat) for (c, name), stat in stats.items() if c == cat),
+                key=lambda row: row[1][1],
+                reverse=True,
+            )[:top]
+            if not rows:
+                continue
+            LOG.info("Trace: Top {} {} | Calls | Total | Self".format(len(rows), title))
+            for name, (count, total, self_time) in rows:
+                LOG.info(
+                    "{} | {} | {:.1f}s | {:.1f}s".format(name, count, total, self_time)
+                )
+
+
+# Tracer of steps and webdriver commands, enabled with --trace
+TRACER = Tracer()
+
+
+def traced(func):
+    """Decorator recording a span for each call of func when tracing"""
+    signature = inspect.signature(func)
+    tag_names = [name for name in Tracer.TAGS if name in signature.parameters]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not TRACER.enabled:
+            return func(*args, **kwargs)
+        tags = {}
+        if tag_names:
+            bound = signature.bind_partial(*args, **kwargs)
+            tags = {
+                name: bound.arguments[name]
+                for name in tag_names
+                if name in bound.arguments
+            }
+        with TRACER.span(func.__qualname__, **tags):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class Metrics:
+    """
+    Live progress of the run, served in prometheus text format on /metrics,
+    as a status page on / and as json on /status.json
+    """
+
+    # counters, name: help
+    COUNTERS = {
+        "projects_done": "Projects exported",
+        "projects_failed": "Projects failed after max retries",
+        "form_types_done": "Form types exported without errors",
+        "pages_done": "PDF pages downloaded and processed",
+        "forms_exported": "Forms exported to pdf",
+        "forms_skipped": "Forms already exported in a previous run or unchanged",
+        "bytes_downloaded": "Bytes of export files downloaded",
+        "retries": "Retries by step",
+    }
+
+    def __init__(self):
+        self.enabled = False
+        self.server = None
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.counters = collections.Counter()
+        self.projects_total = 0
+        self.form_totals = {}
+        self.workers = {}
+        self.queues = {}
+        # exported forms with their time, for forms per minute
+        self.samples = collections.deque()
+
+    def start(self, port=METRICS_PORT):
+        """
+        Serve the metrics on localhost and log a status line periodically
+
+        Raises:
+            OSError: OSError when the port can't be bound, e.g. in use
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                snapshot = metrics.snapshot()
+                if path == "/metrics":
+                    body = metrics.render_prometheus(snapshot)
+                    content_type = "text/plain; version=0.0.4"
+                elif path == "/status.json":
+                    body = json.dumps(snapshot, indent=4)
+                    content_type = "application/json"
+                elif path == "/":
+                    body = metrics.render_status(snapshot)
+                    content_type = "text/html"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.enabled = True
+        self.start_time = time.time()
+        self.add_queue("postprocess", POSTPROCESS.queue.qsize)
+        self.add_queue("downloads", DOWNLOAD_POOL.pending)
+        threading.Thread(
+            target=self.server.serve_forever, name="Metrics", daemon=True
+        ).start()
+        threading.Thread(target=self.run, name="Metrics-Log", daemon=True).start()
+        LOG.info(
+            "Metrics: http://127.0.0.1:{0}/metrics | "
+            "Status: http://127.0.0.1:{0}/".format(self.server.server_port)
+        )
+
+    def stop(self):
+        """Stop serving the metrics and log the final status"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        LOG.info("Status: {}".format(self.status_line(self.snapshot())))
+
+    def run(self):
+        """Log a status line every METRICS_LOG_INTERVAL seconds"""
+        while self.enabled:
+            time.sleep(METRICS_LOG_INTERVAL)
+            if self.enabled:
+                LOG.info("Status: {}".format(self.status_line(self.snapshot())))
+
+    def inc(self, name, value=1, step=None):
+        """Add value to the counter, by step for retries"""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self.lock:
+            self.counters[(name, step)] += value
+            if name == "forms_exported":
+                self.samples.append((now, value))
+
+    def set_projects_total(self, projects_total):
+        """Set number of projects to be exported in this run"""
+        with self.lock:
+            self.projects_total = projects_total
+
+    def set_form_total(self, proj_name, form_type, total_forms):
+        """Set number of forms of a form type, the eta is based on them"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.form_totals[(proj_name, form_type)] = total_forms
+
+    def set_status(self, **status):
+        """Update what the current thread's worker is exporting"""
+        if not self.enabled:
+            return
+        with self.lock:
+            worker = self.workers.setdefault(threading.current_thread().name, {})
+            worker.update(status, updated=time.time())
+
+    def add_queue(self, name, depth):
+        """Report the depth of a queue, depth is called on each scrape"""
+        with self.lock:
+            self.queues[name] = depth
+
+    def snapshot(self):
+        """Current values of all metrics"""
+        now = time.time()
+        with self.lock:
+            while self.samples and self.samples[0][0] < now - METRICS_RATE_WINDOW:
+                self.samples.popleft()
+            window = min(METRICS_RATE_WINDOW, now - self.start_time)
+            recent_forms = sum(forms for _, forms in self.samples)
+            counters = {name: 0 for name in self.COUNTERS if name != "retries"}
+            retries = {}
+            for (name, step), value in self.counters.items():
+                if name == "retries":
+                    retries[step] = value
+                else:
+                    counters[name] = value
+            form_totals = dict(self.form_totals)
+            projects_total = self.projects_total
+            workers = {
+                name: dict(worker, idle=now - worker["updated"])
+                for name, worker in self.workers.items()
+            }
+            queues = dict(self.queues)
+        forms_per_minute = recent_forms / window * 60 if window > 0 else 0.0
+        forms_total = sum(form_totals.values())
+        forms_left = max(
+            0, forms_total - counters["forms_exported"] - counters["forms_skipped"]
+        )
+        # projects not reached yet are expected to be as big as the ones seen
+        projects_seen = len({proj_name for proj_name, _ in form_totals})
+        if projects_seen and projects_total > projects_seen:
+            forms_left += forms_total / projects_seen * (projects_total - projects_seen)
+        eta = forms_left / forms_per_minute * 60 if forms_per_minute else None
+        return dict(
+            counters,
+            uptime=now - self.start_time,
+            projects_total=projects_total,
+            forms_total=forms_total,
+            forms_per_minute=forms_per_minute,
+            eta=eta,
+            retries=retries,
+            queues={name: depth() for name, depth in queues.items()},
+            workers=workers,
+        )
+
+    @staticmethod
+    def format_duration(seconds):
+        """Format seconds as 1d02h03m, or ? if unknown"""
+        if seconds is None:
+            return "?"
+        minutes, _ = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        days, hours = divmod(hours, 24)
+        if days:
+            return "{}d{:02d}h{:02d}m".format(days, hours, minutes)
+        return "{}h{:02d}m".format(hours, minutes)
+
+    def status_line(self, snapshot):
+        """Compact one line status of the run"""
+        return (
+            "Projects: {}/{} | Form Types: {} | Pages: {} | Forms: {}/{} | "
+            "{:.1f} Forms/min | {:.1f} MB | Retries: {} | ETA: {}".format(
+                snapshot["projects_done"] + snapshot["projects_failed"],
+                snapshot["projects_total"],
+                snapshot["form_types_done"],
+                snapshot["pages_done"],
+                snapshot["forms_exported"] + snapshot["forms_skipped"],
+                snapshot["forms_total"],
+                snapshot["forms_per_minute"],
+                snapshot["bytes_downloaded"] / 1024**2,
+                sum(snapshot["retries"].values()),
+                self.format_duration(snapshot["eta"]),
+            )
+        )
+
+    def render_status(self, snapshot):
+        """Status page, refreshes itself every few seconds"""
+        lines = [self.status_line(snapshot).replace(" | ", "\n"), ""]
+        lines.append(
+            "Queues: "
+            + " | ".join(
+                "{}: {}".format(name, depth)
+                for name, depth in snapshot["queues"].items()
+            )
+        )
+        if snapshot["retries"]:
+            lines.append(
+                "Retries: "
+                + " | ".join(
+                    "{}: {}".format(step, count)
+                    for step, count in sorted(snapshot["retries"].items())
+                )
+            )
+        lines.append("")
+        for name, worker in sorted(snapshot["workers"].items()):
+            lines.append(
+                "{} | {} | {} | Page: {} | {:.0f}s ago".format(
+                    name,
+                    worker.get("project", ""),
+                    worker.get("form_type", ""),
+                    worker.get("page", ""),
+                    worker["idle"],
+                )
+            )
+        return (
+            '<html><head><meta http-equiv="refresh" content="5">'
+            "<title>O1 Export</title></head><body><pre>{}</pre></body></html>".format(
+                html.escape("\n".join(lines))
+            )
+        )
+
+    def render_prometheus(self, snapshot):
+        """Metrics in prometheus text exposition format"""
+        lines = []
+
+        def add(name, metric_type, help_text, samples):
+            name = "o1_export_" + name
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            for labels, value in samples:
+                label_text = ",".join(
+                    '{}="{}"'.format(
+                        key,
+                        str(label)
+                        .replace("\\", "\\\\")
+                        .replace('"', '\\"')
+                        .replace("\n", "\\n"),
+                    )
+                    for key, label in labels.items()
+                )
+                lines.append(
+                    "{}{} {}".format(
+                        name, "{" + label_text + "}" if label_text else "", value
+                    )
+                )
+
+        for name, help_text in self.COUNTERS.items():
+            if name == "retries":
+                samples = [
+                    ({"step": step}, count)
+                    for step, count in sorted(snapshot["retries"].items())
+                ]
+            else:
+                samples = [({}, snapshot[name])]
+            add(name + "_total", "counter", help_text, samples)
+        add(
+            "projects",
+            "gauge",
+            "Projects to export",
+            [({}, snapshot["projects_total"])],
+        )
+        add(
+            "forms",
+            "gauge",
+            "Forms in the form types seen so far",
+            [({}, snapshot["forms_total"])],
+        )
+        add(
+            "forms_per_minute",
+            "gauge",
+            "Forms exported per minute over the last {}s".format(METRICS_RATE_WINDOW),
+            [({}, "{:.2f}".format(snapshot["forms_per_minute"]))],
+        )
+        add(
+            "eta_seconds",
+            "gauge",
+            "Estimated seconds until all projects are exported",
+            [({}, "NaN" if snapshot["eta"] is None else int(snapshot["eta"]))],
+        )
+        add(
+            "queue_depth",
+            "gauge",
+            "Items waiting in queue",
+            [({"queue": name}, depth) for name, depth in snapshot["queues"].items()],
+        )
+        add(
+            "worker_page",
+            "gauge",
+            "Page the worker is exporting",
+            [
+                (
+                    {
+                        "worker": name,
+                        "project": worker.get("project", ""),
+                        "form_type": worker.get("form_type", ""),
+                    },
+                    worker.get("page", 0),
+                )
+                for name, worker in sorted(snapshot["workers"].items())
+            ],
+        )
+        add(
+            "worker_idle_seconds",
+            "gauge",
+            "Seconds since the worker's status last changed",
+            [
+                ({"worker": name}, int(worker["idle"]))
+                for name, worker in sorted(snapshot["workers"].items())
+            ],
+        )
+        add(
+            "uptime_seconds",
+            "gauge",
+            "Seconds since the run started",
+            [({}, int(snapshot["uptime"]))],
+        )
+        return "\n".join(lines) + "\n"
+
+
+# Live metrics and status of the run, served with --metrics-port
+METRICS = Metrics()
+
+
+class AdaptiveTimeouts:
+    """
+    Learns the time each wait and download takes from the times observed in
+    this and past runs, and derives its timeout from them
+    """
+
+    def __init__(self):
+        # use learned timeouts, times are observed and saved either way
+        self.enabled = False
+        self.samples = {}
+        # fixed timeout each operation was last called with
+        self.defaults = {}
+        # operations that timed out at their learned timeout, back on their
+        # fixed timeout for the rest of the run
+        self.fallbacks = set()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Load the times observed in past runs from the export state"""
+        with self.lock:
+            for operation, samples in STATE_STORE.get_latencies().items():
+                self.samples[operation] = collections.deque(
+                    samples, maxlen=ADAPTIVE_TIMEOUT_SAMPLES
+                )
+
+    def save(self):
+        """Save the observed times to the export state for later runs"""
+        with self.lock:
+            samples = {
+                operation: list(operation_samples)
+                for operation, operation_samples in self.samples.items()
+            }
+        STATE_STORE.set_latencies(samples)
+
+    def observe(self, operation, seconds):
+        """Record the time in sec an operation took"""
+        with self.lock:
+            if operation not in self.samples:
+                self.samples[operation] = collections.deque(
+                    maxlen=ADAPTIVE_TIMEOUT_SAMPLES
+                )
+            self.samples[operation].append(round(seconds, 3))
+
+    def percentile(self, operation, pct=99):
+        """Nearest rank percentile of the observed times, None if too few"""
+        with self.lock:
+            samples = sorted(self.samples.get(operation, ()))
+        if len(samples) < ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return None
+        return samples[max(0, -(-pct * len(samples) // 100) - 1)]
+
+    def learned(self, seconds, default):
+        """Timeout for an operation taking up to seconds, kept within bounds"""
+        return min(
+            max(seconds * ADAPTIVE_TIMEOUT_FACTOR, ADAPTIVE_TIMEOUT_MIN),
+            default * ADAPTIVE_TIMEOUT_MAX_SCALE,
+        )
+
+    def timeout(self, operation, default):
+        """Learned timeout of the operation, default until enough samples"""
+        with self.lock:
+            self.defaults[operation] = default
+        if not self.enabled or operation in self.fallbacks:
+            return default
+        p99 = self.percentile(operation)
+        if p99 is None:
+            return default
+        return self.learned(p99, default)
+
+    def timed_out(self, operation, timeout):
+        """
+        A wait of the operation timed out, its time is not a time the wait
+        takes so it isn't recorded. If it timed out at a learned timeout
+        below the fixed one, the fixed timeout is used for the rest of the run
+        """
+        with self.lock:
+            default = self.defaults.get(operation)
+            if default is None or timeout >= default or operation in self.fallbacks:
+                return
+            self.fallbacks.add(operation)
+        LOG.warning(
+            "Timeout: {} | Timed Out at Learned {:.0f}s, Using Fixed {}s".format(
+                operation, timeout, default
+            )
+        )
+
+    def download_timeouts(self, kind, form_type, forms):
+        """
+        Learned total and start timeouts of an excel or pdf download of forms,
+        both scaled by the number of forms, the web app builds the export
+        before it starts. The time per form is that of the form type, or of
+        all form types if it has too few samples
+
+        Args:
+            kind (str): excel or pdf
+            form_type (str): form type name
+            forms (int): number of forms exported
+
+        Returns:
+            tuple: total timeout and start timeout in sec
+        """
+        if not self.enabled:
+            return DOWNLOAD_TIMEOUT, DOWNLOAD_START_TIMEOUT
+        forms = max(1, forms)
+        start_per_form = self.percentile("{}_download_start_per_form".format(kind))
+        if start_per_form is None:
+            start_timeout = DOWNLOAD_START_TIMEOUT
+        else:
+            start_timeout = self.learned(start_per_form * forms, DOWNLOAD_START_TIMEOUT)
+        per_form = self.percentile(
+            "{}_download_per_form:{}".format(kind, form_type)
+        ) or self.percentile("{}_download_per_form".format(kind))
+        if per_form is None:
+            return DOWNLOAD_TIMEOUT, start_timeout
+        timeout = self.learned(
+            ((start_per_form or 0) + per_form) * forms, DOWNLOAD_TIMEOUT
+        )
+        return timeout, start_timeout
+
+    def observe_download(self, kind, form_type, forms, start, total):
+        """Record the start time and time per form of a completed download"""
+        if start is not None:
+            self.observe(
+                "{}_download_start_per_form".format(kind), start / max(1, forms)
+            )
+        per_form = (total - (start or 0)) / max(1, forms)
+        self.observe("{}_download_per_form".format(kind), per_form)
+        self.observe("{}_download_per_form:{}".format(kind, form_type), per_form)
+
+    def summary(self):
+        """Log the learned timeout of each wait next to its fixed timeout"""
+        for operation, default in sorted(self.defaults.items()):
+            p99 = self.percentile(operation)
+            if p99 is None:
+                continue
+            LOG.info(
+                "Timeout: {} | p99: {:.1f}s | Learned: {:.0f}s | Fixed: {}s".format(
+                    operation, p99, self.learned(p99, default), default
+                )
+            )
+
+
+# Learned timeouts, used with --adaptive-timeouts
+TIMEOUTS = AdaptiveTimeouts()
+
+
+class LearnedWait(WebDriverWait):
+    """
+    WebDriverWait timing each wait, named after the function and line the
+    wait is made from unless given, with the wait's learned timeout. Waits
+    expected to time out or waiting on the user are made with learn=False
+    and keep their fixed timeout.
+    """
+
+    def __init__(self, driver, timeout, operation=None, learn=True, **kwargs):
+        super().__init__(driver, timeout, **kwargs)
+        self.operation = operation
+        self.default_timeout = timeout
+        self.learn = learn
+
+    def until(self, method, message=""):
+        if not self.learn:
+            return super().until(method, message)
+        operation = self.operation or self.call_site()
+        self._timeout = TIMEOUTS.timeout(operation, self.default_timeout)
+        start_time = time.time()
+        try:
+            result = super().until(method, message)
+        except TimeoutException:
+            TIMEOUTS.timed_out(operation, self._timeout)
+            raise
+        TIMEOUTS.observe(operation, time.time() - start_time)
+        return result
+
+    @staticmethod
+    def call_site():
+        """Function and line in this script the wait is made from"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == __file__ and not code.co_name.startswith("_"):
+                if code.co_name not in ("until", "wait_for_ui", "wrapper"):
+                    return "{}:{}".format(code.co_name, frame.f_lineno)
+            frame = frame.f_back
+        return "unknown"
+
+
+# Extensions of the temp files chrome writes to while downloading
+TEMP_DOWNLOAD_EXTENSIONS = (".crdownload", ".tmp")
+
+
+# Define a custom event HANDLER tracking the downloads of all exports
+class DownloadTracker(FileSystemEventHandler):
+    "Tracks the downloads of all exports with a single long-lived observer"
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.observer = None
+        self.downloads = {}
+        self.lock = threading.RLock()
+
+    def start(self):
+        """Start observing the temp folder, if not started yet"""
+        with self.lock:
+            if self.observer is None:
+                self.observer = Observer()
+                self.observer.schedule(self, path=self.path, recursive=True)
+                self.observer.start()
+
+    def stop(self):
+        """Stop observing the temp folder"""
+        with self.lock:
+            observer, self.observer = self.observer, None
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+    def register(self, download_dir):
+        """Start tracking the download folder of an export"""
+        self.start()
+        with self.lock:
+            self.downloads[download_dir] = {
+                "completed": threading.Event(),
+                "file_name": None,
+                "bytes_received": 0,
+                "last_progress": time.time(),
+                "started": False,
+                "started_at": None,
+            }
+
+    def unregister(self, download_dir):
+        """Stop tracking the download folder of an export"""
+        with self.lock:
+            self.downloads.pop(download_dir, None)
+
+    def on_created(self, event):
+        # when download is started, on created will be called
+        # temp file with .crdownload is created on chrome
+        if not event.is_directory:
+            LOG.debug("File Created: %s", event.src_path)
+            self.update(os.path.dirname(event.src_path))
+
+    def on_modified(self, event):
+        # temp file is modified while bytes are received
+        if not event.is_directory:
+            self.update(os.path.dirname(event.src_path))
+
+    def on_moved(self, event):
+        # when download is completed, chrome renames the .crdownload file
+        if not event.is_directory:
+            self.update(os.path.dirname(event.dest_path))
+
+    def update(self, download_dir):
+        """Update the progress of the download in the download folder"""
+        with self.lock:
+            download = self.downloads.get(download_dir)
+            if download is None or download["completed"].is_set():
+                return
+            bytes_received = 0
+            temp_files = []
+            files = []
+            try:
+                for file_name in os.listdir(download_dir):
+                    file_path = os.path.join(download_dir, file_name)
+                    if file_name.endswith(TEMP_DOWNLOAD_EXTENSIONS):
+                        temp_files.append(file_name)
+                        bytes_received += os.path.getsize(file_path)
+                    else:
+                        files.append(file_name)
+            except OSError:
+                # file renamed or removed while listing, wait for next event
+                return
+            if (temp_files or files) and not download["started"]:
+                download["started"] = True
+                download["started_at"] = time.time()
+            if bytes_received != download["bytes_received"]:
+                download["bytes_received"] = bytes_received
+                download["last_progress"] = time.time()
+            # the download folder only belongs to one export, so a finished
+            # file with no temp file left is the file downloaded by the export
+            if files and not temp_files:
+                download["file_name"] = files[0]
+                download["completed"].set()
+                LOG.info("Downloaded: {}".format(files[0]))
+
+    def wait(
+        self,
+        download_dir,
+        timeout=DOWNLOAD_TIMEOUT,
+        start_timeout=DOWNLOAD_START_TIMEOUT,
+        stall_timeout=DOWNLOAD_STALL_TIMEOUT,
+        sleep_frequency=1,
+    ):
+        """
+        Wait till the download in the download folder is completed, returns
+        the downloaded file name, None if timed out or stalled.
+        """
+        with self.lock:
+            if download_dir not in self.downloads:
+                self.register(download_dir)
+            download = self.downloads[download_dir]
+        start_time = time.time()
+        bytes_logged = 0
+        # wakes up as soon as the download is completed
+        while not download["completed"].wait(sleep_frequency):
+            # rescan the folder in case an event was missed
+            self.update(download_dir)
+            if download["completed"].is_set():
+                break
+            now = time.time()
+            if download["bytes_received"] != bytes_logged:
+                bytes_logged = download["bytes_received"]
+                LOG.debug("Downloading: {:.1f} MB".format(bytes_logged / 1024**2))
+            if now - start_time > timeout:
+                LOG.error("Download timeout exceeded.")
+                return None
+            if download["started"]:
+                if now - download["last_progress"] > stall_timeout:
+                    LOG.error(
+                        "Download stalled! No progress for {}s at {:.1f} MB".format(
+                            stall_timeout, download["bytes_received"] / 1024**2
+                        )
+                    )
+                    return None
+            elif now - start_time > start_timeout:
+                LOG.error("Download not started after {}s!".format(start_timeout))
+                return None
+        return download["file_name"]
+
+    def get_started_at(self, download_dir):
+        """Time the download in the download folder started, None if not yet"""
+        with self.lock:
+            return self.downloads.get(download_dir, {}).get("started_at")
+
+
+# Tracker for export downloads in the temp folder
+DOWNLOAD_TRACKER = DownloadTracker(TEMP_OUTPUT_PATH)
+
+
+class ExportStateStore:
+    "Durable export state, saved to a SQLite database as work completes"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS projects (
+            project_url TEXT PRIMARY KEY,
+            proj_name TEXT,
+            export_done INTEGER DEFAULT 0,
+            duration REAL,
+            total_forms INTEGER,
+            updated_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS form_types (
+            proj_name TEXT,
+            form_type TEXT,
+            total_forms INTEGER DEFAULT 0,
+            excel_file TEXT,
+            excel_done INTEGER DEFAULT 0,
+            pdfs_done INTEGER DEFAULT 0,
+            fingerprint TEXT,
+            updated_at REAL,
+            PRIMARY KEY (proj_name, form_type)
+        );
+        CREATE TABLE IF NOT EXISTS manifest (
+            proj_name TEXT,
+            form_type TEXT,
+            file TEXT PRIMARY KEY,
+            sha256 TEXT,
+            size INTEGER,
+            updated_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS form_rows (
+            proj_name TEXT,
+            form_type TEXT,
+            row_hash TEXT,
+            PRIMARY KEY (proj_name, form_type, row_hash)
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            proj_name TEXT,
+            form_type TEXT,
+            page INTEGER,
+            total_pages INTEGER,
+            total_forms INTEGER,
+            files TEXT,
+            updated_at REAL,
+            PRIMARY KEY (proj_name, form_type, page)
+        );
+        CREATE TABLE IF NOT EXISTS latencies (
+            operation TEXT PRIMARY KEY,
+            samples TEXT,
+            updated_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS project_index (
+            project_url TEXT PRIMARY KEY,
+            project_id TEXT,
+            proj_name TEXT,
+            archived INTEGER DEFAULT 0,
+            form_types TEXT,
+            position INTEGER,
+            discovered_at REAL
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.lock = threading.Lock()
+        # skip work already recorded as done and verified on disk
+        self._resume = False
+        # skip only work recorded since this time, set when the session
+        # lapsed, for the whole run or per thread for the project retried
+        self.resume_since = None
+        self.local = threading.local()
+        self.opened_at = None
+        # only export forms that are new or changed since the last export
+        self.incremental = False
+
+    @property
+    def resume(self):
+        return self.get_resume_since() is not None
+
+    @resume.setter
+    def resume(self, resume):
+        self._resume = resume
+
+    def get_resume_since(self):
+        """Time work is skipped from, 0 for all recorded work, None if not resuming"""
+        if self._resume:
+            return 0
+        resume_since = getattr(self.local, "resume_since", None)
+        return self.resume_since if resume_since is None else resume_since
+
+    def resume_from(self, resume_since):
+        """Skip the work this thread recorded since resume_since, None to stop"""
+        self.local.resume_since = resume_since
+
+    @contextlib.contextmanager
+    def resume_all(self):
+        """
+        Skip all work recorded as done and export in full in the with block,
+        the resume and incremental settings of the run are restored after
+        """
+        saved = (self._resume, self.resume_since, self.incremental)
+        self._resume, self.incremental = True, False
+        try:
+            yield
+        finally:
+            self._resume, self.resume_since, self.incremental = saved
+
+    def open(self):
+        """Open the database, create the tables if they don't exist"""
+        self.opened_at = time.time()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.executescript(self.SCHEMA)
+            # add columns missing in databases of older script versions
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(form_types)")]
+            if "fingerprint" not in columns:
+                self.conn.execute("ALTER TABLE form_types ADD COLUMN fingerprint TEXT")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(projects)")]
+            if "duration" not in columns:
+                self.conn.execute("ALTER TABLE projects ADD COLUMN duration REAL")
+                self.conn.execute("ALTER TABLE projects ADD COLUMN total_forms INTEGER")
+
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def execute(self, sql, params=()):
+        """Execute a write statement in its own transaction"""
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute(sql, params)
+
+    def query(self, sql, params=()):
+        """Execute a read statement and return all rows"""
+        with self.lock:
+            if self.conn is None:
+                return []
+            return self.conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def files_exist(files):
+        """Check if all files, relative to the output folder, exist"""
+        return all(os.path.exists(os.path.join(OUTPUT_PATH, f)) for f in files)
+
+    def set_project_started(self, project_url, proj_name):
+        self.execute(
+            "INSERT INTO projects (project_url, proj_name, updated_at) "
+            "VALUES (?, ?, ?) ON CONFLICT (project_url) DO UPDATE SET "
+            "proj_name = excluded.proj_name, updated_at = excluded.updated_at",
+            (project_url, proj_name, time.time()),
+        )
+
+    def set_project_done(self, project_url, duration=None):
+        """Mark the project as exported, with its export time in sec and forms
+        if exported in full, the last full export's are kept otherwise"""
+        self.execute(
+            "UPDATE projects SET export_done = 1, "
+            "duration = COALESCE(?, duration), total_forms = CASE WHEN ? IS NULL "
+            "THEN total_forms ELSE (SELECT SUM(total_forms) FROM form_types WHERE "
+            "form_types.proj_name = projects.proj_name) END, updated_at = ? "
+            "WHERE project_url = ?",
+            (duration, duration, time.time(), project_url),
+        )
+
+    def get_project_history(self):
+        """Return (duration, total_forms) of the last export of each project"""
+        return {
+            project_url: (duration, total_forms)
+            for project_url, duration, total_forms in self.query(
+                "SELECT project_url, duration, total_forms FROM projects "
+                "WHERE duration IS NOT NULL"
+            )
+        }
+
+    def get_indexed_form_counts(self):
+        """Return the number of forms of each project in the project index"""
+        form_counts = {}
+        for project_url, form_types in self.query(
+            "SELECT project_url, form_types FROM project_index"
+        ):
+            form_types = json.loads(form_types) or []
+            if form_types and all(
+                form_type["total_forms"] is not None for form_type in form_types
+            ):
+                form_counts[project_url] = sum(
+                    form_type["total_forms"] for form_type in form_types
+                )
+        return form_counts
+
+    def set_form_type_started(self, proj_name, form_type, total_forms=0):
+        """Record the form type as started, exported again from the start unless
+        resuming work recorded since the resume time"""
+        resume_since = self.get_resume_since()
+        if resume_since is None:
+            resume_since = float("inf")
+        self.execute(
+            "INSERT INTO form_types (proj_name, form_type, total_forms, updated_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (proj_name, form_type) DO UPDATE SET "
+            "excel_done = CASE WHEN updated_at >= ? THEN excel_done ELSE 0 END, "
+            "pdfs_done = CASE WHEN updated_at >= ? THEN pdfs_done ELSE 0 END, "
+            "updated_at = excluded.updated_at",
+            (
+                proj_name,
+                form_type,
+                total_forms,
+                time.time(),
+                resume_since,
+                resume_since,
+            ),
+        )
+
+    def set_total_forms(self, proj_name, form_type, total_forms):
+        self.execute(
+            "UPDATE form_types SET total_forms = ?, updated_at = ? "
+            "WHERE proj_name = ? AND form_type = ?",
+            (total_forms, time.time(), proj_name, form_type),
+        )
+
+    def set_excel_done(self, proj_name, form_type, excel_file):
+        self.execute(
+            "UPDATE form_types SET excel_done = 1, excel_file = ?, updated_at = ? "
+            "WHERE proj_name = ? AND form_type = ?",
+            (excel_file, time.time(), proj_name, form_type),
+        )
+
+    def set_pdfs_done(self, proj_name, form_type):
+        self.execute(
+            "UPDATE form_types SET pdfs_done = 1, updated_at = ? "
+            "WHERE proj_name = ? AND form_type = ?",
+            (time.time(), proj_name, form_type),
+        )
+
+    def set_pdfs_failed(self, proj_name, form_type):
+        self.execute(
+            "UPDATE form_types SET pdfs_done = 0, updated_at = ? "
+            "WHERE proj_name = ? AND form_type = ?",
+            (time.time(), proj_name, form_type),
+        )
+
+    def set_page_done(self, proj_name, form_type, page, total_pages, total_forms, files):
+        self.execute(
+            "INSERT OR REPLACE INTO pages (proj_name, form_type, page, total_pages, "
+            "total_forms, files, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                proj_name,
+                form_type,
+                page,
+                total_pages,
+                total_forms,
+                json.dumps(files),
+                time.time(),
+            ),
+        )
+
+    def set_fingerprint(self, proj_name, form_type, fingerprint):
+        self.execute(
+            "UPDATE form_types SET fingerprint = ?, updated_at = ? "
+            "WHERE proj_name = ? AND form_type = ?",
+            (fingerprint, time.time(), proj_name, form_type),
+        )
+
+    def add_manifest(self, proj_name, form_type, entries):
+        """Record (file, sha256, size) entries of exported files"""
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO manifest (proj_name, form_type, file, "
+                    "sha256, size, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (proj_name, form_type, file, sha256, size, time.time())
+                        for file, sha256, size in entries
+                    ],
+                )
+
+    def add_row_hashes(self, proj_name, form_type, row_hashes):
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO form_rows (proj_name, form_type, row_hash) "
+                    "VALUES (?, ?, ?)",
+                    [(proj_name, form_type, row_hash) for row_hash in row_hashes],
+                )
+
+    def get_row_hashes(self, proj_name, form_type):
+        """Return set of hashes of the form rows exported before"""
+        rows = self.query(
+            "SELECT row_hash FROM form_rows WHERE proj_name = ? AND form_type = ?",
+            (proj_name, form_type),
+        )
+        return {row_hash for (row_hash,) in rows}
+
+    def is_form_type_unchanged(self, proj_name, form_type, fingerprint):
+        """Check if form type is exported, on disk and its fingerprint is unchanged"""
+        rows = self.query(
+            "SELECT fingerprint FROM form_types WHERE proj_name = ? AND form_type = ?",
+            (proj_name, form_type),
+        )
+        if fingerprint is None or not rows or rows[0][0] != fingerprint:
+            return False
+        return self.is_form_type_done(proj_name, form_type, since=0)
+
+    def set_indexed_project(
+        self, project_url, project_id, proj_name, archived, form_types, position
+    ):
+        """Add or update a project found by discovery in the project index"""
+        self.execute(
+            "INSERT OR REPLACE INTO project_index VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                project_url,
+                project_id,
+                proj_name,
+                int(archived),
+                json.dumps(form_types),
+                position,
+                time.time(),
+            ),
+        )
+
+    def remove_indexed_projects(self, discovered_before):
+        """Remove projects not found by the last discovery from the index"""
+        self.execute(
+            "DELETE FROM project_index WHERE discovered_at < ?", (discovered_before,)
+        )
+
+    def get_project_index(self, ttl=DISCOVERY_TTL):
+        """Return projects of the index discovered within ttl sec, in page order"""
+        rows = self.query(
+            "SELECT project_url, project_id, proj_name, archived, form_types, "
+            "discovered_at FROM project_index WHERE discovered_at >= ? "
+            "ORDER BY position",
+            (time.time() - ttl,),
+        )
+        return [
+            {
+                "project_url": project_url,
+                "project_id": project_id,
+                "proj_name": proj_name,
+                "archived": bool(archived),
+                # None if the project's discovery failed
+                "form_types": json.loads(form_types),
+                "discovered_at": discovered_at,
+            }
+            for (
+                project_url,
+                project_id,
+                proj_name,
+                archived,
+                form_types,
+                discovered_at,
+            ) in rows
+        ]
+
+    def get_latencies(self):
+        """Return the times in sec observed of each operation in past runs"""
+        return {
+            operation: json.loads(samples)
+            for operation, samples in self.query(
+                "SELECT operation, samples FROM latencies"
+            )
+        }
+
+    def set_latencies(self, latencies):
+        """Save the latest times in sec observed of each operation"""
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO latencies (operation, samples, "
+                    "updated_at) VALUES (?, ?, ?)",
+                    [
+                        (operation, json.dumps(samples), time.time())
+                        for operation, samples in latencies.items()
+                    ],
+                )
+
+    def get_verify_jobs(self, project_url):
+        """
+        Return the export state of each form type of the project with its
+        pages and file hashes, to check the exported files against
+        """
+        projects = self.query(
+            "SELECT proj_name FROM projects WHERE project_url = ?", (project_url,)
+        )
+        if not projects:
+            return []
+        proj_name = projects[0][0]
+        jobs = []
+        for form_type, total_forms, excel_file, excel_done, pdfs_done in self.query(
+            "SELECT form_type, total_forms, excel_file, excel_done, pdfs_done "
+            "FROM form_types WHERE proj_name = ?",
+            (proj_name,),
+        ):
+            # only the form type's files, every job is sent to a verify process
+            manifest = {
+                file: (sha256, size)
+                for file, sha256, size in self.query(
+                    "SELECT file, sha256, size FROM manifest WHERE proj_name = ? "
+                    "AND form_type = ?",
+                    (proj_name, form_type),
+                )
+            }
+            pages = self.query(
+                "SELECT page, total_pages, total_forms, files FROM pages WHERE "
+                "proj_name = ? AND form_type = ? ORDER BY updated_at",
+                (proj_name, form_type),
+            )
+            jobs.append(
+                {
+                    "project_url": project_url,
+                    "proj_name": proj_name,
+                    "form_type": form_type,
+                    "total_forms": total_forms,
+                    "excel_file": excel_file,
+                    "excel_done": bool(excel_done),
+                    "pdfs_done": bool(pdfs_done),
+                    "pages": [
+                        {
+                            "page": page,
+                            "total_pages": total_pages,
+                            "total_forms": page_forms,
+                            "files": json.loads(files),
+                        }
+                        for page, total_pages, page_forms, files in pages
+                    ],
+                    "manifest": manifest,
+                    "output_path": OUTPUT_PATH,
+                    # attachments can be pdfs too, a page's pdfs are then not
+                    # one per form
+                    "count_pdfs": not checkboxes_xpath_dict.get("Export attachments"),
+                }
+            )
+        return jobs
+
+    def set_verify_failed(self, project_url, proj_name, form_type, excel, pages):
+        """Queue the excel and pdf pages of a form type that failed verification
+        for re-export with --resume"""
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                if excel:
+                    self.conn.execute(
+                        "UPDATE form_types SET excel_done = 0 "
+                        "WHERE proj_name = ? AND form_type = ?",
+                        (proj_name, form_type),
+                    )
+                if pages:
+                    self.conn.execute(
+                        "UPDATE form_types SET pdfs_done = 0 "
+                        "WHERE proj_name = ? AND form_type = ?",
+                        (proj_name, form_type),
+                    )
+                    self.conn.executemany(
+                        "DELETE FROM pages WHERE proj_name = ? AND form_type = ? "
+                        "AND page = ?",
+                        [(proj_name, form_type, page) for page in pages],
+                    )
+                self.conn.execute(
+                    "UPDATE projects SET export_done = 0 WHERE project_url = ?",
+                    (project_url,),
+                )
+
+    def is_project_done(self, project_url):
+        """Check if project is exported and all its files are on disk"""
+        rows = self.query(
+            "SELECT proj_name FROM projects WHERE project_url = ? AND "
+            "export_done = 1 AND updated_at >= ?",
+            (project_url, self.get_resume_since() or 0),
+        )
+        if not rows:
+            return False
+        form_types = self.query(
+            "SELECT form_type FROM form_types WHERE proj_name = ?", (rows[0][0],)
+        )
+        return all(
+            self.is_form_type_done(rows[0][0], form_type)
+            for (form_type,) in form_types
+        )
+
+    def is_excel_done(self, proj_name, form_type, since=None):
+        """Check if form type excel is exported and on disk"""
+        if since is None:
+            since = self.get_resume_since() or 0
+        rows = self.query(
+            "SELECT excel_file FROM form_types WHERE proj_name = ? AND "
+            "form_type = ? AND excel_done = 1 AND updated_at >= ?",
+            (proj_name, form_type, since),
+        )
+        # form types without forms are done without an excel file
+        return bool(rows) and self.files_exist([rows[0][0]] if rows[0][0] else [])
+
+    def get_done_page(self, proj_name, form_type, page, total_pages):
+        """Return number of forms of an exported page with files on disk, else None"""
+        rows = self.query(
+            "SELECT total_forms, files FROM pages WHERE proj_name = ? AND "
+            "form_type = ? AND page = ? AND total_pages = ? AND updated_at >= ?",
+            (proj_name, form_type, page, total_pages, self.get_resume_since() or 0),
+        )
+        if rows and self.files_exist(json.loads(rows[0][1])):
+            return rows[0][0]
+        return None
+
+    def get_done_form_type(self, proj_name, form_type, since=None):
+        """Return total forms of an exported form type with files on disk, else None"""
+        if since is None:
+            since = self.get_resume_since() or 0
+        rows = self.query(
+            "SELECT total_forms FROM form_types WHERE proj_name = ? AND "
+            "form_type = ? AND pdfs_done = 1 AND updated_at >= ?",
+            (proj_name, form_type, since),
+        )
+        if not rows or not self.is_excel_done(proj_name, form_type, since):
+            return None
+        pages = self.query(
+            "SELECT files FROM pages WHERE proj_name = ? AND form_type = ? AND "
+            "updated_at >= ?",
+            (proj_name, form_type, since),
+        )
+        if not all(self.files_exist(json.loads(files)) for (files,) in pages):
+            return None
+        return rows[0][0]
+
+    def is_form_type_done(self, proj_name, form_type, since=None):
+        """Check if form type is exported and all its files are on disk"""
+        return self.get_done_form_type(proj_name, form_type, since) is not None
+
+
+# Export state store in the export logs folder
+STATE_STORE = ExportStateStore(EXPORT_STATE_FILE)
+
+
+class ProjectIndex:
+    """
+    Index of the projects on the all projects page with their form types and
+    form counts, crawled once and cached in the export state for DISCOVERY_TTL
+    """
+
+    def __init__(self, ttl=DISCOVERY_TTL):
+        self.ttl = ttl
+        # take the project list from the index instead of the project urls file
+        self.enabled = False
+        # crawl again even if the index is not older than ttl
+        self.refresh = False
+        # export the projects after discovery
+        self.export = True
+        # indexed projects by url, read from the export state once per run
+        self.projects = None
+
+    def get(self, project_url):
+        """Return the indexed project if the index is used and fresh, else None"""
+        if not self.enabled:
+            return None
+        if self.projects is None:
+            self.projects = self.by_url(STATE_STORE.get_project_index(self.ttl))
+        project = self.projects.get(project_url)
+        # projects whose discovery failed are exported as if not indexed
+        if project is not None and project["form_types"]:
+            return project
+        return None
+
+    @staticmethod
+    def by_url(projects):
+        """Return the indexed projects by project url"""
+        return {project["project_url"]: project for project in projects}
+
+    def get_project_urls(self, browser):
+        """Return urls of the indexed projects, crawl first if stale or refreshed"""
+        projects = [] if self.refresh else STATE_STORE.get_project_index(self.ttl)
+        if not projects:
+            projects = self.discover(browser)
+            self.refresh = False
+        else:
+            LOG.info(
+                "Project Index: {} Projects, Discovered {}".format(
+                    len(projects),
+                    time.strftime(
+                        "%Y-%m-%d %H:%M",
+                        time.localtime(min(p["discovered_at"] for p in projects)),
+                    ),
+                )
+            )
+        self.projects = self.by_url(projects)
+        return [project["project_url"] for project in projects]
+
+    @traced
+    def discover(self, browser):
+        """Crawl the all projects page and each project, returns the index"""
+        started_at = time.time()
+        LOG.info("Discovering Projects...")
+        navigate_to_page(browser, url=ALL_SYNCHRO_URL, wait_condition=all_proj_div)
+        project_urls = get_project_links(browser)
+        LOG.info("Found {} Projects".format(len(project_urls)))
+        for position, project_url in enumerate(project_urls):
+            retry_count = 0
+            discovered = False
+            while discovered is False and retry_count <= MAX_RETRY:
+                try:
+                    self.discover_project(browser, project_url, position)
+                    discovered = True
+                except ALL_ERRORS as e:
+                    LOG.error(e)
+                    if retry_count < MAX_RETRY:
+                        LOG.warning("{} Discovery Failed!".format(project_url))
+                        LOG.warning(
+                            "Retrying... {}/{}".format(retry_count + 1, MAX_RETRY)
+                        )
+                    retry_count += 1
+            if discovered is False:
+                # still exported, its form types are read at export time
+                LOG.warning(
+                    "{} Discovery Failed! Max Retry: {} Reached!".format(
+                        project_url, MAX_RETRY
+                    )
+                )
+                STATE_STORE.set_indexed_project(
+                    project_url,
+                    get_project_id(project_url),
+                    None,
+                    False,
+                    None,
+                    position,
+                )
+        STATE_STORE.remove_indexed_projects(started_at)
+        projects = STATE_STORE.get_project_index(self.ttl)
+        LOG.info(
+            "Discovered: {} Projects | {} Form Types | {} Forms".format(
+                len(projects),
+                sum(len(project["form_types"] or []) for project in projects),
+                sum(
+                    form_type["total_forms"] or 0
+                    for project in projects
+                    for form_type in project["form_types"] or []
+                ),
+            )
+        )
+        return projects
+
+    @traced
+    def discover_project(self, browser, project_url, position):
+        """Add the project with the state and form count of its form types"""
+        navigate_to_page(browser, url=project_url)
+        proj_name = get_project_name(browser)
+        form_types_list = [
+            form_type.strip() for form_type in get_proj_form_types(browser)
+        ]
+        form_types = []
+        for form_type in form_types_list:
+            if form_type in IGNORED_FORM_TYPES:
+                form_types.append(
+                    {"name": form_type, "state": None, "total_forms": None}
+                )
+                continue
+            try:
+                open_form_type(browser, form_types_list, form_type)
+                form_state = probe_form_state(browser, form_type)
+            except (TimeoutException, NoSuchElementException):
+                LOG.warning("{} Form Not Found!".format(form_type))
+                refresh_page_form_types(browser)
+                form_state = FormState.UNKNOWN
+            total_forms = None
+            if form_state is FormState.EMPTY:
+                total_forms = 0
+            elif form_state is not FormState.UNKNOWN:
+                total_forms = get_form_count(browser)
+            form_types.append(
+                {
+                    "name": form_type,
+                    "state": form_state.value,
+                    "total_forms": total_forms,
+                }
+            )
+            LOG.debug(
+                "{} | {} | {} | {} Forms".format(
+                    proj_name, form_type, form_state.value, total_forms
+                )
+            )
+        # archived if all the form types with forms are archived
+        states = [
+            form_type["state"]
+            for form_type in form_types
+            if form_type["state"] not in (None, FormState.EMPTY.value)
+        ]
+        archived = bool(states) and all(
+            state == FormState.ARCHIVED.value for state in states
+        )
+        STATE_STORE.set_indexed_project(
+            project_url,
+            get_project_id(project_url),
+            proj_name,
+            archived,
+            form_types,
+            position,
+        )
+        LOG.info(
+            "Discovered: {} | {} Form Types{}".format(
+                proj_name, len(form_types), " | Archived" if archived else ""
+            )
+        )
+
+
+# Discovery index of projects, used with --discover and --from-index
+PROJECT_INDEX = ProjectIndex()
+
+
+class HttpExportEngine:
+    """
+    Exports forms through the backend api the web app calls, using the
+    logged in session cookies, no browser needed.
+
+    The api paths, the responses and the pdf export request body below are
+    placeholders, not checked against the O1 web app. Responses not matching
+    them raise ApiResponseError.
+
+    Expected api responses (paths are set in .env):
+        API_PROJECT_PATH: {"name": str}
+        API_FORM_TYPES_PATH: [{"id": str, "name": str}, ...]
+        API_FORMS_PATH?page=&pageSize=: {"total": int, "items": [{"id": str}, ...]}
+        API_EXPORT_EXCEL_PATH: excel file
+        API_EXPORT_PDF_PATH (POST {"formIds": [...], ...}): zip of pdfs or pdf file
+    """
+
+    PROJECT_SHAPE = {"name": str}
+    FORM_TYPES_SHAPE = [{"id": None, "name": str}]
+    FORMS_SHAPE = {"total": int, "items": [{"id": None}]}
+
+    def __init__(self, base_url=API_BASE_URL, workers=HTTP_WORKERS):
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.session = requests.Session()
+        # pooled connections, retried on server errors and rate limits
+        adapter = HTTPAdapter(
+            pool_connections=workers,
+            pool_maxsize=workers,
+            max_retries=Retry(
+                total=MAX_RETRY,
+                backoff_factor=1,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=None,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def set_cookies(self, cookies):
+        """Replace the session cookies with the logged in session cookies"""
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+
+    def request(self, method, path, **kwargs):
+        """Send request to the api, raise CookiesInvalidError if not logged in"""
+        response = self.session.request(
+            method, self.base_url + path, timeout=DEFAULT_WEBDRIVER_WAIT_TIME, **kwargs
+        )
+        if response.status_code in (401, 403):
+            raise CookiesInvalidError(
+                "Not Authorized! {} {}".format(response.status_code, path)
+            )
+        response.raise_for_status()
+        return response
+
+    @classmethod
+    def matches_shape(cls, data, shape):
+        """
+        Check if json data has the shape, a dict of keys to shapes, a list of
+        one shape for all items, a type, or None for any value
+        """
+        if shape is None:
+            return True
+        if isinstance(shape, dict):
+            return isinstance(data, dict) and all(
+                key in data and cls.matches_shape(data[key], value)
+                for key, value in shape.items()
+            )
+        if isinstance(shape, list):
+            return isinstance(data, list) and all(
+                cls.matches_shape(item, shape[0]) for item in data
+            )
+        return isinstance(data, shape)
+
+    def get_json(self, path, shape, **kwargs):
+        """Get json from the api, raise ApiResponseError if not of the shape"""
+        response = self.request("GET", path, **kwargs)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if data is None or not self.matches_shape(data, shape):
+            raise ApiResponseError(
+                "Unexpected Api Response! {} | Expected: {} | Got: {:.200}".format(
+                    path, shape, response.text
+                )
+            )
+        return data
+
+    def download(self, method, path, target_folder, default_file_name, **kwargs):
+        """Stream a file from the api into target folder, returns file name"""
+        with self.request(method, path, stream=True, **kwargs) as response:
+            content_type = response.headers.get("Content-Type", "")
+            if content_type.startswith(("text/html", "application/json")):
+                raise ApiResponseError(
+                    "Unexpected Api Response! {} | Expected: file | Got: {}".format(
+                        path, content_type
+                    )
+                )
+            content_disposition = response.headers.get("Content-Disposition", "")
+            match = re.search(r'filename="?([^";]+)"?', content_disposition)
+            file_name = os.path.basename(match.group(1)) if match else default_file_name
+            file_path = os.path.join(target_folder, file_name)
+            with open(file_path + ".part", "wb") as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+                    METRICS.inc("bytes_downloaded", len(chunk))
+        os.replace(file_path + ".part", file_path)
+        LOG.info("Downloaded: {}".format(file_name))
+        return file_name
+
+    def get_form_ids(self, project_id, form_type_id):
+        """Get ids of all forms in form type, page by page"""
+        form_ids = []
+        page = 1
+        while True:
+            forms = self.get_json(
+                API_FORMS_PATH.format(project_id=project_id, form_type_id=form_type_id),
+                self.FORMS_SHAPE,
+                params={"page": page, "pageSize": HTTP_PDF_BATCH_SIZE},
+            )
+            form_ids.extend(form["id"] for form in forms["items"])
+            if not forms["items"] or len(form_ids) >= forms["total"]:
+                return form_ids
+            page += 1
+
+    @traced
+    def export_project(self, project_url):
+        """Export all forms data of a project"""
+        start_time = time.time()
+        # export time of resumed or incremental runs isn't that of all forms
+        full_export = not STATE_STORE.resume and not STATE_STORE.incremental
+        project_id = get_project_id(project_url)
+        proj_name = self.get_json(
+            API_PROJECT_PATH.format(project_id=project_id), self.PROJECT_SHAPE
+        )["name"]
+        LOG.info("Project Name: {}".format(proj_name))
+        setup_export_log(proj_name)
+        STATE_STORE.set_project_started(project_url, proj_name)
+        form_types = self.get_json(
+            API_FORM_TYPES_PATH.format(project_id=project_id), self.FORM_TYPES_SHAPE
+        )
+        for form_type in form_types:
+            self.export_form_type(project_id, proj_name, form_type)
+        update_export_log(proj_name, export_done=True)
+        STATE_STORE.set_project_done(
+            project_url, time.time() - start_time if full_export else None
+        )
+        METRICS.inc("projects_done")
+        LOG.info("{} - All Data Exported!".format(proj_name))
+
+    @traced
+    def export_form_type(self, project_id, proj_name, form_type):
+        """Export form type to excel and its forms to pdf, in batches"""
+        form_type_name = form_type["name"].strip()
+        form_ids = self.get_form_ids(project_id, form_type["id"])
+        setup_export_log(proj_name, form_type_name)
+        STATE_STORE.set_form_type_started(proj_name, form_type_name, len(form_ids))
+        form_log = EXPORT_LOG[proj_name]["forms"][form_type_name]
+        if not form_ids:
+            # nothing to export, recorded as done so the project can be done
+            LOG.info("No forms in {}".format(form_type_name))
+            update_export_log(
+                proj_name, form_type_name, excel_exported=True, pdfs_exported=True
+            )
+            STATE_STORE.set_excel_done(proj_name, form_type_name, None)
+            STATE_STORE.set_pdfs_done(proj_name, form_type_name)
+            return
+        LOG.info("Form: {}".format(form_type_name))
+        update_export_log(proj_name, form_type_name, total_forms=len(form_ids))
+        METRICS.set_form_total(proj_name, form_type_name, len(form_ids))
+        METRICS.set_status(project=proj_name, form_type=form_type_name, page=0)
+        target_folder = os.path.join(OUTPUT_PATH, proj_name, form_type_name)
+        os.makedirs(target_folder, exist_ok=True)
+        paths = {"project_id": project_id, "form_type_id": form_type["id"]}
+        batches = [
+            form_ids[i : i + HTTP_PDF_BATCH_SIZE]
+            for i in range(0, len(form_ids), HTTP_PDF_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            excel_future = executor.submit(
+                self.export_excel, paths, proj_name, form_type_name, target_folder
+            )
+            pdf_futures = [
+                executor.submit(
+                    self.export_pdf_batch,
+                    paths,
+                    proj_name,
+                    form_type_name,
+                    target_folder,
+                    batch,
+                    page,
+                    len(batches),
+                )
+                for page, batch in enumerate(batches, start=1)
+            ]
+            try:
+                excel_future.result()
+                update_export_log(proj_name, form_type_name, excel_exported=True)
+            except (requests.RequestException, OSError) as e:
+                LOG.warning("Export Excel > {} Failed! {}".format(form_type_name, e))
+                update_export_log(proj_name, form_type_name, excel_export_error=str(e))
+            for page, pdf_future in enumerate(pdf_futures, start=1):
+                try:
+                    add_exported_forms(proj_name, form_type_name, pdf_future.result())
+                except (requests.RequestException, OSError, BadZipFile) as e:
+                    LOG.warning(
+                        "Export PDF > {} | Page: {}/{} Failed! {}".format(
+                            form_type_name, page, len(batches), e
+                        )
+                    )
+                    add_pdfs_export_error(proj_name, form_type_name, page, str(e))
+        if form_log["pdfs_export_error"] == []:
+            update_export_log(proj_name, form_type_name, pdfs_exported=True)
+            STATE_STORE.set_pdfs_done(proj_name, form_type_name)
+            if form_log["excel_exported"]:
+                METRICS.inc("form_types_done")
+
+    def export_excel(self, paths, proj_name, form_type, target_folder):
+        """Export form type to excel"""
+        if STATE_STORE.resume and STATE_STORE.is_excel_done(proj_name, form_type):
+            LOG.info("{} | {} > Excel Already Exported".format(proj_name, form_type))
+            return
+        LOG.info("{} | {} > Export Excel".format(proj_name, form_type))
+        excel_file_name = self.download(
+            "GET",
+            API_EXPORT_EXCEL_PATH.format(**paths),
+            target_folder,
+            "{}.xlsx".format(form_type),
+        )
+        CONTENT_STORE.add(os.path.join(target_folder, excel_file_name))
+        STATE_STORE.set_excel_done(
+            proj_name,
+            form_type,
+            output_rel_path(os.path.join(target_folder, excel_file_name)),
+        )
+
+    def export_pdf_batch(
+        self, paths, proj_name, form_type, target_folder, form_ids, page, total_pages
+    ):
+        """Export a batch of forms to pdf, returns number of exported forms"""
+        if STATE_STORE.resume:
+            done_page_forms = STATE_STORE.get_done_page(
+                proj_name, form_type, page, total_pages
+            )
+            if done_page_forms is not None:
+                METRICS.inc("forms_skipped", done_page_forms)
+                return done_page_forms
+        LOG.info(
+            "{} | {} | Export PDF Page: {}/{}".format(
+                proj_name, form_type, page, total_pages
+            )
+        )
+        # every batch downloads into a folder of its own, the zips of all
+        # batches have the same name
+        download_dir = tempfile.mkdtemp(prefix="http_", dir=TEMP_OUTPUT_PATH)
+        try:
+            pdfs_file_name = self.download(
+                "POST",
+                API_EXPORT_PDF_PATH.format(**paths),
+                download_dir,
+                "SYNCHRO_export_{}_{}.zip".format(time.strftime("%Y_%m_%d"), page),
+                json={
+                    "formIds": form_ids,
+                    # same options as the checkboxes ticked in the browser
+                    "includeComments": bool(checkboxes_xpath_dict["Comments"]),
+                    "includeAuditTrail": bool(checkboxes_xpath_dict["Audit trail"]),
+                    "includeImages": bool(checkboxes_xpath_dict["Images"]),
+                    "includeAttachments": bool(
+                        checkboxes_xpath_dict["Export attachments"]
+                    ),
+                },
+            )
+            if os.path.splitext(pdfs_file_name)[-1] == ".zip":
+                exported_files = extract_file(
+                    os.path.join(download_dir, pdfs_file_name), target_folder
+                )
+            else:
+                move_file_to_target_folder(target_folder, pdfs_file_name, download_dir)
+                exported_files = [pdfs_file_name]
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
+        for file_name in exported_files:
+            CONTENT_STORE.add(os.path.join(target_folder, file_name))
+        STATE_STORE.set_page_done(
+            proj_name,
+            form_type,
+            page,
+            total_pages,
+            len(form_ids),
+            [
+                output_rel_path(os.path.join(target_folder, file_name))
+                for file_name in exported_files
+            ],
+        )
+        METRICS.inc("pages_done")
+        METRICS.inc("forms_exported", len(form_ids))
+        return len(form_ids)
+
+
+class DownloadPool:
+    "Downloads export files handed off by the browser over pooled connections"
+
+    def __init__(self, workers=HTTP_WORKERS):
+        self.workers = workers
+        # hand off pdf downloads from the browser to the pool
+        self.enabled = False
+        self.executor = None
+        self.session = None
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the download threads, if not started yet"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="Download"
+                )
+                self.session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.workers, pool_maxsize=self.workers
+                )
+                self.session.mount("http://", adapter)
+                self.session.mount("https://", adapter)
+
+    def stop(self):
+        """Wait for all downloads to finish and stop the download threads"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def submit(
+        self,
+        proj_name,
+        form_type,
+        url,
+        cookies,
+        target_folder,
+        file_name,
+        on_done,
+        on_error,
+    ):
+        """
+        Download file in the background
+
+        Args:
+            proj_name (str): project name, to wait for the project's downloads
+            form_type (str): form type name
+            url (str): url of the file
+            cookies (list): browser cookies of the logged in session
+            target_folder (str): folder to download the file into
+            file_name (str): file name to save the file as
+            on_done (callable): called with the list of exported file names
+            on_error (callable): called with the error if the download failed
+        """
+        self.start()
+        cookie_jar = requests.cookies.RequestsCookieJar()
+        for cookie in cookies:
+            cookie_jar.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+        future = self.executor.submit(
+            self.download,
+            proj_name,
+            form_type,
+            url,
+            cookie_jar,
+            target_folder,
+            file_name,
+            on_done,
+            on_error,
+        )
+        with self.lock:
+            self.futures.setdefault(proj_name, []).append(future)
+
+    def pending(self):
+        """Number of downloads not finished yet"""
+        with self.lock:
+            return sum(
+                not future.done()
+                for futures in self.futures.values()
+                for future in futures
+            )
+
+    def wait(self, key):
+        """Wait for all downloads submitted with the key to finish"""
+        with self.lock:
+            futures = self.futures.pop(key, [])
+        if futures:
+            LOG.info("Waiting for {} Downloads...".format(len(futures)))
+        for future in futures:
+            future.result()
+
+    def download(
+        self,
+        proj_name,
+        form_type,
+        url,
+        cookie_jar,
+        target_folder,
+        file_name,
+        on_done,
+        on_error,
+    ):
+        """Download file into a folder of its own and post-process it"""
+        file_name = os.path.basename(file_name)
+        download_dir = tempfile.mkdtemp(prefix="handoff_", dir=TEMP_OUTPUT_PATH)
+        try:
+            sha256 = self.fetch(url, cookie_jar, os.path.join(download_dir, file_name))
+            LOG.info("Downloaded: {} | sha256: {}".format(file_name, sha256))
+        except ALL_ERRORS as e:
+            remove_download_dir(download_dir)
+            on_error(e)
+            return
+        # already off the browser thread, post-process in this thread
+        POSTPROCESS.process(
+            POSTPROCESS.create_job(
+                proj_name,
+                form_type,
+                download_dir,
+                file_name,
+                target_folder,
+                on_done,
+                on_error,
+            )
+        )
+
+    @traced
+    def fetch(self, url, cookie_jar, file_path):
+        """
+        Stream url into file path, resuming with range requests after
+        connection errors and server errors, returns sha256 of the file.
+
+        Raises:
+            ValueError: ValueError when the checksum or size doesn't match
+        """
+        part_path = file_path + ".part"
+        expected_md5 = None
+        expected_size = None
+        for attempt in range(MAX_RETRY + 1):
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": "bytes={}-".format(offset)} if offset else {}
+            try:
+                with self.session.get(
+                    url,
+                    cookies=cookie_jar,
+                    headers=headers,
+                    stream=True,
+                    timeout=DEFAULT_WEBDRIVER_WAIT_TIME,
+                ) as response:
+                    if offset and not self.resumes(response, offset, expected_size):
+                        # part file is not the start of this file, start over
+                        LOG.warning(
+                            "Download can't be resumed, restarting... {}/{}".format(
+                                attempt + 1, MAX_RETRY
+                            )
+                        )
+                        os.remove(part_path)
+                        METRICS.inc("retries", step="download")
+                        continue
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        # full response, server ignored or didn't get a range
+                        offset = 0
+                        expected_md5 = response.headers.get("Content-MD5")
+                        if "Content-Length" in response.headers:
+                            expected_size = int(response.headers["Content-Length"])
+                    with open(part_path, "ab" if offset else "wb") as f:
+                        for chunk in response.iter_content(chunk_size=1024 * 1024):
+                            f.write(chunk)
+                break
+            except requests.RequestException as e:
+                # client errors (not logged in, not found...) won't go away
+                status_code = getattr(e.response, "status_code", None)
+                if attempt >= MAX_RETRY or (
+                    status_code is not None and 400 <= status_code < 500
+                ):
+                    raise
+                METRICS.inc("retries", step="download")
+                LOG.warning(
+                    "Download interrupted, resuming... {}/{} {}".format(
+                        attempt + 1, MAX_RETRY, e
+                    )
+                )
+        else:
+            raise ValueError(
+                "Download can't be resumed! {}".format(os.path.basename(file_path))
+            )
+        # verify the downloaded file
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+                sha256.update(chunk)
+        if expected_size is not None and os.path.getsize(part_path) != expected_size:
+            raise ValueError("Size mismatch! {}".format(os.path.basename(file_path)))
+        if expected_md5 and base64.b64encode(md5.digest()).decode() != expected_md5:
+            raise ValueError("Checksum mismatch! {}".format(os.path.basename(file_path)))
+        os.replace(part_path, file_path)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def resumes(response, offset, expected_size):
+        """
+        Check if the response to a range request continues the part file,
+        a partial response starting at offset, of a file of the expected size
+        """
+        if response.status_code == 416:
+            # part file is longer than the file
+            return False
+        if response.status_code != 206:
+            # full response, the part file is overwritten
+            return True
+        match = re.match(
+            r"bytes (\d+)-\d+/(\d+|\*)", response.headers.get("Content-Range", "")
+        )
+        if match is None or int(match.group(1)) != offset:
+            return False
+        total_size = None if match.group(2) == "*" else int(match.group(2))
+        return None in (expected_size, total_size) or total_size == expected_size
+
+
+# Pool for export downloads handed off by the browser
+DOWNLOAD_POOL = DownloadPool()
+
+
+class LeanProfile:
+    """
+    Opt-in lean browser profile, blocks images, fonts and analytics, turns
+    off css animations and runs the renderer in low memory mode
+    """
+
+    # stylesheet injected into every page to turn off animations
+    NO_ANIMATIONS_CSS = (
+        "*, *::before, *::after { transition: none !important; "
+        "animation: none !important; scroll-behavior: auto !important; "
+        "caret-color: auto !important; }"
+    )
+
+    def __init__(self, blocked_urls=LEAN_BLOCKED_URLS):
+        self.enabled = False
+        self.blocked_urls = [url.strip() for url in blocked_urls.split(",") if url.strip()]
+
+    def add_options(self, options):
+        """Add low memory and no images flags to the chrome options"""
+        # don't decode or load images
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        # low memory renderer settings
+        options.add_argument("--enable-low-end-device-mode")
+        options.add_argument("--renderer-process-limit=2")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-smooth-scrolling")
+        # skip background network traffic of chrome itself
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--disable-sync")
+
+    def apply(self, browser):
+        """Block resources and inject the no animations stylesheet in browser"""
+        if not self.enabled:
+            return
+        LOG.debug("Applying Lean Profile...")
+        browser.execute_cdp_cmd("Network.enable", {})
+        browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+        browser.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument",
+            {
+                "source": "(function () {{"
+                "var style = document.createElement('style');"
+                "style.textContent = {};"
+                "(document.head || document.documentElement).appendChild(style);"
+                "}})();".format(json.dumps(self.NO_ANIMATIONS_CSS))
+            },
+        )
+
+
+# Lean browser profile, enabled with --lean
+LEAN_PROFILE = LeanProfile()
+
+
+class PostProcessPipeline:
+    """
+    Moves or extracts, hashes and records completed downloads in background
+    threads, so the browser can go on with its next export
+    """
+
+    def __init__(self, workers=POSTPROCESS_WORKERS, queue_size=POSTPROCESS_QUEUE_SIZE):
+        self.workers = workers
+        # bounded, the browser waits when post-processing falls behind
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.pending = {}
+        self.condition = threading.Condition()
+
+    def start(self):
+        """Start the post-processing threads, if not started yet"""
+        with self.condition:
+            if self.threads or self.workers < 1:
+                return
+            for i in range(1, self.workers + 1):
+                thread = threading.Thread(
+                    target=self.run, name="PostProcess-{}".format(i), daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self):
+        """Wait for all queued downloads to be processed and stop the threads"""
+        with self.condition:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    @staticmethod
+    def create_job(
+        proj_name, form_type, download_dir, file_name, target_folder, on_done, on_error
+    ):
+        return {
+            "proj_name": proj_name,
+            "form_type": form_type,
+            "download_dir": download_dir,
+            "file_name": file_name,
+            "target_folder": target_folder,
+            "on_done": on_done,
+            "on_error": on_error,
+            "queued_at": time.time(),
+        }
+
+    def submit(
+        self, proj_name, form_type, download_dir, file_name, target_folder, on_done, on_error
+    ):
+        """
+        Queue a completed download to be post-processed, the download folder
+        is owned by the pipeline from now on
+
+        Args:
+            proj_name (str): project name, to wait for the project's downloads
+            form_type (str): form type name
+            download_dir (str): download folder of the export
+            file_name (str): downloaded file name
+            target_folder (str): form type folder to move or extract the file to
+            on_done (callable): called with the list of exported file names
+            on_error (callable): called with the error if post-processing failed
+        """
+        job = self.create_job(
+            proj_name, form_type, download_dir, file_name, target_folder, on_done, on_error
+        )
+        self.start()
+        if not self.threads:
+            self.process(job)
+            return
+        with self.condition:
+            self.pending[proj_name] = self.pending.get(proj_name, 0) + 1
+        if self.queue.full():
+            LOG.debug("Post-process queue full, waiting...")
+        self.queue.put(job)
+
+    def wait(self, proj_name):
+        """Wait for all queued downloads of the project to be processed"""
+        with self.condition:
+            if self.pending.get(proj_name):
+                LOG.info(
+                    "Waiting for {} Downloads to be Processed...".format(
+                        self.pending[proj_name]
+                    )
+                )
+            self.condition.wait_for(lambda: not self.pending.get(proj_name))
+            self.pending.pop(proj_name, None)
+
+    def run(self):
+        """Post-processing thread"""
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            try:
+                self.process(job)
+            finally:
+                with self.condition:
+                    self.pending[job["proj_name"]] -= 1
+                    self.condition.notify_all()
+
+    @traced
+    def process(self, job):
+        """Move or extract the downloaded file, hash it and record it"""
+        queue_time = time.time() - job["queued_at"]
+        stage_times = []
+        target_folder = job["target_folder"]
+        file_name = job["file_name"]
+        try:
+            METRICS.inc(
+                "bytes_downloaded",
+                os.path.getsize(os.path.join(job["download_dir"], file_name)),
+            )
+            stage_start = time.time()
+            if os.path.splitext(file_name)[-1].lower() == ".zip":
+                # extract the zip straight from the download folder
+                exported_files = extract_file(
+                    os.path.join(job["download_dir"], file_name), target_folder
+                )
+                stage_times.append(("Extract", time.time() - stage_start))
+            else:
+                move_file_to_target_folder(target_folder, file_name, job["download_dir"])
+                exported_files = [file_name]
+                stage_times.append(("Move", time.time() - stage_start))
+            stage_start = time.time()
+            manifest = [
+                (output_rel_path(os.path.join(target_folder, name)),)
+                + hash_file(os.path.join(target_folder, name))
+                for name in exported_files
+            ]
+            stage_times.append(("Hash", time.time() - stage_start))
+            if CONTENT_STORE.enabled:
+                stage_start = time.time()
+                for name, (_, sha256, _) in zip(exported_files, manifest):
+                    CONTENT_STORE.add(os.path.join(target_folder, name), sha256)
+                stage_times.append(("Store", time.time() - stage_start))
+            stage_start = time.time()
+            STATE_STORE.add_manifest(job["proj_name"], job["form_type"], manifest)
+            job["on_done"](exported_files)
+            stage_times.append(("Record", time.time() - stage_start))
+        except ALL_ERRORS as e:
+            job["on_error"](e)
+        finally:
+            remove_download_dir(job["download_dir"])
+        LOG.info(
+            "Processed: {} | Queue: {} | Waited: {:.1f}s | {}".format(
+                file_name,
+                self.queue.qsize(),
+                queue_time,
+                " | ".join(
+                    "{}: {:.1f}s".format(stage, stage_time)
+                    for stage, stage_time in stage_times
+                ),
+            )
+        )
+
+
+# Pipeline post-processing completed downloads
+POSTPROCESS = PostProcessPipeline()
+
+
+class ContentStore:
+    """
+    Stores each exported file once, named by its sha256, with the files in
+    the output folder and in the snapshot of each run as hard links to it.
+    Files are only ever replaced (never written in place), so replacing a
+    file in the output folder leaves the stored file and older snapshots as
+    they were.
+    """
+
+    def __init__(self, store_dir=CONTENT_STORE_DIR, snapshot_dir=SNAPSHOT_DIR):
+        self.store_dir = store_dir
+        self.snapshot_dir = snapshot_dir
+        # hard link exported files into the store and snapshot each run
+        self.enabled = False
+        self.run_name = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime())
+        self.lock = threading.Lock()
+        self.stats = {"stored": 0, "linked": 0, "saved": 0}
+
+    def blob_path(self, sha256):
+        """Path of the stored file with the sha256"""
+        return os.path.join(self.store_dir, sha256[:2], sha256)
+
+    def add(self, file_path, sha256=None):
+        """
+        Store the file if its content is new, else replace it with a hard
+        link to the stored file with the same content
+        """
+        if not self.enabled:
+            return
+        if sha256 is None:
+            sha256, _ = hash_file(file_path)
+        blob_path = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            # new content, the exported file becomes the stored file
+            os.link(file_path, blob_path)
+            with self.lock:
+                self.stats["stored"] += 1
+            return
+        except FileExistsError:
+            if os.path.samefile(file_path, blob_path):
+                return
+        except OSError as e:
+            LOG.warning("Hard links not supported, content store off! {}".format(e))
+            self.enabled = False
+            return
+        # same content already stored, keep one copy only
+        size = os.path.getsize(file_path)
+        link_path = file_path + ".link"
+        try:
+            os.link(blob_path, link_path)
+            os.replace(link_path, file_path)
+        except OSError:
+            if os.path.exists(link_path):
+                os.remove(link_path)
+            raise
+        with self.lock:
+            self.stats["linked"] += 1
+            self.stats["saved"] += size
+
+    @traced
+    def snapshot(self, proj_names):
+        """
+        Hard link the output folders of the projects into this run's
+        snapshot folder, storing the files not in the store yet
+        """
+        if not self.enabled or not proj_names:
+            return
+        snapshot_root = os.path.join(self.snapshot_dir, self.run_name)
+        linked_files = 0
+        failed_files = 0
+        for proj_name in proj_names:
+            proj_folder = os.path.join(OUTPUT_PATH, proj_name)
+            for folder, _, file_names in os.walk(proj_folder):
+                target_folder = os.path.join(
+                    snapshot_root, os.path.relpath(folder, OUTPUT_PATH)
+                )
+                os.makedirs(target_folder, exist_ok=True)
+                for file_name in file_names:
+                    file_path = os.path.join(folder, file_name)
+                    try:
+                        # files of older script versions or runs without the store
+                        if os.stat(file_path).st_nlink == 1:
+                            self.add(file_path)
+                        os.link(file_path, os.path.join(target_folder, file_name))
+                        linked_files += 1
+                    except OSError as e:
+                        # a file missing from the snapshot doesn't stop the others
+                        LOG.warning("Snapshot > {} Failed! {}".format(file_path, e))
+                        failed_files += 1
+        LOG.info(
+            "Snapshot: {} Files of {} Projects in {} | Failed: {}".format(
+                linked_files, len(proj_names), snapshot_root, failed_files
+            )
+        )
+        LOG.info(
+            "Content Store: {stored} New Files | {linked} Duplicates Linked | "
+            "{saved_mb:.1f} MB Saved".format(
+                saved_mb=self.stats["saved"] / 1024**2, **self.stats
+            )
+        )
+
+
+# Content addressed store of exported files, enabled with --content-store
+CONTENT_STORE = ContentStore()
+
+
+class ExportVerifier:
+    """
+    Checks the exported files of each form type against the export state in
+    a pool of processes, and queues the excel files and pdf pages that fail
+    for re-export
+    """
+
+    def __init__(self, workers=VERIFY_WORKERS):
+        self.workers = workers
+        # verify exported projects and re-export the gaps at the end of a run
+        self.enabled = False
+
+    @traced
+    def verify(self, project_urls):
+        """
+        Verify the exported form types of the projects and queue the gaps for
+        re-export, returns the gaps found by project url
+        """
+        jobs = [
+            job
+            for project_url in project_urls
+            for job in STATE_STORE.get_verify_jobs(project_url)
+        ]
+        if not jobs:
+            return {}
+        LOG.info("Verifying {} Form Types...".format(len(jobs)))
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+            results = list(executor.map(verify_form_type, jobs))
+        gaps = {}
+        for job, result in zip(jobs, results):
+            if not result["excel_error"] and not result["page_errors"]:
+                continue
+            LOG.warning(
+                "Verify > {} | {} | PDFs: {}/{} | {}".format(
+                    job["proj_name"],
+                    job["form_type"],
+                    result["pdfs"],
+                    job["total_forms"],
+                    " | ".join(
+                        (
+                            ["Excel: {}".format(result["excel_error"])]
+                            if result["excel_error"]
+                            else []
+                        )
+                        + [
+                            "Page {}: {}".format(page, error)
+                            for page, error in sorted(result["page_errors"].items())
+                        ]
+                    ),
+                )
+            )
+            STATE_STORE.set_verify_failed(
+                job["project_url"],
+                job["proj_name"],
+                job["form_type"],
+                bool(result["excel_error"]),
+                list(result["page_errors"]),
+            )
+            gaps.setdefault(job["project_url"], {})[job["form_type"]] = result
+        LOG.info(
+            "Verified: {} Form Types | {} Files | {} Form Types Queued for "
+            "Re-export in {} Projects".format(
+                len(jobs),
+                sum(result["files"] for result in results),
+                sum(len(form_types) for form_types in gaps.values()),
+                len(gaps),
+            )
+        )
+        return gaps
+
+    def record_gaps(self, gaps):
+        """Add the gaps left after re-export to the export log"""
+        for project_url, form_types in gaps.items():
+            for form_type, result in form_types.items():
+                proj_name = result["proj_name"]
+                if proj_name not in EXPORT_LOG:
+                    setup_export_log(proj_name)
+                with EXPORT_LOG_LOCK:
+                    EXPORT_LOG[proj_name].setdefault("verify_errors", {})[form_type] = {
+                        "excel": result["excel_error"],
+                        "pages": result["page_errors"],
+                    }
+
+
+# Verifier of exported files, enabled with --verify
+VERIFIER = ExportVerifier()
+
+
+class ProjectScheduler:
+    """
+    Orders the projects of a run longest first by their export time in past
+    runs, so parallel workers finish together instead of one worker exporting
+    a big project alone at the end, and estimates the run's makespan
+    """
+
+    def __init__(self):
+        # longest first with several workers, else keep the project urls order
+        self.enabled = True
+
+    @staticmethod
+    def estimate(project_urls):
+        """
+        Estimate the export time in sec of each project from its last export,
+        scaled by its number of forms in the project index if it changed.
+        Projects not exported before are estimated from their number of forms
+        at the average time per form, or as the median project if unknown.
+
+        Returns:
+            dict: estimated sec by project url, empty if there is no history
+        """
+        history = STATE_STORE.get_project_history()
+        if not history:
+            return {}
+        form_counts = STATE_STORE.get_indexed_form_counts()
+        timed_forms = sum(forms or 0 for _, forms in history.values())
+        sec_per_form = (
+            sum(duration for duration, forms in history.values() if forms)
+            / timed_forms
+            if timed_forms
+            else None
+        )
+        estimates = {}
+        for project_url in project_urls:
+            duration, forms = history.get(project_url, (None, None))
+            total_forms = form_counts.get(project_url, forms)
+            if duration is not None:
+                if forms and total_forms is not None:
+                    duration *= total_forms / forms
+                estimates[project_url] = duration
+            elif total_forms is not None and sec_per_form is not None:
+                estimates[project_url] = total_forms * sec_per_form
+        known = sorted(estimates.values())
+        median = known[len(known) // 2] if known else 0.0
+        for project_url in project_urls:
+            estimates.setdefault(project_url, median)
+        return estimates
+
+    @staticmethod
+    def makespan(durations, workers):
+        """Time for workers taking the next project when free to export all"""
+        loads = [0.0] * max(1, min(workers, len(durations)))
+        for duration in durations:
+            heapq.heapreplace(loads, loads[0] + duration)
+        return max(loads)
+
+    def schedule(self, project_urls, workers=1):
+        """Return the project urls in export order and log the estimated makespan"""
+        estimates = self.estimate(project_urls)
+        if not estimates:
+            LOG.info("Schedule: No Export History, Keeping Project Order")
+            return project_urls
+        in_order = self.makespan([estimates[url] for url in project_urls], workers)
+        if self.enabled and workers > 1:
+            # longest processing time first, ties kept in file order
+            project_urls = sorted(project_urls, key=lambda url: -estimates[url])
+        makespan = self.makespan([estimates[url] for url in project_urls], workers)
+        LOG.info(
+            "Schedule: {} Projects | {} Workers | Estimated Time: {} | "
+            "In File Order: {}".format(
+                len(project_urls),
+                workers,
+                Metrics.format_duration(makespan),
+                Metrics.format_duration(in_order),
+            )
+        )
+        return project_urls
+
 
+# Orders projects longest first, turned off with --keep-order
+SCHEDULER = ProjectScheduler()
 
-# Define a custom event HANDLER for file changes in the downloads folder
-class DownloadHandler(FileSystemEventHandler):
-    def __init__(self, expected_file_name):
-        super().__init__()
-        self.expected_file_name = expected_file_name
-        self.downloaded_file_name = None
-        self.download_completed = False
 
-    def on_created(self, event):
-        # when download is started, on created will be called
-        # temp file with .crdownload is created on chrome
-        LOG.debug("File Created: %s", event.src_path)
+class SessionMonitor:
+    """
+    Watches the login session while exporting, at points the export can carry
+    on from: refreshes the session before its cookies expire, and logs in
+    again when it lapsed
+    """
+
+    def __init__(
+        self,
+        check_interval=SESSION_CHECK_INTERVAL,
+        refresh_margin=SESSION_REFRESH_MARGIN,
+    ):
+        self.check_interval = check_interval
+        self.refresh_margin = refresh_margin
+        # refresh the session before it expires
+        self.enabled = refresh_margin > 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # time of the last login of the run, browsers with older sessions
+        # load its cookies instead of logging in again
+        self.logged_in_at = 0.0
+
+    @staticmethod
+    def get_expiry(cookies):
+        """Earliest expiry of the session cookies, None if they don't expire"""
+        expiries = [
+            cookie["expiry"]
+            for cookie in cookies
+            if "expiry" in cookie and cookie["name"] not in IGNORED_COOKIES
+        ]
+        return min(expiries) if expiries else None
+
+    def expires_soon(self, cookies):
+        """Check if the session cookies expire within the refresh margin"""
+        expiry = self.get_expiry(cookies)
+        return (
+            self.enabled
+            and expiry is not None
+            and expiry - time.time() <= self.refresh_margin
+        )
+
+    def check(self, browser):
+        """
+        Check the session of the browser, refresh it if its cookies expire
+        within the refresh margin
+
+        Raises:
+            CookiesInvalidError: session lapsed, or expiring and not refreshed
+        """
+        href, title = browser.execute_script(SESSION_STATE_SCRIPT)
+        if href.startswith(BENTLEY_LOGIN_URL) or title == "Choose an Account":
+            raise CookiesInvalidError("Session Lapsed! Page: {}".format(title or href))
+        now = time.time()
+        if now - getattr(self.local, "checked_at", 0) < self.check_interval:
+            return
+        self.local.checked_at = now
+        if not self.expires_soon(browser.get_cookies()):
+            return
+        LOG.info("Session Expiring, Refreshing...")
+        self.refresh(browser)
+        if self.expires_soon(browser.get_cookies()):
+            raise CookiesInvalidError("Session Expiring! Not Refreshed")
+        LOG.info("Session Refreshed!")
+        save_cookies(browser)
+
+    @traced
+    def refresh(self, browser):
+        """
+        Load the web app in a new tab to renew the session cookies, the tab
+        being exported from is left as it is
+        """
+        export_tab = browser.current_window_handle
+        browser.switch_to.new_window("tab")
+        try:
+            browser.get(ALL_SYNCHRO_URL)
+            wait_for_ui(browser, document_ready, REFRESH_WAIT_TIME)
+        except SELENIUM_ERROR as e:
+            LOG.warning(e)
+        finally:
+            browser.close()
+            browser.switch_to.window(export_tab)
+
+    def started(self):
+        """Record the time the browser of this thread got its session"""
+        self.local.session_at = time.time()
+
+    def relogin(self, browser):
+        """
+        Log in again after the session lapsed, or load the cookies of a login
+        by another worker since this browser's session started
+
+        Raises:
+            LoginError: login failed after max retries
+        """
+        with self.lock:
+            if self.logged_in_at > getattr(self.local, "session_at", 0):
+                LOG.info("Loading Cookies of New Session...")
+                load_cookies(browser, read_cookies())
+                return
+            for try_count in range(MAX_RETRY + 1):
+                try:
+                    # login with clean session
+                    browser.delete_all_cookies()
+                    login_optimus(browser)
+                    self.started()
+                    self.logged_in_at = self.local.session_at
+                    return
+                except LoginError as e:
+                    LOG.warning(e)
+                    if try_count < MAX_RETRY:
+                        LOG.warning(
+                            "Retrying Login... {}/{}".format(try_count + 1, MAX_RETRY)
+                        )
+            raise LoginError("Login Failed! Max Retry: {} Reached!".format(MAX_RETRY))
+
+
+# Monitor of the login session while exporting
+SESSION = SessionMonitor()
 
-    def on_modified(self, event):
-        # when download is completed, on modified will be called
-        # LOG.debug("File modified: %s", event.src_path)
-        # check either if file name is same or similar by extension
-        # account for file name with timestamp by checking if file name
-        # ends with the same extension
-        modified_file_name = os.path.basename(event.src_path)
-        file_name_same = modified_file_name == self.expected_file_name
-        file_name_similar = modified_file_name.endswith(
-            os.path.splitext(self.expected_file_name)[1]
-        )
-        file_name_match = file_name_same or file_name_similar
-        ends_with_tmp = modified_file_name.endswith(".tmp")
-        ends_with_crdownload = modified_file_name.endswith(".crdownload")
-        unexpected_file = not file_name_match and not ends_with_crdownload and not ends_with_tmp
-        if file_name_match and self.download_completed is False:
-            LOG.debug(f"Downloaded: {event.src_path}")
-            LOG.info("Downloaded: {}".format(modified_file_name))
-            self.download_completed = True
-            # if file name is similar and not same, set downloaded file name
-            if file_name_similar and file_name_same is False:
-                self.downloaded_file_name = modified_file_name
-        elif unexpected_file and self.download_completed is False:
-            # edge case for when file name is not same or similar
-            LOG.debug(f"Downloaded: {event.src_path}")
-            LOG.info("Downloaded: {}".format(modified_file_name))
-            self.download_completed = True
-            self.downloaded_file_name = modified_file_name
+
+class WorkerLogFilter(logging.Filter):
+    "Prefix log messages from export workers with the worker name"
+
+    def filter(self, record):
+        thread_name = threading.current_thread().name
+        if thread_name.startswith("Worker"):
+            record.msg = "[{}] {}".format(thread_name, record.msg)
+        return True
 
 
 HANDLER = colorlog.StreamHandler()
@@ -284,22 +3298,223 @@ HANDLER.setFormatter(FORMATTER)
 FH = logging.FileHandler("{}.log".format(os.path.basename(__file__).replace(".py", "")))
 FH.setFormatter(FHFORMATTER)
 LOG = colorlog.getLogger(__name__)
+LOG.addFilter(WorkerLogFilter())
 LOG.addHandler(FH)
 LOG.addHandler(HANDLER)
 # set log level to DEBUG / INFO / WARNING / ERROR / CRITICAL
-if env.get("dev_mode").lower() == "true":
+if DEV_MODE:
     # set log level to debug if dev mode true
     LOG.setLevel(colorlog.DEBUG)
 else:
     LOG.setLevel(colorlog.INFO)
 
 
-def get_total_forms(total_forms):
-    """Returns total number of forms rounded up to nearest whole number"""
-    # 1 page = 25 forms
-    return -(-int(total_forms) // 25)
+@traced
+def wait_for_ui(browser, condition, fixed_delay, timeout=ELEMENT_WAIT_TIME):
+    """
+    Wait till a ui condition is met instead of sleeping for a fixed delay
+
+    Args:
+        browser (WebDriver): Selenium webdriver object
+        condition (callable): expected condition to wait for
+        fixed_delay (float): fixed delay in sec the condition replaces
+        timeout (int, optional): max wait time in sec.
+        Defaults to ELEMENT_WAIT_TIME.
+
+    Raises:
+        TimeoutException: TimeoutException when condition is not met
+    """
+    start_time = time.time()
+    time.sleep(UI_FLOOR_DELAY)
+    result = LearnedWait(
+        browser,
+        timeout,
+        operation="{} (ui)".format(LearnedWait.call_site()),
+        ignored_exceptions=IGNORED_EXCEPTIONS,
+    ).until(condition)
+    # record the time saved compared to the fixed delay
+    with WAIT_STATS["lock"]:
+        WAIT_STATS["waits"] += 1
+        WAIT_STATS["saved"] += fixed_delay - (time.time() - start_time)
+    return result
+
+
+def document_ready(browser):
+    """Expected condition for the page to be fully loaded"""
+    return browser.execute_script("return document.readyState") == "complete"
+
+
+def active_page_changed(page_num):
+    """Expected condition for the active page to change from page_num"""
+
+    def _predicate(browser):
+        active_page = get_page_state(browser)["active_page"]
+        # active page item is re-rendering if not shown
+        return active_page is not None and active_page != page_num
+
+    return _predicate
+
+
+def element_text_changed(xpath, text):
+    """Expected condition for the text of the element to change from text"""
+
+    def _predicate(browser):
+        try:
+            return browser.find_element(By.XPATH, xpath).text != text
+        except (NoSuchElementException, StaleElementReferenceException):
+            # element is re-rendering
+            return False
+
+    return _predicate
+
+
+def get_page_state(browser, rows=False):
+    """
+    Read the state of the page in one round trip
+
+    Args:
+        browser (WebDriver): Selenium webdriver object
+        rows (bool, optional): also read the text of each table row
+
+    Returns:
+        dict: row_count, row_texts, active_page (int, None if not shown),
+        page_items ({page number: element}), total_forms (tracker text),
+        select_all and checkboxes (checked, None if not shown), archived,
+        empty and project_name
+    """
+    state = browser.execute_script(PAGE_STATE_SCRIPT, PAGE_STATE_XPATHS, rows)
+    if state["active_page"] is not None:
+        active_page = state["active_page"]
+        state["active_page"] = int(active_page) if active_page.isdigit() else 0
+    state["page_items"] = {
+        int(item_text): item
+        for item_text, item in state["page_items"]
+        if item_text and item_text.isdigit()
+    }
+    return state
+
+
+def page_state_is(condition):
+    """Expected condition for the page state to meet condition, returns the state"""
+
+    def _predicate(browser):
+        state = get_page_state(browser)
+        return state if condition(state) else False
+
+    return _predicate
+
+
+def has_active_page(state):
+    """Page state condition for the active page item to be shown"""
+    return state["active_page"] is not None
+
+
+def check_checkboxes(browser, checkbox_xpaths):
+    """
+    Tick all the checkboxes not ticked yet in one round trip
+
+    Args:
+        browser (WebDriver): Selenium webdriver object
+        checkbox_xpaths (dict): xpath of each checkbox by name
+
+    Raises:
+        NoSuchElementException: NoSuchElementException when a checkbox is
+        not found, the others are still ticked
+    """
+    missing = browser.execute_script(CHECK_CHECKBOXES_SCRIPT, checkbox_xpaths)
+    if missing:
+        raise NoSuchElementException(not_found_msg((", ".join(missing), "checkbox")))
+
+
+def click_rows(browser, row_indexes):
+    """
+    Click the checkbox of each row in the current page in one round trip
+
+    Returns:
+        WebElement: checkbox of the last row clicked
+
+    Raises:
+        NoSuchElementException: NoSuchElementException when no checkbox is found
+    """
+    clicked = browser.execute_script(
+        CLICK_ROWS_SCRIPT, table_body_rows, row_checkbox, list(row_indexes)
+    )
+    if not clicked:
+        raise NoSuchElementException(not_found_msg(("Row", "checkbox")))
+    return clicked[-1]
+
+
+def get_total_forms(total_forms, page_size=PAGE_SIZE):
+    """Returns total number of pages, total forms divided by page size rounded up"""
+    return -(-int(total_forms) // page_size)
+
+
+def parse_page_size(text):
+    """Return the number of forms per page in text e.g. '100 per page'"""
+    match = re.search(r"\d+", text or "")
+    return int(match.group()) if match else 0
+
+
+@traced
+def set_largest_page_size(browser):
+    """
+    Switch the table to the largest page size offered (up to MAX_PAGE_SIZE)
+
+    Args:
+        browser (Webdriver): Selenium webdriver object
+
+    Returns:
+        int: number of forms per page of the table
+    """
+    wait = LearnedWait(
+        browser, MENU_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+    )
+    action = ActionChains(browser)
+    cur_item = ("Page Size", "btn")
+    size_btns = browser.find_elements(By.XPATH, page_size_btn)
+    if not size_btns:
+        # table has no page size selector, keep the default page size
+        LOG.debug(not_found_msg(cur_item))
+        return PAGE_SIZE
+    cur_page_size = parse_page_size(size_btns[0].text) or PAGE_SIZE
+    try:
+        # open the page size menu and get the sizes offered
+        action.click(size_btns[0]).perform()
+        options = wait.until(
+            EC.presence_of_all_elements_located((By.XPATH, page_size_option))
+        )
+        sizes = {
+            parse_page_size(option.text): option
+            for option in options
+            if parse_page_size(option.text)
+            and (not MAX_PAGE_SIZE or parse_page_size(option.text) <= MAX_PAGE_SIZE)
+        }
+        LOG.debug("Page Sizes: {}".format(sorted(sizes)))
+        if not sizes or max(sizes) <= cur_page_size:
+            # close the menu, already on the largest page size
+            action.send_keys(Keys.ESCAPE).perform()
+            return cur_page_size
+        page_size = max(sizes)
+        tracker_text = browser.find_element(By.XPATH, total_forms_item).text
+        action.click(sizes[page_size]).perform()
+        # wait till table is re-rendered with the new page size
+        wait = LearnedWait(
+            browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+        )
+        wait.until(element_text_changed(total_forms_item, tracker_text))
+        LOG.info("Page Size: {} -> {}".format(cur_page_size, page_size))
+        return page_size
+    except (TimeoutException, StaleElementReferenceException, NoSuchElementException):
+        action.send_keys(Keys.ESCAPE).perform()
+        # the table may have switched anyway, go by the page size shown
+        size_btns = browser.find_elements(By.XPATH, page_size_btn)
+        if size_btns:
+            cur_page_size = parse_page_size(size_btns[0].text) or cur_page_size
+        LOG.warning("Page size change failed, using {} per page".format(cur_page_size))
+        return cur_page_size
 
 
+@traced
 def login_optimus(browser):
     """
     Login to Bentley Webapp
@@ -315,7 +3530,7 @@ def login_optimus(browser):
     browser.get(BENTLEY_LOGIN_URL)
     try:
         # set wait for default webdriver wait time
-        wait = WebDriverWait(
+        wait = LearnedWait(
             browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
         )
         # get email field
@@ -326,7 +3541,7 @@ def login_optimus(browser):
         action = ActionChains(browser)
         action.send_keys_to_element(email, USERNAME).perform()
         # set wait for element wait time
-        wait = WebDriverWait(
+        wait = LearnedWait(
             browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
         )
         # get next btn
@@ -345,9 +3560,13 @@ def login_optimus(browser):
             EC.element_to_be_clickable((By.ID, env.get("sign_in_btn")))
         )
         action.click(sign_in_btn).perform()
-        # wait for text in div to be present for up to 30s till user enters 2fa
-        wait = WebDriverWait(
-            browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+        # wait for text in div to be present for up to 30s till user enters 2fa,
+        # waits on the user so its timeout isn't learned
+        wait = LearnedWait(
+            browser,
+            DEFAULT_WEBDRIVER_WAIT_TIME,
+            learn=False,
+            ignored_exceptions=IGNORED_EXCEPTIONS,
         )
         wait.until(EC.presence_of_element_located((By.XPATH, env.get("pingid_div"))))
         LOG.critical("PingID Authentication Required!")
@@ -366,6 +3585,7 @@ def login_optimus(browser):
         raise LoginError("Login Failed!")
 
 
+@traced
 def navigate_to_page(
     browser,
     url=PROJ_URL_PLACEHOLDER,
@@ -392,7 +3612,7 @@ def navigate_to_page(
         raise CookiesInvalidError("Cookies Conflict!")
     else:
         # wait for a condition to be present for up to 30s
-        wait = WebDriverWait(
+        wait = LearnedWait(
             browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
         )
         # wait till 'wait_condition' is present
@@ -406,6 +3626,7 @@ def navigate_to_page(
             raise NavigationError(msg)
 
 
+@traced
 def get_proj_form_types(browser):
     """Get list of form types in work project"""
     LOG.debug("Getting list of form types in work project...")
@@ -420,7 +3641,7 @@ def get_proj_form_types(browser):
 
 def click_work_tab(browser):
     """Click work tab in nav bar"""
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     action = ActionChains(browser)
@@ -433,7 +3654,7 @@ def click_work_tab(browser):
 
 def get_form_types_elem_list(browser):
     """Get and return form types element list"""
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     form_nav_bar = env.get("form_nav_bar")
@@ -448,7 +3669,7 @@ def get_form_types_elem_list(browser):
 
 def refresh_page_form_types(browser):
     """Refresh page and wait for form types nav bar to be present"""
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     form_nav_bar = env.get("form_nav_bar")
@@ -456,7 +3677,7 @@ def refresh_page_form_types(browser):
         LOG.debug("Refreshing page...")
         browser.refresh()
         # wait for page to refresh
-        time.sleep(REFRESH_WAIT_TIME)
+        wait_for_ui(browser, document_ready, REFRESH_WAIT_TIME)
         # click work tab
         click_work_tab(browser)
         # check for presence of form nav bar
@@ -466,6 +3687,86 @@ def refresh_page_form_types(browser):
         LOG.warning("Page refresh failed!")
 
 
+def open_form_type(browser, form_types_list, form_type):
+    """
+    Click the form type in the nav bar and wait for its page to load
+
+    Raises:
+        TimeoutException: TimeoutException when the form type page is not loaded
+    """
+    wait = LearnedWait(
+        browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+    )
+    action = ActionChains(browser)
+    # refresh the form_types_elem_list to get the latest elements
+    form_types_elem_list = get_form_types_elem_list(browser)
+    cur_form_type = form_types_elem_list[form_types_list.index(form_type)]
+    # click on the form type
+    action.click(cur_form_type).perform()
+    # wait till form type page is loaded
+    wait.until(
+        EC.presence_of_element_located(
+            (By.XPATH, "//h3[contains(text(), '{}')]".format(form_type))
+        )
+    )
+
+
+def get_form_count(browser):
+    """Number of forms in the open form type, from the page tracker or the rows"""
+    state = get_page_state(browser)
+    if state["total_forms"]:
+        count = state["total_forms"].split("of")[-1].strip()
+        if count.isdigit():
+            return int(count)
+    return state["row_count"]
+
+
+def get_project_links(browser):
+    """Get urls of all projects on the all projects page, in page order"""
+    project_urls = []
+    while True:
+        links = browser.execute_script(PROJECT_LINKS_SCRIPT, project_link)
+        new_urls = [
+            url.split("#")[0]
+            for url, _ in links
+            if url and url.split("#")[0] not in project_urls
+        ]
+        if not new_urls:
+            return project_urls
+        project_urls.extend(dict.fromkeys(new_urls))
+        try:
+            # wait for more projects to load after scrolling to the last one
+            WebDriverWait(browser, REFRESH_WAIT_TIME).until(
+                lambda browser: len(
+                    browser.execute_script(PROJECT_LINKS_SCRIPT, project_link)
+                )
+                > len(links)
+            )
+        except TimeoutException:
+            return project_urls
+
+
+def get_indexed_form_types(browser, indexed_project):
+    """
+    Get list of form types in work project from the project index, scraped
+    from the nav bar instead if the index doesn't match it. Form types empty
+    at discovery are kept, forms may have been added since, they are probed
+    like the others
+    """
+    click_work_tab(browser)
+    # read the nav bar in one round trip to check the index still matches it
+    nav_bar_list = browser.execute_script(
+        "return arguments[0].map(element => element.innerText.trim());",
+        get_form_types_elem_list(browser),
+    )
+    form_types_list = [form_type["name"] for form_type in indexed_project["form_types"]]
+    if nav_bar_list != form_types_list:
+        LOG.warning("Form Types Changed Since Discovery, Using Nav Bar...")
+        return nav_bar_list
+    return form_types_list
+
+
+@traced
 def export_forms_data(browser, form_types_list, proj_folder, proj_name):
     """
     Exports all forms dada in project to excel and pdf
@@ -476,46 +3777,49 @@ def export_forms_data(browser, form_types_list, proj_folder, proj_name):
         proj_folder (str): project folder path string
         proj_name (str): project name string
     """
-    wait = WebDriverWait(
-        browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
-    )
-    action = ActionChains(browser)
     # strip the form type of any whitespaces
     form_types_list = [form_type.strip() for form_type in form_types_list]
-    ignore_forms = ['My work','Work by items']
     # loop through all the list items
     for form_type in form_types_list:
         # ignore 'My Work' form type
-        if form_type in ignore_forms:
+        if form_type in IGNORED_FORM_TYPES:
             continue
+        # skip form type if already exported in a previous run
+        if STATE_STORE.resume:
+            done_total_forms = STATE_STORE.get_done_form_type(proj_name, form_type)
+            if done_total_forms is not None:
+                LOG.info("Form: {} Already Exported, Skipping...".format(form_type))
+                setup_export_log(proj_name, form_type)
+                update_export_log(
+                    proj_name,
+                    form_type,
+                    total_forms=done_total_forms,
+                    total_exported_forms=done_total_forms,
+                    excel_exported=True,
+                    pdfs_exported=True,
+                )
+                continue
+        # the export carries on from here if the session lapsed
+        SESSION.check(browser)
         retry_count = 0
         form_found = False
         while form_found is False and retry_count <= MAX_RETRY:
             LOG.info("Form: {}".format(form_type))
             try:
-                # refresh the form_types_elem_list to get the latest elements
-                form_types_elem_list = get_form_types_elem_list(browser)
-                cur_form_type = form_types_elem_list[form_types_list.index(form_type)]
-                # click on the form type
-                action.click(cur_form_type).perform()
-                # wait till form type page is loaded
-                wait.until(
-                    EC.presence_of_element_located(
-                        (By.XPATH, "//h3[contains(text(), '{}')]".format(form_type))
-                    )
-                )
+                open_form_type(browser, form_types_list, form_type)
                 # set form_found to True
                 form_found = True
             except (TimeoutException, NoSuchElementException):
-                LOG.warning(
-                    "{} Form Not Found! Retrying {}/{}".format(
-                        form_type, retry_count + 1, MAX_RETRY
-                    )
-                )
+                LOG.warning("{} Form Not Found!".format(form_type))
+                retry_count += 1
+                if retry_count > MAX_RETRY:
+                    break
+                LOG.warning("Retrying {}/{}".format(retry_count, MAX_RETRY))
                 # refresh page if get form types nav bar is timed out
                 refresh_page_form_types(browser)
-                retry_count += 1
-        if retry_count >= MAX_RETRY:
+                METRICS.inc("retries", step="form_type")
+        # a form type found on the last try is exported
+        if form_found is False:
             LOG.warning(
                 "Skipping... {}, Form Not Found After {} Retry!".format(
                     form_type, MAX_RETRY
@@ -523,17 +3827,30 @@ def export_forms_data(browser, form_types_list, proj_folder, proj_name):
             )
             setup_export_log(proj_name, form_type)
             # update export log with form not found error
-            EXPORT_LOG[proj_name]["forms"][form_type][
-                "forms_export_error"
-            ] = "Form Not Found!"
+            update_export_log(proj_name, form_type, forms_export_error="Form Not Found!")
+            # record the form type as not exported, so the project is not done
+            STATE_STORE.set_form_type_started(proj_name, form_type)
+            STATE_STORE.set_pdfs_failed(proj_name, form_type)
             continue
         else:
             # check if form type is archived and/or empty
-            archive = check_is_archived(browser, form_type)
-            is_empty = check_is_empty(browser)
-            if is_empty is False:
+            form_state = probe_form_state(browser, form_type)
+            archive = form_state is FormState.ARCHIVED
+            if form_state is not FormState.EMPTY:
                 # if no empty container, get the forms
                 setup_export_log(proj_name, form_type)
+                METRICS.set_status(form_type=form_type, page=0)
+                # fingerprint of the form type to skip it if unchanged next run
+                fingerprint = get_form_type_fingerprint(browser)
+                if STATE_STORE.incremental and STATE_STORE.is_form_type_unchanged(
+                    proj_name, form_type, fingerprint
+                ):
+                    LOG.info("Form: {} Unchanged, Skipping...".format(form_type))
+                    update_export_log(
+                        proj_name, form_type, excel_exported=True, pdfs_exported=True
+                    )
+                    continue
+                STATE_STORE.set_form_type_started(proj_name, form_type)
                 # create project folder for form type
                 form_type_folder = os.path.join(proj_folder, form_type)
                 if not os.path.exists(form_type_folder):
@@ -551,51 +3868,72 @@ def export_forms_data(browser, form_types_list, proj_folder, proj_name):
                 export_forms_pdf(
                     browser, form_type, pdf_form_type_folder, proj_name, archive
                 )
+                form_log = EXPORT_LOG[proj_name]["forms"][form_type]
+                # pdfs may still be downloading, the fingerprint is only used
+                # once the form type is recorded as done
+                if form_log["excel_exported"] and not form_log["pdfs_export_error"]:
+                    STATE_STORE.set_fingerprint(proj_name, form_type, fingerprint)
             else:
                 LOG.info("No forms in {}".format(form_type))
                 continue
     return True
 
 
-def check_is_archived(browser, form_type):
-    """Check if form type is archived"""
-    archived_container = env.get("archived_container")
-    try:
-        is_archived = WebDriverWait(
-            browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
-        ).until(EC.presence_of_all_elements_located((By.XPATH, archived_container)))
-        # if archived container is present, set archive to true
-        if is_archived:
-            LOG.info("{} is Archived".format(form_type))
-            return True
-    except TimeoutException:
-        return False
+@traced
+def probe_form_state(browser, form_type):
+    """
+    Wait for the first of table rows, empty container or archived container
+    to be present and return the state of the form type
 
+    Args:
+        browser (WebDriver): Selenium webdriver object
+        form_type (str): form type name
 
-def check_is_empty(browser):
-    """Check if form type is empty"""
-    empty_container = env.get("empty_container")
+    Returns:
+        FormState: state of the form type
+    """
     try:
-        empty_container = WebDriverWait(
+        state = LearnedWait(
             browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
-        ).until(EC.presence_of_all_elements_located((By.XPATH, empty_container)))
-        # if empty container is present, skip to next form type
-        if empty_container:
-            return True
+        ).until(
+            page_state_is(
+                lambda state: state["row_count"] or state["empty"] or state["archived"]
+            )
+        )
     except TimeoutException:
-        return False
+        LOG.warning("{} State Unknown!".format(form_type))
+        return FormState.ACTIVE
+    # if empty container is present, skip to next form type
+    if state["empty"]:
+        return FormState.EMPTY
+    if not state["archived"]:
+        # table rows may render before the archived container, timing out is
+        # the normal outcome for active form types so the wait is not learned,
+        # it ends early once the toolbar rendered with the container is there
+        try:
+            state = WebDriverWait(
+                browser, ARCHIVED_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+            ).until(page_state_is(lambda state: state["archived"] or state["toolbar"]))
+        except TimeoutException:
+            return FormState.ACTIVE
+        if not state["archived"]:
+            return FormState.ACTIVE
+    # if archived container is present, set archive to true
+    LOG.info("{} is Archived".format(form_type))
+    return FormState.ARCHIVED
 
 
+@traced
 def refresh_page_export(browser, wait_element):
     """Refresh page and wait for page element to be present"""
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     try:
         LOG.debug("Refreshing page...")
         browser.refresh()
-        # buffer time for page to refresh and load
-        time.sleep(REFRESH_WAIT_TIME)
+        # wait for page to refresh and load
+        wait_for_ui(browser, document_ready, REFRESH_WAIT_TIME)
         # wait till element is present
         wait.until(EC.presence_of_all_elements_located((By.XPATH, wait_element)))
         LOG.debug("Page refreshed!")
@@ -603,6 +3941,7 @@ def refresh_page_export(browser, wait_element):
         LOG.warning("Page refresh failed!")
 
 
+@traced
 def export_forms_excel(browser, form_type, target_folder, proj_name, archive=False):
     """
     Export all forms data in form type to excel
@@ -612,37 +3951,67 @@ def export_forms_excel(browser, form_type, target_folder, proj_name, archive=Fal
         form_type (object): form type object
         target_folder (string): target folder to move the exported excel to
     """
-    excel_file_name = "{}.xlsx".format(form_type)
     cur_item = (None, None)
+    download_dir = None
     retry_count = 0
     is_exported = False
     # set wait for default webdriver wait time
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
+    # skip excel if already exported in a previous run
+    if STATE_STORE.resume and STATE_STORE.is_excel_done(proj_name, form_type):
+        LOG.info("{} | {} > Excel Already Exported".format(proj_name, form_type))
+        update_export_log(proj_name, form_type, excel_exported=True)
+        return
     # loop till export is successful or retry count is more than max retry
     while is_exported is False and retry_count <= MAX_RETRY:
         try:
             cur_item = ("Table Row", "tr")
             # wait till table row is present
             wait.until(EC.presence_of_element_located((By.XPATH, table_rows)))
+            total_forms = get_form_count(browser)
             LOG.info("{} | {} > Export Excel".format(proj_name, form_type))
+            # download the excel into a folder of its own
+            download_dir = create_download_dir(browser, "excel")
             # export all data to excel main function
             do_export_forms_data_excel_main(browser, archive)
             # check if excel file is downloaded
-            download_completed, new_file_name = await_download_complete(excel_file_name)
+            download_completed, excel_file_name = await_download_complete(
+                download_dir, (".xlsx",), form_type, total_forms
+            )
             if download_completed:
-                if new_file_name:
-                    # rename excel file to new file name if any
-                    excel_file_name = new_file_name
-                # move exported excel file to project folder
-                move_file_to_target_folder(target_folder, excel_file_name)
+                # move exported excel file to project folder in the background
+                POSTPROCESS.submit(
+                    proj_name,
+                    form_type,
+                    download_dir,
+                    excel_file_name,
+                    target_folder,
+                    lambda exported_files: STATE_STORE.set_excel_done(
+                        proj_name,
+                        form_type,
+                        output_rel_path(os.path.join(target_folder, exported_files[0])),
+                    ),
+                    lambda error: record_failed_excel(proj_name, form_type, error),
+                )
+                # download folder is removed by the pipeline
+                download_dir = None
                 # set is_exported to True
                 is_exported = True
                 # set excel_exported to True for current form type
-                EXPORT_LOG[proj_name]["forms"][form_type]["excel_exported"] = True
+                update_export_log(proj_name, form_type, excel_exported=True)
             else:
                 LOG.warning("Download failed!")
+                cur_item = ("Excel", "download")
+                if retry_count < MAX_RETRY:
+                    LOG.warning(
+                        "Export Excel > {} | Retry: {}/{}".format(
+                            form_type, retry_count + 1, MAX_RETRY
+                        )
+                    )
+                METRICS.inc("retries", step="excel")
+                retry_count += 1
         except TimeoutException:
             LOG.warning(not_found_msg(cur_item))
             LOG.warning("Export Excel Failed!")
@@ -654,19 +4023,31 @@ def export_forms_excel(browser, form_type, target_folder, proj_name, archive=Fal
                         form_type, retry_count + 1, MAX_RETRY
                     )
                 )
+            METRICS.inc("retries", step="excel")
             # increase retry count by 1
             retry_count += 1
+        finally:
+            remove_download_dir(download_dir)
     # if retry count is more than max retry, skip to export to pdf
     if retry_count >= MAX_RETRY:
         LOG.warning(
             "Export Excel > {} | Max Retry: {} reached!".format(form_type, MAX_RETRY)
         )
         LOG.warning("Skipping to Export PDF...")
-        EXPORT_LOG[proj_name]["forms"][form_type]["excel_export_error"] = not_found_msg(
-            cur_item
+        update_export_log(
+            proj_name, form_type, excel_export_error=not_found_msg(cur_item)
         )
 
 
+def record_failed_excel(proj_name, form_type, error):
+    """Undo an excel counted as exported whose processing failed"""
+    LOG.warning("Export Excel > {} | Move Failed! {}".format(form_type, error))
+    with EXPORT_LOG_LOCK:
+        form_log = EXPORT_LOG[proj_name]["forms"][form_type]
+        form_log["excel_exported"] = False
+        form_log["excel_export_error"] = str(error)
+
+
 def do_export_forms_data_excel_main(browser, archive):
     """
     Export all forms data in form type to excel main function
@@ -676,7 +4057,7 @@ def do_export_forms_data_excel_main(browser, archive):
         archive (bool): True if form type is archived. Defaults to False.
     """
     # set wait for element wait time
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     action = ActionChains(browser)
@@ -707,6 +4088,7 @@ def do_export_forms_data_excel_main(browser, archive):
         LOG.debug(found_msg(cur_item))
 
 
+@traced
 def export_forms_pdf(browser, form_type, target_folder, proj_name, archive=False):
     """
     Export forms in form type to pdf
@@ -719,31 +4101,47 @@ def export_forms_pdf(browser, form_type, target_folder, proj_name, archive=False
         archive (bool, optional): True if form type is archived.
         Defaults to False.
     """
-    # set wait for short webdriver wait time
-    wait = WebDriverWait(
-        browser, SHORT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+    # set wait for short webdriver wait time, times out on tables without a
+    # total forms tracker (single page), so its timeout isn't learned
+    wait = LearnedWait(
+        browser,
+        SHORT_WEBDRIVER_WAIT_TIME,
+        learn=False,
+        ignored_exceptions=IGNORED_EXCEPTIONS,
     )
+    page_size = PAGE_SIZE
     try:
         # wait and get the total number of forms in the form type
-        total_forms = wait.until(
-            EC.presence_of_element_located((By.XPATH, total_forms_item))
+        state = wait.until(
+            page_state_is(lambda state: state["total_forms"] is not None)
         )
         # split the text to get the total number of forms
-        total_forms = int(total_forms.text.split("of")[-1].strip())
-        # get the total number of pages (1 page = 25 forms)
-        total_pages = get_total_forms(total_forms)
+        total_forms = int(state["total_forms"].split("of")[-1].strip())
+        if total_forms > page_size:
+            # fewer, larger pages mean fewer export round trips
+            page_size = set_largest_page_size(browser)
+        # get the total number of pages
+        total_pages = get_total_forms(total_forms, page_size)
     except TimeoutException:
         total_pages = 1
-        rows = browser.find_elements(By.XPATH, table_rows)
-        total_forms = len(rows)
+        total_forms = get_page_state(browser)["row_count"]
     LOG.debug("{} | {} Total Forms: {}".format(proj_name, form_type, total_forms))
     LOG.debug("{} | {} Total Pages: {}".format(proj_name, form_type, total_pages))
     # update export log with total forms
-    EXPORT_LOG[proj_name]["forms"][form_type]["total_forms"] = total_forms
+    update_export_log(proj_name, form_type, total_forms=total_forms)
+    STATE_STORE.set_total_forms(proj_name, form_type, total_forms)
+    METRICS.set_form_total(proj_name, form_type, total_forms)
     # if total pages is more than 1, export all forms in each page
     if total_pages > 1:
         multi_page_export_forms_pdf(
-            browser, form_type, target_folder, proj_name, total_pages, archive
+            browser,
+            form_type,
+            target_folder,
+            proj_name,
+            total_pages,
+            archive,
+            page_size,
+            total_forms,
         )
     # if total pages is 1, export all forms in single page
     else:
@@ -753,13 +4151,24 @@ def export_forms_pdf(browser, form_type, target_folder, proj_name, archive=False
 
 
 def multi_page_export_forms_pdf(
-    browser, form_type, target_folder, proj_name, total_pages, archive=False
+    browser,
+    form_type,
+    target_folder,
+    proj_name,
+    total_pages,
+    archive=False,
+    page_size=PAGE_SIZE,
+    total_forms=0,
 ):
     """Export all forms in each page to pdf"""
     cur_item = (None, None)
     # if there are more than 1 page, loop through each page
     LOG.debug("More than 1 page")
-    for page in range(1, total_pages + 1):
+    if STATE_STORE.incremental:
+        known_row_hashes = STATE_STORE.get_row_hashes(proj_name, form_type)
+    page = 0
+    while page < total_pages:
+        page += 1
         # set retry count to 0 for each run
         retry_count = 0
         # set is_exported to False for each run
@@ -767,26 +4176,64 @@ def multi_page_export_forms_pdf(
         LOG.debug(
             "{} | {} | Page: {}/{}".format(proj_name, form_type, page, total_pages)
         )
+        # skip page if already exported in a previous run
+        if STATE_STORE.resume:
+            done_page_forms = STATE_STORE.get_done_page(
+                proj_name, form_type, page, total_pages
+            )
+            if done_page_forms is not None:
+                LOG.info(
+                    "{} | {} | Page: {}/{} Already Exported".format(
+                        proj_name, form_type, page, total_pages
+                    )
+                )
+                add_exported_forms(proj_name, form_type, done_page_forms)
+                METRICS.inc("forms_skipped", done_page_forms)
+                continue
         # loop till export is successful or retry count is more than max retry
         while is_exported is False and retry_count <= MAX_RETRY:
+            # the export carries on from this page if the session lapsed
+            SESSION.check(browser)
             # reset active page number to 0 for each try
             active_page_num = 0
             # Find the active page element
             try:
-                # try and wait till active page is present
-                cur_item = ("Active Page", "span")
-                active_page_num = get_active_page_num(browser)
-                # print all the page numbers
-                LOG.debug(
-                    "Current Page: {} | Goto Page: {}".format(active_page_num, page)
-                )
-                # If active page is not current page, go next page
+                # go straight to the page, also after a refresh sent the
+                # table back to the first page
+                cur_item = ("Page {}".format(page), "span")
+                active_page_num = go_to_page(browser, page, page_size)
                 if active_page_num != page:
-                    go_next_page(browser)
-                else:
-                    cur_page_total_forms = len(
-                        browser.find_elements(By.XPATH, table_rows)
+                    LOG.warning(
+                        "Current Page: {} | Goto Page: {} failed".format(
+                            active_page_num, page
+                        )
                     )
+                    cur_item = ("Page Size", "btn")
+                    page, page_size, total_pages = refresh_table_page(
+                        browser, page, page_size, total_forms
+                    )
+                    METRICS.inc("retries", step="page")
+                    retry_count += 1
+                else:
+                    page_rows = get_page_rows(browser)
+                    cur_page_total_forms = len(page_rows)
+                    select_rows = None
+                    if STATE_STORE.incremental:
+                        # only export the new or changed forms in the page
+                        select_rows = get_changed_rows(page_rows, known_row_hashes)
+                        if not select_rows:
+                            LOG.info(
+                                "{} | {} | Page: {}/{} Unchanged".format(
+                                    proj_name, form_type, page, total_pages
+                                )
+                            )
+                            METRICS.inc("forms_skipped", len(page_rows))
+                            is_exported = True
+                            continue
+                        cur_page_total_forms = len(select_rows)
+                        if cur_page_total_forms == len(page_rows):
+                            # all forms changed, select all forms instead
+                            select_rows = None
                     # if active page is current page, stay on current page
                     is_exported = stay_on_current_page(
                         browser,
@@ -796,12 +4243,17 @@ def multi_page_export_forms_pdf(
                         target_folder,
                         proj_name,
                         archive,
+                        cur_page_total_forms,
+                        select_rows,
+                        [h for _, h in page_rows],
                     )
                     if is_exported is False:
                         # refresh page if export failed
                         LOG.warning("Export PDF Failed!")
-                        cur_item = ("Table Rows", "tr")
-                        refresh_page_export(browser, table_rows)
+                        cur_item = ("Page Size", "btn")
+                        page, page_size, total_pages = refresh_table_page(
+                            browser, page, page_size, total_forms
+                        )
                         if retry_count < MAX_RETRY:
                             LOG.warning(
                                 "Export PDF > {} | Page: {}/{} | Retry: {}/{}".format(
@@ -812,19 +4264,30 @@ def multi_page_export_forms_pdf(
                                     MAX_RETRY,
                                 )
                             )
+                        METRICS.inc("retries", step="pdf")
                         # increase retry count by 1
                         retry_count += 1
                     else:
                         # update export log with total exported forms
-                        EXPORT_LOG[proj_name]["forms"][form_type][
-                            "total_exported_forms"
-                        ] += cur_page_total_forms
+                        add_exported_forms(proj_name, form_type, cur_page_total_forms)
             except (
                 TimeoutException,
                 StaleElementReferenceException,
                 NoSuchElementException,
             ):
                 LOG.warning(not_found_msg(cur_item))
+                try:
+                    page, page_size, total_pages = refresh_table_page(
+                        browser, page, page_size, total_forms
+                    )
+                except (
+                    TimeoutException,
+                    StaleElementReferenceException,
+                    NoSuchElementException,
+                ):
+                    LOG.warning("Page refresh failed!")
+                METRICS.inc("retries", step="page")
+                retry_count += 1
         if retry_count >= MAX_RETRY:
             LOG.warning(
                 "Export PDF > {} | Page: {}/{} | Max Retry: {} reached!".format(
@@ -833,34 +4296,143 @@ def multi_page_export_forms_pdf(
             )
             LOG.warning("Skipping to next page...")
             # add page to pdf export error list
-            error_page_list = EXPORT_LOG[proj_name]["forms"][form_type][
-                "pdfs_export_error"
-            ]
-            error_page_list.append({"page": page, "error": not_found_msg(cur_item)})
-    # if all pages pdf export is successful, set pdfs_exported to True
-    if EXPORT_LOG[proj_name]["forms"][form_type]["pdfs_export_error"] == []:
-        EXPORT_LOG[proj_name]["forms"][form_type]["pdfs_exported"] = True
+            add_pdfs_export_error(proj_name, form_type, page, not_found_msg(cur_item))
+    # pdfs are exported once all pages are on disk without errors
+    update_pdfs_done(proj_name, form_type, queued=True)
+
+
+def refresh_table_page(browser, page, page_size, total_forms):
+    """
+    Refresh the table and switch it back to its largest page size, the
+    refreshed table is back on the default page size
+
+    Returns:
+        tuple: page holding the first form of the page, page size and total
+        pages, the page size may differ if the switch failed
+    """
+    refresh_page_export(browser, table_rows)
+    new_page_size = set_largest_page_size(browser)
+    if new_page_size != page_size:
+        LOG.warning("Page Size changed: {} -> {}".format(page_size, new_page_size))
+        page = (page - 1) * page_size // new_page_size + 1
+    return page, new_page_size, get_total_forms(total_forms, new_page_size)
+
+
+def get_page_rows(browser, state=None):
+    """
+    Get the index of each table row in current page with a hash of its
+    content, from the page state if read with rows already
+    """
+    if state is None:
+        state = get_page_state(browser, rows=True)
+    page_rows = []
+    for row_index, row_text in enumerate(state["row_texts"]):
+        # whitespace as in the visible text of the row
+        row_text = "\n".join(" ".join(line.split()) for line in row_text.splitlines())
+        page_rows.append(
+            (row_index, hashlib.sha1(row_text.strip().encode("utf-8")).hexdigest())
+        )
+    return page_rows
+
+
+def get_changed_rows(page_rows, known_row_hashes):
+    """Return indexes of the rows not exported before, new or changed forms"""
+    return [
+        row_index
+        for row_index, (_, row_hash) in enumerate(page_rows)
+        if row_hash not in known_row_hashes
+    ]
+
+
+def get_form_type_fingerprint(browser):
+    """
+    Return a fingerprint of the form type, made of the total forms text and
+    the content of its rows, None if the first page doesn't show all of its
+    forms, as edits to forms on later pages wouldn't change it
+    """
+    state = get_page_state(browser, rows=True)
+    total_forms_text = state["total_forms"] or ""
+    count = total_forms_text.split("of")[-1].strip()
+    if count.isdigit() and int(count) > state["row_count"]:
+        return None
+    row_hashes = [row_hash for _, row_hash in get_page_rows(browser, state)]
+    fingerprint = "\n".join([total_forms_text] + row_hashes)
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
 
 
 def get_active_page_num(browser):
     """Get the current active page number"""
     # try and wait till active page is present
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
-    active_page = wait.until(
-        EC.presence_of_element_located((By.XPATH, active_page_item))
+    return wait.until(page_state_is(has_active_page))["active_page"]
+
+
+@traced
+def go_to_page(browser, page, page_size=PAGE_SIZE):
+    """
+    Go straight to page of the table, by url if PAGE_URL_PARAM is set, else by
+    clicking the page item nearest to the page
+
+    Args:
+        browser (Webdriver): Selenium webdriver object
+        page (int): page number to go to
+        page_size (int, optional): number of forms per page of the table
+
+    Returns:
+        int: active page number
+    """
+    wait = LearnedWait(
+        browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
-    if active_page.text:
-        active_page_num = int(active_page.text)
-    else:
-        active_page_num = 0
+    action = ActionChains(browser)
+    state = wait.until(page_state_is(has_active_page))
+    active_page_num = state["active_page"]
+    LOG.debug("Current Page: {} | Goto Page: {}".format(active_page_num, page))
+    if active_page_num != page and PAGE_URL_PARAM:
+        go_to_page_url(browser, page, page_size)
+        return get_active_page_num(browser)
+    while active_page_num != page:
+        page_items = state["page_items"]
+        # page item nearest to the page, the page itself if shown
+        nearest_page = min(
+            page_items, key=lambda num: abs(num - page), default=active_page_num
+        )
+        if nearest_page != active_page_num:
+            LOG.debug("Going to Page: {}".format(nearest_page))
+            action.click(page_items[nearest_page]).perform()
+            wait.until(active_page_changed(active_page_num))
+        elif page > active_page_num:
+            # no page item nearer to the page, go next page
+            go_next_page(browser)
+        else:
+            break
+        state = wait.until(page_state_is(has_active_page))
+        active_page_num = state["active_page"]
     return active_page_num
 
 
+def go_to_page_url(browser, page, page_size=PAGE_SIZE):
+    """Go to page of the table by setting the page in the url"""
+    wait = LearnedWait(
+        browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
+    )
+    url = urlsplit(browser.current_url)
+    query = dict(parse_qsl(url.query))
+    query[PAGE_URL_PARAM] = page
+    if PAGE_SIZE_URL_PARAM:
+        query[PAGE_SIZE_URL_PARAM] = page_size
+    LOG.debug("Going to Page: {} by url".format(page))
+    browser.get(urlunsplit(url._replace(query=urlencode(query))))
+    # wait for page to load and the table to be rendered
+    wait_for_ui(browser, document_ready, SHORT_DELAY)
+    wait.until(EC.presence_of_element_located((By.XPATH, table_rows)))
+
+
 def go_next_page(browser):
     """Function to go to next page"""
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     action = ActionChains(browser)
@@ -871,21 +4443,44 @@ def go_next_page(browser):
     next_page_item_btn = wait.until(
         EC.presence_of_element_located((By.XPATH, next_page_item))
     )
-    # wait some time before click next page
-    time.sleep(SHORT_DELAY)
+    active_page_num = get_page_state(browser)["active_page"]
+    # wait till next page item btn can be clicked
+    next_page_item_btn = wait_for_ui(
+        browser, EC.element_to_be_clickable(next_page_item_btn), SHORT_DELAY
+    )
     # Click the "Next Page" button
     action.click(next_page_item_btn).perform()
     LOG.debug(found_msg(cur_item))
+    # wait till table is re-rendered on the next page
+    wait.until(active_page_changed(active_page_num))
 
 
 def stay_on_current_page(
-    browser, page, total_pages, form_type, target_folder, proj_name, archive
+    browser,
+    page,
+    total_pages,
+    form_type,
+    target_folder,
+    proj_name,
+    archive,
+    page_total_forms=0,
+    select_rows=None,
+    row_hashes=(),
 ):
     """Function for stuff to do on current page"""
     LOG.debug("Staying on Current Page")
     # Continue with exporting forms in current page
     is_exported = do_export_forms_pdf_main(
-        browser, form_type, target_folder, proj_name, page, total_pages, archive
+        browser,
+        form_type,
+        target_folder,
+        proj_name,
+        page,
+        total_pages,
+        archive,
+        page_total_forms,
+        select_rows,
+        row_hashes,
     )
     return is_exported
 
@@ -899,11 +4494,45 @@ def single_page_export_forms_pdf(
     LOG.debug("Only 1 page")
     retry_count = 0
     is_exported = False
+    # skip page if already exported in a previous run
+    if STATE_STORE.resume:
+        done_page_forms = STATE_STORE.get_done_page(proj_name, form_type, 1, 1)
+        if done_page_forms is not None:
+            LOG.info("{} | {} | PDFs Already Exported".format(proj_name, form_type))
+            is_exported = True
+            add_exported_forms(proj_name, form_type, done_page_forms)
+            METRICS.inc("forms_skipped", done_page_forms)
+    page_rows = get_page_rows(browser)
+    select_rows = None
+    if not is_exported and STATE_STORE.incremental:
+        # only export the new or changed forms in the page
+        known_row_hashes = STATE_STORE.get_row_hashes(proj_name, form_type)
+        select_rows = get_changed_rows(page_rows, known_row_hashes)
+        if not select_rows:
+            LOG.info("{} | {} | PDFs Unchanged".format(proj_name, form_type))
+            METRICS.inc("forms_skipped", len(page_rows))
+            is_exported = True
+        elif len(select_rows) < len(page_rows):
+            total_forms = len(select_rows)
+        else:
+            # all forms changed, select all forms instead
+            select_rows = None
     # Continue with exporting forms in current page
     while is_exported is False and retry_count <= MAX_RETRY:
+        # the export carries on from this page if the session lapsed
+        SESSION.check(browser)
         # export all forms in current page
         is_exported = do_export_forms_pdf_main(
-            browser, form_type, target_folder, proj_name, 1, 1, archive
+            browser,
+            form_type,
+            target_folder,
+            proj_name,
+            1,
+            1,
+            archive,
+            total_forms,
+            select_rows,
+            [h for _, h in page_rows],
         )
         if is_exported is False:
             try:
@@ -917,6 +4546,7 @@ def single_page_export_forms_pdf(
                             form_type, retry_count + 1, MAX_RETRY
                         )
                     )
+                METRICS.inc("retries", step="pdf")
                 # increase retry count by 1
                 retry_count += 1
             except (
@@ -926,24 +4556,31 @@ def single_page_export_forms_pdf(
             ):
                 LOG.warning(not_found_msg(cur_item))
         else:
-            # if export is successful, set pdfs_exported to True
-            EXPORT_LOG[proj_name]["forms"][form_type]["pdfs_exported"] = True
             # update export log with total exported forms
-            EXPORT_LOG[proj_name]["forms"][form_type][
-                "total_exported_forms"
-            ] += total_forms
+            add_exported_forms(proj_name, form_type, total_forms)
     if retry_count >= MAX_RETRY:
         LOG.warning(
             "Export PDF > {} | Max Retry: {} reached!".format(form_type, MAX_RETRY)
         )
         LOG.warning("Skipping to next form type...")
         # add page to pdfs export error list
-        error_page_list = EXPORT_LOG[proj_name]["forms"][form_type]["pdfs_export_error"]
-        error_page_list.append({"page": 1, "error": not_found_msg(cur_item)})
+        add_pdfs_export_error(proj_name, form_type, 1, not_found_msg(cur_item))
+    # pdfs are exported once the page is on disk without errors
+    update_pdfs_done(proj_name, form_type, queued=True)
 
 
+@traced
 def do_export_forms_pdf_main(
-    browser, form_type, target_folder, proj_name, page, total_pages, archive=False
+    browser,
+    form_type,
+    target_folder,
+    proj_name,
+    page,
+    total_pages,
+    archive=False,
+    page_total_forms=0,
+    select_rows=None,
+    row_hashes=(),
 ):
     """
     Function to select all forms in current page and export to pdf
@@ -953,17 +4590,22 @@ def do_export_forms_pdf_main(
         browser (Webdriver): Webdriver object
         target_folder (str): str of target folder to move the pdfs zip file to
         archive (bool, optional): is form archived?
+        page_total_forms (int, optional): number of forms in current page
+        select_rows (list, optional): indexes of the rows to select instead of
+        selecting all forms in current page
+        row_hashes (list, optional): hashes of the rows in current page, to
+        record once the page is on disk
     """
     cur_item = (None, None)
     # set wait for default webdriver wait time
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, DEFAULT_WEBDRIVER_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     action = ActionChains(browser)
     # wait till page is loaded
     wait.until(EC.presence_of_element_located((By.XPATH, table_rows)))
     # set wait for element wait time
-    wait = WebDriverWait(
+    wait = LearnedWait(
         browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
     )
     LOG.info(
@@ -971,15 +4613,36 @@ def do_export_forms_pdf_main(
             proj_name, form_type, page, total_pages
         )
     )
+    METRICS.set_status(page=page)
     try:
-        # click the select all checkbox
-        cur_item = ("Select all", "checkbox")
-        select_all = wait.until(
-            EC.presence_of_element_located((By.XPATH, select_all_box))
+        if select_rows is None:
+            # click the select all checkbox
+            cur_item = ("Select all", "checkbox")
+            select_all = wait.until(
+                EC.presence_of_element_located((By.XPATH, select_all_box))
+            )
+            action.click(select_all).perform()
+            LOG.debug(found_msg(cur_item))
+            is_selected = EC.element_located_to_be_selected((By.XPATH, select_all_box))
+        else:
+            # click the checkbox of each row to export
+            cur_item = ("Row", "checkbox")
+            checkbox = click_rows(browser, select_rows)
+            LOG.debug(found_msg(cur_item))
+            is_selected = EC.element_to_be_selected(checkbox)
+        # wait till the forms are selected and the menu is enabled
+        if archive is True:
+            menu_xpath = archive_export_pdf
+        else:
+            menu_xpath = three_dots
+        wait_for_ui(
+            browser,
+            EC.all_of(
+                is_selected,
+                EC.element_to_be_clickable((By.XPATH, menu_xpath)),
+            ),
+            LONGER_DELAY,
         )
-        action.click(select_all).perform()
-        LOG.debug(found_msg(cur_item))
-        time.sleep(LONGER_DELAY)  # give time for page to load
         # if form is archived
         if archive is True:
             cur_item = ("Export to PDF", "btn")
@@ -1005,14 +4668,14 @@ def do_export_forms_pdf_main(
                     )
                     action.click(menu_btn).perform()
                     LOG.debug(found_msg(cur_item))
-                    time.sleep(SHORT_DELAY)  # give time for tippy box to load
                     # check if tippy box is present
                     cur_item = ("Tippy Box", "div")
-                    wait = WebDriverWait(browser, ELEMENT_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS)
-                    wait.until(
+                    wait_for_ui(
+                        browser,
                         EC.visibility_of_element_located(
                             (By.XPATH, "{}".format(tippy_box))
-                        )
+                        ),
+                        SHORT_DELAY,
                     )
                     LOG.debug(found_msg(cur_item))
                     is_tippy_box = True
@@ -1029,59 +4692,110 @@ def do_export_forms_pdf_main(
                     is_tippy_box = False
                     is_export_pdf_btn = False
         # do sub function to export pdfs
-        is_exported = do_export_forms_pdf_sub(browser, target_folder)
+        page_record = {
+            "proj_name": proj_name,
+            "form_type": form_type,
+            "page": page,
+            "total_pages": total_pages,
+            "total_forms": page_total_forms,
+            "row_hashes": list(row_hashes),
+        }
+        is_exported = do_export_forms_pdf_sub(browser, target_folder, page_record)
     except (TimeoutException, StaleElementReferenceException, NoSuchElementException):
         LOG.warning(not_found_msg(cur_item))
         is_exported = False
     return is_exported
 
 
-def do_export_forms_pdf_sub(browser, target_folder):
+def do_export_forms_pdf_sub(browser, target_folder, page_record):
+    """
+    Function to export selected forms to pdf from the export modal
+
+    Args:
+        browser (Webdriver): Webdriver object
+        target_folder (str): str of target folder to move the pdfs zip file to
+        page_record (dict): project, form type, page and number of forms of
+        the exported page, to record in the export state
+    """
     cur_item = (None, None)
+    download_dir = None
     try:
         cur_item = ("Export modal", "div")
         # try and wait for export modal to be present
-        wait = WebDriverWait(
+        wait = LearnedWait(
             browser, MENU_WAIT_TIME, ignored_exceptions=IGNORED_EXCEPTIONS
         )
         wait.until(EC.presence_of_element_located((By.XPATH, export_modal)))
-        # loop through all the checkbox items and get the checkboxes
+        # tick all the export option checkboxes in one go
         action = ActionChains(browser)
-        for name, checkbox_xpath in checkboxes_xpath_dict.items():
-            cur_item = (name, "checkbox")
-            checkbox = browser.find_element(By.XPATH, "{}".format(checkbox_xpath))
-            # use action to click checkbox
-            action.click(checkbox).perform()
-            LOG.debug(found_msg(cur_item))
+        cur_item = (", ".join(checkboxes_xpath_dict), "checkbox")
+        check_checkboxes(browser, checkboxes_xpath_dict)
+        LOG.debug(found_msg(cur_item))
         # get export btn to export
         cur_item = ("Export", "btn")
         export_btn = browser.find_element(By.XPATH, "{}".format(export_btn_xpath))
+        # download the pdfs into a folder of its own
+        download_dir = create_download_dir(browser, "pdf")
+        if DOWNLOAD_POOL.enabled:
+            # drop network events from before the export
+            browser.get_log("performance")
         # get export btn if span text is Export
         # inside toolbar btns
         # use action to click export btn
         action.click(export_btn).perform()
         LOG.debug(found_msg(cur_item))
-        # downloaded zip file name should be in this format:
-        # SYNCHRO_export_yyyy_mm_dd.zip
-        pdfs_file_name = "SYNCHRO_export_{}.zip".format(time.strftime("%Y_%m_%d"))
-        # wait for pdfs zip file to be downloaded
-        download_completed, new_file_name = await_download_complete(pdfs_file_name)
+        if DOWNLOAD_POOL.enabled:
+            # hand off the download to the download pool and move on
+            download = capture_download(
+                browser,
+                TIMEOUTS.download_timeouts(
+                    "pdf", page_record["form_type"], page_record["total_forms"]
+                )[1],
+            )
+            if download is DownloadStart.NOT_STARTED:
+                # don't wait for the browser download to start again
+                LOG.warning("Download failed!")
+                return False
+            if download is not DownloadStart.IN_BROWSER:
+                update_pdfs_done(page_record["proj_name"], page_record["form_type"], 1)
+                DOWNLOAD_POOL.submit(
+                    page_record["proj_name"],
+                    page_record["form_type"],
+                    download["url"],
+                    browser.get_cookies(),
+                    target_folder,
+                    download["file_name"],
+                    lambda exported_files: record_exported_page(
+                        page_record, target_folder, exported_files
+                    ),
+                    lambda error: record_failed_page(page_record, error),
+                )
+                return True
+        # downloaded file is a zip of pdfs (SYNCHRO_export_yyyy_mm_dd.zip)
+        # or a single pdf, wait for it to be downloaded
+        download_completed, pdfs_file_name = await_download_complete(
+            download_dir,
+            (".zip", ".pdf"),
+            page_record["form_type"],
+            page_record["total_forms"],
+        )
         if download_completed:
-            if new_file_name:
-                # rename pdfs file name to new file name if any
-                pdfs_file_name = new_file_name
-            # get the file extension
-            pdfs_file_name_ext = os.path.splitext(pdfs_file_name)[-1]
-            # if file extension is zip, unzip the file
-            if pdfs_file_name_ext == ".zip":
-                # move the pdfs zip file to project folder
-                move_file_to_target_folder(target_folder, pdfs_file_name)
-                new_file_path = os.path.join(target_folder, pdfs_file_name)
-                # unzip the pdfs zip file in form type folder
-                extract_file(new_file_path, target_folder)
-            else:
-                # move the pdf file to project folder
-                move_file_to_target_folder(target_folder, pdfs_file_name)
+            # unzip or move the pdfs into the form type folder in the
+            # background, the browser goes on with the next export
+            update_pdfs_done(page_record["proj_name"], page_record["form_type"], 1)
+            POSTPROCESS.submit(
+                page_record["proj_name"],
+                page_record["form_type"],
+                download_dir,
+                pdfs_file_name,
+                target_folder,
+                lambda exported_files: record_exported_page(
+                    page_record, target_folder, exported_files
+                ),
+                lambda error: record_failed_page(page_record, error),
+            )
+            # download folder is removed by the pipeline
+            download_dir = None
             return True
         else:
             LOG.warning("Download failed!")
@@ -1089,63 +4803,199 @@ def do_export_forms_pdf_sub(browser, target_folder):
     except (TimeoutException, StaleElementReferenceException, NoSuchElementException):
         LOG.warning(not_found_msg(cur_item))
         return False
+    finally:
+        remove_download_dir(download_dir)
+
 
-def await_download_complete(file_name, timeout=1200, sleep_frequency=1):
+def add_exported_forms(proj_name, form_type, forms):
+    """Count exported forms of the form type, pages are recorded on many threads"""
+    with EXPORT_LOG_LOCK:
+        EXPORT_LOG[proj_name]["forms"][form_type]["total_exported_forms"] += forms
+
+
+def update_pdfs_done(proj_name, form_type, pages=0, queued=False):
     """
-    Waits for a download to complete, returns True if download completed,
-    False otherwise.
+    Count the pages of the form type handed off and not recorded yet, the
+    form type's pdfs are exported once all its pages are handed off (queued)
+    and recorded without errors
 
     Args:
-        file_name (string): file name to wait for.
-        timeout (int, optional): await download timeout in seconds.
-        Defaults to 600.
-        sleep_frequency (int, optional): how long to wait in seconds.
-        Defaults to 1.
+        proj_name (str): project name
+        form_type (str): form type name
+        pages (int, optional): pages handed off, -1 when a page is recorded
+        queued (bool, optional): all pages of the form type are handed off
     """
-    LOG.debug("Downloading: {}".format(file_name))
+    key = (proj_name, form_type)
+    with EXPORT_LOG_LOCK:
+        pending = PENDING_PAGES.setdefault(key, {"pages": 0, "queued": False})
+        pending["pages"] += pages
+        pending["queued"] = pending["queued"] or queued
+        if not pending["queued"] or pending["pages"] > 0:
+            return
+        del PENDING_PAGES[key]
+        form_log = EXPORT_LOG[proj_name]["forms"][form_type]
+        if form_log["pdfs_export_error"]:
+            return
+        form_log["pdfs_exported"] = True
+        excel_exported = form_log["excel_exported"]
+    STATE_STORE.set_pdfs_done(proj_name, form_type)
+    if excel_exported:
+        METRICS.inc("form_types_done")
+
+
+def pop_failed_pages(proj_name):
+    """Return and reset number of pages of the project failed in the background"""
+    with EXPORT_LOG_LOCK:
+        return FAILED_PAGES.pop(proj_name, 0)
+
+
+def record_exported_page(page_record, target_folder, exported_files):
+    """Record exported page and its files in export state"""
+    STATE_STORE.set_page_done(
+        page_record["proj_name"],
+        page_record["form_type"],
+        page_record["page"],
+        page_record["total_pages"],
+        page_record["total_forms"],
+        [
+            output_rel_path(os.path.join(target_folder, file_name))
+            for file_name in exported_files
+        ],
+    )
+    # rows are only known as exported once their files are on disk
+    STATE_STORE.add_row_hashes(
+        page_record["proj_name"], page_record["form_type"], page_record["row_hashes"]
+    )
+    METRICS.inc("pages_done")
+    METRICS.inc("forms_exported", page_record["total_forms"])
+    update_pdfs_done(page_record["proj_name"], page_record["form_type"], -1)
 
-    # Extract the expected file extension from the provided file name
-    expected_extension = os.path.splitext(file_name)[1]
 
-    event_handler = DownloadHandler(file_name)
-    observer = Observer()
-    observer.schedule(event_handler, path=TEMP_OUTPUT_PATH, recursive=False)
-    observer.start()
+def record_failed_page(page_record, error):
+    """
+    Undo a page counted as exported whose download or processing failed, its
+    project is exported again from the failed pages
+    """
+    proj_name = page_record["proj_name"]
+    form_type = page_record["form_type"]
+    LOG.warning(
+        "Export PDF > {} | Page: {}/{} | Download Failed! {}".format(
+            form_type, page_record["page"], page_record["total_pages"], error
+        )
+    )
+    with EXPORT_LOG_LOCK:
+        form_log = EXPORT_LOG[proj_name]["forms"][form_type]
+        form_log["total_exported_forms"] -= page_record["total_forms"]
+        form_log["pdfs_exported"] = False
+        form_log["pdfs_export_error"].append(
+            {"page": page_record["page"], "error": str(error)}
+        )
+        FAILED_PAGES[proj_name] = FAILED_PAGES.get(proj_name, 0) + 1
+    STATE_STORE.set_pdfs_failed(proj_name, form_type)
+    update_pdfs_done(proj_name, form_type, -1)
+
 
+@traced
+def capture_download(browser, timeout=DOWNLOAD_START_TIMEOUT):
+    """
+    Capture the url of the download started by the browser from its network
+    events and cancel the browser download, returns dict with url and file
+    name, DownloadStart.IN_BROWSER if the download can't be fetched outside
+    the browser, DownloadStart.NOT_STARTED if no download started in time.
+    """
     start_time = time.time()
-    
-    while not event_handler.download_completed:
-        if time.time() - start_time > timeout:
-            LOG.error("Download timeout exceeded.")
-            return (False, None)
-        time.sleep(sleep_frequency)
-
-    observer.stop()
-    observer.join()
-
-    # If the expected filename does not match, check the file extension
-    downloaded_file_name = event_handler.downloaded_file_name
-    if downloaded_file_name:
-        downloaded_extension = os.path.splitext(downloaded_file_name)[1]
-        
-        # Handle files still downloading (like .crdownload)
-        if downloaded_extension == '.crdownload':
-            LOG.warning("Download is still in progress with a temporary extension (.crdownload).")
-            return (False, downloaded_file_name)
-
-        if downloaded_extension == expected_extension:
-            LOG.info("Downloaded file extension matches expected extension.")
-            return (True, downloaded_file_name)
-        else:
-            LOG.warning(
-                "Downloaded file extension mismatch! Expected: {} | Actual: {}".format(
-                    expected_extension, downloaded_extension
-                )
-            )
-            return (False, downloaded_file_name)
-    else:
-        LOG.error("No file was downloaded.")
+    while time.time() - start_time < timeout:
+        for entry in browser.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            if message["method"] != "Browser.downloadWillBegin":
+                continue
+            params = message["params"]
+            if params["url"].startswith(("blob:", "data:")):
+                # generated in the page, leave it to the browser
+                LOG.debug("Download not handed off: {}".format(params["url"][:50]))
+                return DownloadStart.IN_BROWSER
+            browser.execute_cdp_cmd("Browser.cancelDownload", {"guid": params["guid"]})
+            LOG.debug("Download handed off: {}".format(params["url"]))
+            return {"url": params["url"], "file_name": params["suggestedFilename"]}
+        time.sleep(SHORT_DELAY)
+    LOG.warning("Download not started after {}s!".format(timeout))
+    return DownloadStart.NOT_STARTED
+
+
+@traced
+def await_download_complete(download_dir, extensions, form_type=None, forms=1):
+    """
+    Waits for a download to complete, returns True and the downloaded file
+    name if download completed, False otherwise.
+
+    Args:
+        download_dir (string): download folder of the export to wait for.
+        extensions (tuple): expected file extensions of the download.
+        form_type (str, optional): form type exported, to learn its timeouts.
+        forms (int, optional): number of forms exported, the download
+        timeout is scaled by it with --adaptive-timeouts. Defaults to 1.
+    """
+    LOG.debug("Downloading into: {}".format(download_dir))
+    kind = "excel" if ".xlsx" in extensions else "pdf"
+    timeout, start_timeout = TIMEOUTS.download_timeouts(kind, form_type, forms)
+    start_time = time.time()
+    downloaded_file_name = DOWNLOAD_TRACKER.wait(
+        download_dir, timeout=timeout, start_timeout=start_timeout
+    )
+    if downloaded_file_name is None:
         return (False, None)
+    started_at = DOWNLOAD_TRACKER.get_started_at(download_dir)
+    TIMEOUTS.observe_download(
+        kind,
+        form_type,
+        forms,
+        started_at - start_time if started_at else None,
+        time.time() - start_time,
+    )
+    downloaded_extension = os.path.splitext(downloaded_file_name)[1]
+    if downloaded_extension.lower() in extensions:
+        return (True, downloaded_file_name)
+    else:
+        LOG.warning(
+            "Downloaded file extension mismatch! Expected: {} | Actual: {}".format(
+                " / ".join(extensions), downloaded_extension
+            )
+        )
+        return (False, downloaded_file_name)
+
+
+def create_download_dir(browser, prefix):
+    """
+    Create a unique download folder for an export and set it as the
+    browser's download folder, so the downloaded file belongs to the export
+
+    Args:
+        browser (WebDriver): Selenium webdriver object
+        prefix (str): prefix of the folder name, e.g. export type
+    """
+    download_dir = tempfile.mkdtemp(prefix="{}_".format(prefix), dir=get_download_dir())
+    # track the download folder before the download can start
+    DOWNLOAD_TRACKER.register(download_dir)
+    # events enabled for the download pool to capture Browser.downloadWillBegin
+    browser.execute_cdp_cmd(
+        "Browser.setDownloadBehavior",
+        {"behavior": "allow", "downloadPath": download_dir, "eventsEnabled": True},
+    )
+    LOG.debug("Download folder: {}".format(download_dir))
+    return download_dir
+
+
+def remove_download_dir(download_dir):
+    """Remove export download folder with any leftover files"""
+    if download_dir:
+        DOWNLOAD_TRACKER.unregister(download_dir)
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+
+def get_download_dir():
+    """Return the download folder of the browser used by the current worker"""
+    return getattr(WORKER, "download_dir", TEMP_OUTPUT_PATH)
+
 
 def found_msg(cur_item):
     """Return found message"""
@@ -1157,9 +5007,10 @@ def not_found_msg(cur_item):
     return "[{}] {} not found".format(cur_item[0], cur_item[1])
 
 
-def move_file_to_target_folder(target_folder, file_name):
-    """Move file to target folder"""
-    org_file_path = os.path.join(TEMP_OUTPUT_PATH, file_name)
+@traced
+def move_file_to_target_folder(target_folder, file_name, download_dir=None):
+    """Move file from download folder to target folder"""
+    org_file_path = os.path.join(download_dir or get_download_dir(), file_name)
     new_file_path = os.path.join(target_folder, file_name)
     # replace the file if it already exists
     if os.path.exists(new_file_path):
@@ -1168,28 +5019,203 @@ def move_file_to_target_folder(target_folder, file_name):
     LOG.debug("Moved: {}\nTo: {}".format(org_file_path, new_file_path))
 
 
-def extract_file(file_abs_path, target_folder):
-    """Extract contents of zip file"""
-    # file_name = os.path.basename(file_abs_path)
+@traced
+def extract_file(file_abs_path, target_folder, workers=EXTRACT_WORKERS):
+    """
+    Extract contents of zip file into target folder, members are streamed
+    in parallel threads and their CRC checked, returns list of extracted
+    file names
+
+    Raises:
+        BadZipFile: BadZipFile when the zip or a member CRC is invalid
+    """
     LOG.debug("Extracting: {}".format(file_abs_path))
-    # unzip the file
     with ZipFile(file_abs_path, "r") as zipObj:
-        # Extract all the contents of zip file in current directory
-        zipObj.extractall(target_folder)
+        members = [info for info in zipObj.infolist() if not info.is_dir()]
+    # spread the members over the threads, largest first
+    members.sort(key=lambda info: info.file_size, reverse=True)
+    workers = max(1, min(workers, len(members)))
+    member_groups = [members[i::workers] for i in range(workers)]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            extracted = executor.map(
+                lambda group: extract_members(file_abs_path, group, target_folder),
+                member_groups,
+            )
+            file_names = [name for names in extracted for name in names]
+    else:
+        file_names = extract_members(file_abs_path, members, target_folder)
     # delete the zip file
     os.remove(file_abs_path)
     LOG.debug("Extracted: {}".format(file_abs_path))
+    return file_names
+
+
+def extract_members(file_abs_path, members, target_folder):
+    """Stream zip members into target folder with a zip handle of their own"""
+    target_root = os.path.realpath(target_folder)
+    file_names = []
+    with ZipFile(file_abs_path, "r") as zipObj:
+        for info in members:
+            file_path = os.path.realpath(os.path.join(target_root, info.filename))
+            # don't let member paths escape the target folder
+            if not file_path.startswith(target_root + os.sep):
+                raise BadZipFile("Unsafe member path: {}".format(info.filename))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # part file of its own, other zips may extract the same member
+            fd, part_path = tempfile.mkstemp(
+                prefix=os.path.basename(file_path) + ".",
+                suffix=".part",
+                dir=os.path.dirname(file_path),
+            )
+            # zipfile checks the member CRC when the end of the member is read
+            try:
+                with zipObj.open(info) as src, open(fd, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            except BadZipFile:
+                os.remove(part_path)
+                raise
+            os.replace(part_path, file_path)
+            file_names.append(info.filename)
+    return file_names
+
+
+def hash_file(file_path):
+    """Return sha256 and size of file"""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return (sha256.hexdigest(), os.path.getsize(file_path))
+
+
+def check_file(file_path, sha256=None, size=None):
+    """
+    Check an exported file is complete and opens, returns the error found or
+    None. pdfs need their header and end of file marker, zips and xlsx files
+    their member CRCs.
+    """
+    if not os.path.isfile(file_path):
+        return "Missing"
+    if size is not None and os.path.getsize(file_path) != size:
+        return "Size mismatch"
+    if sha256 is not None and hash_file(file_path)[0] != sha256:
+        return "Checksum mismatch"
+    extension = os.path.splitext(file_path)[-1].lower()
+    try:
+        if extension == ".pdf":
+            with open(file_path, "rb") as f:
+                if b"%PDF-" not in f.read(1024):
+                    return "Not a PDF"
+                # end of file marker is within the last 1kB
+                f.seek(max(0, os.path.getsize(file_path) - 1024))
+                if b"%%EOF" not in f.read():
+                    return "Truncated PDF"
+        elif extension in (".zip", ".xlsx"):
+            with ZipFile(file_path) as zipObj:
+                if zipObj.testzip() is not None:
+                    return "Bad CRC"
+                if extension == ".xlsx" and "xl/workbook.xml" not in zipObj.namelist():
+                    return "Not an Excel workbook"
+    except (OSError, BadZipFile) as e:
+        return "Unreadable: {}".format(e)
+    return None
+
+
+def verify_form_type(job):
+    """
+    Check the files of a form type against its export state, runs in a
+    verify process
+
+    Args:
+        job (dict): form type export state from ExportStateStore.get_verify_jobs
+
+    Returns:
+        dict: excel_error (str or None), page_errors (errors by page number),
+        pdfs (number of pdfs) and files (number of files checked). The pdfs
+        of a page are only counted against its forms if attachments are not
+        exported
+    """
+    result = {
+        "proj_name": job["proj_name"],
+        "form_type": job["form_type"],
+        "excel_error": None,
+        "page_errors": {},
+        "pdfs": 0,
+        "files": 0,
+    }
+    manifest = job["manifest"]
+
+    def check(rel_path):
+        result["files"] += 1
+        return check_file(
+            os.path.join(job["output_path"], rel_path), *manifest.get(rel_path, ())
+        )
+
+    if not job["excel_done"]:
+        result["excel_error"] = "Not exported"
+    elif job["excel_file"]:
+        # form types without forms are done without an excel file
+        result["excel_error"] = check(job["excel_file"])
+    if job["total_forms"] and not job["pages"]:
+        result["page_errors"][1] = "Not exported"
+        return result
+    # pages recorded with another page size are left from older runs
+    total_pages = job["pages"][-1]["total_pages"] if job["pages"] else 0
+    pages = {
+        page["page"]: page
+        for page in job["pages"]
+        if page["total_pages"] == total_pages
+    }
+    for page_num in range(1, total_pages + 1):
+        page = pages.get(page_num)
+        if page is None:
+            result["page_errors"][page_num] = "Not exported"
+            continue
+        errors = [
+            "{}: {}".format(file, error)
+            for file, error in ((file, check(file)) for file in page["files"])
+            if error
+        ]
+        pdfs = len([file for file in page["files"] if file.lower().endswith(".pdf")])
+        result["pdfs"] += pdfs
+        if job["count_pdfs"] and pdfs < page["total_forms"]:
+            errors.append("{} of {} PDFs".format(pdfs, page["total_forms"]))
+        if errors:
+            result["page_errors"][page_num] = ", ".join(errors)
+    return result
+
+
+def get_project_id(project_url):
+    """
+    Return the project id of a project url (https://<host>/<project id>/home)
+
+    Raises:
+        ValueError: ValueError when the url is not a project url
+    """
+    match = re.match(r"/([^/]+)/home(/|$)", urlparse(project_url).path)
+    if match is None:
+        raise ValueError("Not a Project Url: {}".format(project_url))
+    return match.group(1)
+
+
+def output_rel_path(file_path):
+    """Return file path relative to the output folder"""
+    return os.path.relpath(file_path, OUTPUT_PATH)
 
 
 def get_project_name(browser):
     """Get project name"""
-    project_name = browser.find_element(By.CLASS_NAME, "description-text")
-    # get the project name from the title
-    proj_name = project_name.get_attribute("title").strip()
+    # get the project name from the title of the description text
+    proj_name = get_page_state(browser)["project_name"]
+    if proj_name is None:
+        raise NoSuchElementException(not_found_msg(("Project Name", "div")))
+    proj_name = proj_name.strip()
     LOG.info("Project Name: {}".format(proj_name))
     return proj_name
 
 
+@traced
 def load_cookies(browser, cookies):
     """Load cookies from file"""
     LOG.debug("Loading cookies...")
@@ -1201,6 +5227,8 @@ def load_cookies(browser, cookies):
     for cookie in cookies:
         browser.add_cookie(cookie)
     browser.refresh()
+    # the browser's session is as new as the cookies loaded
+    SESSION.started()
     LOG.info("Cookies Loaded!")
 
 
@@ -1221,7 +5249,7 @@ def check_cookies(cookies):
         if (
             "expiry" in cookie
             and cookie["expiry"] < int(time.time())
-            and cookie["name"] != "_gat_gtag_UA_17568443_1"
+            and cookie["name"] not in IGNORED_COOKIES
         ):
             m = "Expired cookie: {} | Expiry: {} | Current Time: {} |".format(
                 cookie["name"], cookie["expiry"], int(time.time())
@@ -1246,7 +5274,7 @@ def read_cookies():
         return cookies
 
 
-def cookies_invalid_runtime(browser, project_urls):
+def cookies_invalid_runtime(browser, project_urls, workers=WORKERS):
     """Stuff to do when a cookie invalid or cookie file not found is raised"""
     logged_in = False
     try_count = 0
@@ -1260,57 +5288,507 @@ def cookies_invalid_runtime(browser, project_urls):
             logged_in = False
             LOG.warning("Retrying Login... {}/{}".format(try_count, MAX_RETRY))
             try_count += 1
+    SESSION.started()
+    SESSION.logged_in_at = SESSION.local.session_at
+    # skip the projects, form types and pages done before the session lapsed
+    STATE_STORE.resume_since = STATE_STORE.opened_at
     # go back to main_runtime with new logged in session cookies
-    main_runtime(browser, project_urls)
+    main_runtime(browser, project_urls, workers)
 
 
-def main_runtime(browser, project_urls):
-    """Stuff to do when script is running with no errors"""
+@traced
+def export_project(browser, project_url):
+    """Export all forms data of a single project, retry on errors"""
+    proj_name = project_url
     proj_export_error = ""
-    # loop through project urls
+    retry_count = 0
+    relogin_count = 0
+    export_done = False
+    # export time including retries, for scheduling later runs, only if all
+    # forms are exported, not in resumed or incremental runs
+    start_time = time.time()
+    full_export = not STATE_STORE.resume and not STATE_STORE.incremental
+    while export_done is False and retry_count <= MAX_RETRY:
+        try:
+            SESSION.check(browser)
+            # navigate to project page
+            navigate_to_page(browser, url=project_url)
+            indexed_project = PROJECT_INDEX.get(project_url)
+            # get project name
+            if indexed_project is not None:
+                proj_name = indexed_project["proj_name"]
+            else:
+                proj_name = get_project_name(browser)
+            METRICS.set_status(project=proj_name, form_type="", page=0)
+            # setup export log for project
+            setup_export_log(proj_name)
+            STATE_STORE.set_project_started(project_url, proj_name)
+            # create project folder
+            proj_folder = os.path.join(OUTPUT_PATH, proj_name)
+            if not os.path.exists(proj_folder):
+                os.makedirs(proj_folder)
+            # get list of form types in project and export forms data
+            if indexed_project is not None:
+                form_types_list = get_indexed_form_types(browser, indexed_project)
+            else:
+                form_types_list = get_proj_form_types(browser)
+            export_forms_data(browser, form_types_list, proj_folder, proj_name)
+            # wait for downloads handed off by the browser and their
+            # post-processing
+            DOWNLOAD_POOL.wait(proj_name)
+            POSTPROCESS.wait(proj_name)
+            failed_pages = pop_failed_pages(proj_name)
+            if failed_pages:
+                raise PagesFailedError(
+                    "{} | {} Pages Failed to Download!".format(proj_name, failed_pages)
+                )
+            # set export_done to True if no errors
+            update_export_log(proj_name, export_done=True)
+            STATE_STORE.set_project_done(
+                project_url, time.time() - start_time if full_export else None
+            )
+            METRICS.inc("projects_done")
+            LOG.info("{} - All Data Exported!".format(proj_name))
+            export_done = True
+        except KeyboardInterrupt:
+            LOG.warning("Keyboard Interrupt!")
+            # stop the run, completed work is kept in the export state
+            raise
+        except CookiesInvalidError as e:
+            LOG.warning(e)
+            if relogin_count >= MAX_RETRY:
+                proj_export_error = str(e)
+                break
+            relogin_count += 1
+            METRICS.inc("retries", step="session")
+            try:
+                SESSION.relogin(browser)
+            except (LoginError,) + SELENIUM_ERROR as e:
+                # without a session the project can't go on, record it failed
+                LOG.error(e)
+                proj_export_error = str(e)
+                break
+            # carry on from the form type and page the session lapsed on,
+            # skipping the work done on the project since it started
+            STATE_STORE.resume_from(start_time)
+        except PagesFailedError as e:
+            proj_export_error = str(e)
+            LOG.warning(e)
+            if retry_count < MAX_RETRY:
+                LOG.warning(
+                    "Retrying Failed Pages... {}/{}".format(retry_count + 1, MAX_RETRY)
+                )
+            METRICS.inc("retries", step="pdf")
+            retry_count += 1
+            # export only the pages without files, skipping the work done on
+            # the project since it started
+            STATE_STORE.resume_from(start_time)
+        except ALL_ERRORS as e:
+            proj_export_error = str(e)
+            LOG.error(e)
+            if retry_count < MAX_RETRY:
+                LOG.warning("{} Export Failed!".format(proj_name))
+                LOG.warning("Retrying... {}/{}".format(retry_count + 1, MAX_RETRY))
+            METRICS.inc("retries", step="project")
+            retry_count += 1
+    STATE_STORE.resume_from(None)
+    if not export_done:
+        record_project_failed(proj_name, proj_export_error)
+    return export_done
+
+
+def record_project_failed(proj_name, proj_export_error):
+    """Record a project that failed to export in the export log"""
+    LOG.warning("{} Export Failed! {}".format(proj_name, proj_export_error))
+    METRICS.inc("projects_failed")
+    LOG.warning("Skipping to next project...")
+    if proj_name not in EXPORT_LOG:
+        setup_export_log(proj_name)
+    update_export_log(proj_name, proj_export_error=proj_export_error)
+
+
+def worker_runtime(worker_id, project_queue, cookies, progress, browser=None):
+    """
+    Export worker, exports projects from the shared queue in its own browser
+
+    Args:
+        worker_id (int): worker number
+        project_queue (Queue): shared queue of project urls
+        cookies (list): logged in session cookies to load into the browser
+        progress (dict): shared progress counters of the worker pool
+        browser (WebDriver, optional): logged in browser to export with, kept
+        open when the worker stops. Defaults to a new browser.
+    """
+    # every worker downloads into its own folder in the temp folder
+    WORKER.download_dir = os.path.join(TEMP_OUTPUT_PATH, "worker_{}".format(worker_id))
+    clear_folder(WORKER.download_dir)
+    own_browser = browser is None
+    try:
+        if own_browser:
+            LOG.info("Starting Browser...")
+            browser = webdriver.Chrome(
+                options=get_options(dev=DEV_MODE, download_dir=WORKER.download_dir)
+            )
+            browser.maximize_window()
+            LEAN_PROFILE.apply(browser)
+            load_cookies(browser, cookies)
+        else:
+            # the browser's session is as new as the cookies of the pool
+            SESSION.started()
+        while True:
+            try:
+                project_url = project_queue.get_nowait()
+            except queue.Empty:
+                break
+            LOG.info("Project: {}".format(project_url))
+            export_done = False
+            try:
+                export_done = export_project(browser, project_url)
+            except ALL_ERRORS as e:
+                # the worker stops, its project is recorded instead of dropped
+                record_project_failed(project_url, str(e))
+                raise
+            finally:
+                with progress["lock"]:
+                    progress["done"] += 1
+                    LOG.info(
+                        "Project {}! Projects Done: {}/{}".format(
+                            "Exported" if export_done else "Failed",
+                            progress["done"],
+                            progress["total"],
+                        )
+                    )
+                project_queue.task_done()
+    except ALL_ERRORS as e:
+        # projects left in queue are picked up by the other workers
+        LOG.error("Worker Failed!")
+        LOG.error(e)
+    finally:
+        if own_browser and browser:
+            browser.quit()
+        LOG.info("Worker Stopped!")
+
+
+def run_worker_pool(project_urls, browser, workers=WORKERS):
+    """
+    Export projects in parallel using a pool of browser sessions, the first
+    worker exports with the logged in browser, the others start their own
+    """
+    cookies = browser.get_cookies()
+    project_queue = queue.Queue()
+    for project_url in project_urls:
+        project_queue.put(project_url)
+    progress = {"lock": threading.Lock(), "done": 0, "total": len(project_urls)}
+    METRICS.add_queue("projects", project_queue.qsize)
+    # no point starting more browsers than there are projects
+    workers = min(workers, len(project_urls))
+    LOG.info("Exporting {} Projects with {} Workers...".format(len(project_urls), workers))
+    threads = []
+    for worker_id in range(1, workers + 1):
+        thread = threading.Thread(
+            target=worker_runtime,
+            args=(worker_id, project_queue, cookies, progress),
+            kwargs={"browser": browser if worker_id == 1 else None},
+            name="Worker-{}".format(worker_id),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    if not project_queue.empty():
+        LOG.error("{} Projects Not Exported!".format(project_queue.qsize()))
+        # all workers failed, record the projects left as failed
+        while not project_queue.empty():
+            record_project_failed(project_queue.get_nowait(), "All Workers Failed!")
+
+
+def clean_project_urls(project_urls):
+    """Strip the project urls, skip empty lines and already exported projects"""
+    project_urls = [
+        project_url.strip().replace("\n", "").replace("\r", "")
+        for project_url in project_urls
+    ]
+    project_urls = [project_url for project_url in project_urls if project_url]
+    if STATE_STORE.resume:
+        # skip projects already exported in a previous run
+        done_project_urls = [
+            project_url
+            for project_url in project_urls
+            if STATE_STORE.is_project_done(project_url)
+        ]
+        if done_project_urls:
+            LOG.info(
+                "Resume: Skipping {} Already Exported Projects".format(
+                    len(done_project_urls)
+                )
+            )
+        project_urls = [
+            project_url
+            for project_url in project_urls
+            if project_url not in done_project_urls
+        ]
+    return project_urls
+
+
+def main_runtime(browser, project_urls, workers=WORKERS):
+    """Stuff to do when script is running with no errors"""
+    if PROJECT_INDEX.enabled:
+        # project list from the project index, crawled first if stale
+        project_urls = PROJECT_INDEX.get_project_urls(browser)
+        if not PROJECT_INDEX.export:
+            save_cookies(browser)
+            return
+    project_urls = SCHEDULER.schedule(clean_project_urls(project_urls), workers)
+    METRICS.set_projects_total(len(project_urls))
+    export_projects(browser, project_urls, workers)
+    if VERIFIER.enabled:
+        verify_runtime(
+            project_urls, lambda urls: export_projects(browser, urls, workers)
+        )
+    LOG.info("All Projects Exported!")
+    # save cookies to file
+    save_cookies(browser)
+
+
+def export_projects(browser, project_urls, workers=WORKERS):
+    """Export the projects with the browser, or a pool of browsers"""
+    if workers > 1:
+        # export projects in parallel browsers using the logged in session
+        run_worker_pool(project_urls, browser, workers)
+    else:
+        # loop through project urls
+        for project_url in project_urls:
+            export_project(browser, project_url)
+
+
+def verify_runtime(project_urls, export):
+    """
+    Verify the exported files of the projects, re-export the gaps found once
+    and record the gaps left in the export log
+
+    Args:
+        project_urls (list): urls of the exported projects
+        export (function): exports a list of project urls
+    """
+    gaps = VERIFIER.verify(project_urls)
+    if not gaps:
+        return
+    LOG.info("Re-exporting Gaps in {} Projects...".format(len(gaps)))
+    # skip everything that passed verification, export the gaps in full
+    with STATE_STORE.resume_all():
+        export(list(gaps))
+    VERIFIER.record_gaps(VERIFIER.verify(list(gaps)))
+
+
+def http_runtime(project_urls):
+    """Export projects with the http export engine, browser only used to login"""
+    project_urls = SCHEDULER.schedule(clean_project_urls(project_urls))
+    METRICS.set_projects_total(len(project_urls))
+    http_export_projects(project_urls)
+    if VERIFIER.enabled:
+        verify_runtime(project_urls, http_export_projects)
+    LOG.info("All Projects Exported!")
+
+
+def http_export_projects(project_urls):
+    """Export the projects with the http export engine, retry on errors"""
+    # one pooled session for the whole run, cookies are set per project
+    engine = HttpExportEngine()
     for project_url in project_urls:
         retry_count = 0
         export_done = False
+        logged_out = False
+        start_time = time.time()
         while export_done is False and retry_count <= MAX_RETRY:
             try:
-                project_url = project_url.strip().replace("\n", "").replace("\r", "")
-                if not project_url:
-                    continue
-                # navigate to project page
-                navigate_to_page(browser, url=project_url)
-                # get project name
-                proj_name = get_project_name(browser)
-                # setup export log for project
-                setup_export_log(proj_name)
-                # create project folder
-                proj_folder = os.path.join(OUTPUT_PATH, proj_name)
-                if not os.path.exists(proj_folder):
-                    os.makedirs(proj_folder)
-                # get list of form types in project and export forms data
-                form_types_list = get_proj_form_types(browser)
-                export_forms_data(browser, form_types_list, proj_folder, proj_name)
-                # set export_done to True if no errors
-                EXPORT_LOG[proj_name]["export_done"] = True
-                LOG.info("{} - All Data Exported!".format(proj_name))
+                if logged_out:
+                    login_runtime()
+                    logged_out = False
+                    # carry on from the form type and batch the session lapsed on
+                    STATE_STORE.resume_from(start_time)
+                cookies = read_cookies()
+                check_cookies(cookies)
+                if SESSION.expires_soon(cookies):
+                    # log in before the session lapses in the middle of the project
+                    LOG.info("Session Expiring, Logging In...")
+                    login_runtime()
+                    cookies = read_cookies()
+                engine.set_cookies(cookies)
+                engine.export_project(project_url)
                 export_done = True
-            except KeyboardInterrupt:
-                LOG.warning("Keyboard Interrupt!")
-            except ALL_ERRORS as e:
-                proj_export_error = str(e)
+            except (CookiesInvalidError, CookiesFileNotFoundError) as e:
+                LOG.warning(e)
+                logged_out = True
+                retry_count += 1
+            except (LoginError,) + SELENIUM_ERROR as e:
+                # login browser failed, try logging in again
+                LOG.error("Login Failed! {}".format(e))
+                logged_out = True
+                METRICS.inc("retries", step="login")
+                retry_count += 1
+            except (requests.RequestException, KeyError, IndexError, ValueError) as e:
                 LOG.error(e)
                 if retry_count < MAX_RETRY:
-                    LOG.warning("{} Export Failed!".format(proj_name))
+                    LOG.warning("{} Export Failed!".format(project_url))
                     LOG.warning("Retrying... {}/{}".format(retry_count + 1, MAX_RETRY))
+                METRICS.inc("retries", step="project")
                 retry_count += 1
-        if retry_count >= MAX_RETRY:
-            LOG.warning(
-                "{} Export Failed! Max Retry: {} Reached!".format(proj_name, MAX_RETRY)
+        STATE_STORE.resume_from(None)
+        if not export_done:
+            METRICS.inc("projects_failed")
+
+
+def daemon_running():
+    """Check if the browser daemon's remote debugging endpoint is up"""
+    try:
+        return requests.get(
+            "http://127.0.0.1:{}/json/version".format(DAEMON_PORT), timeout=1
+        ).ok
+    except requests.RequestException:
+        return False
+
+
+def start_browser(attach=False):
+    """
+    Start a new browser, or attach to the browser daemon if attach is True
+    and the daemon is running
+
+    Args:
+        attach (bool, optional): attach to the browser daemon.
+        Defaults to False.
+
+    Returns:
+        Webdriver: Selenium webdriver object
+    """
+    if attach is True:
+        if daemon_running():
+            LOG.info("Attaching to Browser Daemon on Port {}...".format(DAEMON_PORT))
+            browser = webdriver.Chrome(options=get_attach_options())
+            browser.daemon_attached = True
+            LEAN_PROFILE.apply(browser)
+            return browser
+        LOG.warning("Browser Daemon not running! Starting Browser...")
+    browser = webdriver.Chrome(options=get_options(dev=DEV_MODE))
+    # maximize browser window
+    browser.maximize_window()
+    LEAN_PROFILE.apply(browser)
+    return browser
+
+
+def close_browser(browser):
+    """Quit the browser, or detach from it if it's the browser daemon"""
+    if getattr(browser, "daemon_attached", False):
+        LOG.info("Detaching from Browser Daemon...")
+    # ends the chromedriver session, chromedriver doesn't close a chrome it
+    # attached to, so the daemon's chrome keeps running
+    browser.quit()
+
+
+def daemon_runtime():
+    """Keep a logged in browser running for export runs to attach to"""
+    if daemon_running():
+        LOG.warning("Browser Daemon already running on Port {}!".format(DAEMON_PORT))
+        return
+    LOG.info("Starting Browser Daemon...")
+    browser = webdriver.Chrome(options=get_options(dev=DEV_MODE, daemon=True))
+    try:
+        browser.maximize_window()
+        LEAN_PROFILE.apply(browser)
+        try:
+            cookies = read_cookies()
+            check_cookies(cookies)
+            load_cookies(browser, cookies)
+        except (CookiesInvalidError, CookiesFileNotFoundError) as e:
+            LOG.warning(e)
+            login_optimus(browser)
+        LOG.info(
+            "Browser Daemon Ready on Port {}! Run the script with --attach to use "
+            "it, Ctrl+C to stop.".format(DAEMON_PORT)
+        )
+        # wait till stopped or chrome is closed
+        while daemon_running():
+            time.sleep(DAEMON_CHECK_INTERVAL)
+        LOG.warning("Browser Daemon Closed!")
+    except KeyboardInterrupt:
+        LOG.info("Stopping Browser Daemon...")
+    finally:
+        browser.quit()
+
+
+def get_page_metrics(browser):
+    """Return js heap size in MB, number of requests and kB transferred by page"""
+    metrics = browser.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    metrics = {metric["name"]: metric["value"] for metric in metrics}
+    resources = browser.execute_script(
+        "return performance.getEntriesByType('resource').map(r => r.transferSize)"
+    )
+    return (
+        metrics.get("JSHeapUsedSize", 0) / 1024 / 1024,
+        len(resources),
+        sum(resources) / 1024,
+    )
+
+
+def benchmark_runtime(project_urls, runs=BENCHMARK_RUNS):
+    """
+    Load the project pages with the default and the lean browser profile and
+    log the load time, js heap, requests and kB transferred of each
+
+    Args:
+        project_urls (list): list of project urls
+        runs (int, optional): number of loads of each project page per profile
+    """
+    project_urls = [url.strip() for url in project_urls if url.strip()]
+    try:
+        cookies = read_cookies()
+        check_cookies(cookies)
+    except (CookiesInvalidError, CookiesFileNotFoundError) as e:
+        # no browser is open yet, log in once for both profiles
+        LOG.warning(e)
+        login_runtime()
+        cookies = read_cookies()
+    results = {}
+    for lean in (False, True):
+        LEAN_PROFILE.enabled = lean
+        profile = "Lean" if lean else "Default"
+        LOG.info("Benchmark: {} Profile...".format(profile))
+        browser = start_browser()
+        try:
+            browser.execute_cdp_cmd("Performance.enable", {})
+            load_cookies(browser, cookies)
+            samples = []
+            for project_url in project_urls:
+                for _ in range(runs):
+                    start_time = time.time()
+                    navigate_to_page(browser, url=project_url)
+                    load_time = time.time() - start_time
+                    samples.append((load_time,) + get_page_metrics(browser))
+            results[profile] = [
+                sum(sample[i] for sample in samples) / len(samples)
+                for i in range(4)
+            ]
+        finally:
+            browser.quit()
+    LEAN_PROFILE.enabled = False
+    LOG.info("Benchmark: {} Loads per Profile".format(len(project_urls) * runs))
+    LOG.info("Profile | Load Time | JS Heap | Requests | Transferred")
+    for profile, (load_time, heap, requests_count, transferred) in results.items():
+        LOG.info(
+            "{} | {:.2f}s | {:.1f}MB | {:.0f} | {:.0f}kB".format(
+                profile, load_time, heap, requests_count, transferred
             )
-            LOG.warning("Skipping to next project...")
-            EXPORT_LOG[proj_name]["proj_export_error"] = proj_export_error
-    LOG.info("All Projects Exported!")
-    # save cookies to file
-    save_cookies(browser)
+        )
+
+
+def login_runtime():
+    """Login in a temporary browser to save new session cookies"""
+    browser = webdriver.Chrome(options=get_options(dev=DEV_MODE))
+    try:
+        browser.maximize_window()
+        login_optimus(browser)
+    finally:
+        browser.quit()
 
 
 def cleanup_runtime(browser, wait_time=5):
@@ -1321,12 +5799,38 @@ def cleanup_runtime(browser, wait_time=5):
         LOG.info("Closing Script in {}s...".format(i))
         time.sleep(1)
     try:
+        # wait for handed off downloads and stop tracking downloads
+        DOWNLOAD_POOL.stop()
+        POSTPROCESS.stop()
+        DOWNLOAD_TRACKER.stop()
+        # hard link this run's project folders into a snapshot, its errors
+        # don't stop the rest of the cleanup
+        try:
+            CONTENT_STORE.snapshot(list(EXPORT_LOG))
+        except OSError as e:
+            LOG.error("Snapshot Failed! {}".format(e))
+        # stop serving metrics and log the final status
+        METRICS.stop()
+        # save the observed times and log the learned timeouts
+        TIMEOUTS.save()
+        if TIMEOUTS.enabled:
+            TIMEOUTS.summary()
+        # close export state
+        STATE_STORE.close()
+        # write trace and log where the time went
+        TRACER.stop()
+        # report time saved by waiting for ui conditions
+        LOG.info(
+            "Time Saved by UI Condition Waits: {:.0f}s ({} Waits)".format(
+                WAIT_STATS["saved"], WAIT_STATS["waits"]
+            )
+        )
         # write errors during runtime of export to file
         write_export_log_to_file(EXPORT_LOG)
         # try to close browser
         LOG.info("Closing Browser...")
         if browser:
-            browser.quit()
+            close_browser(browser)
         LOG.info("Good Bye!")
         sys.exit(0)
     except CatchErrors as e:
@@ -1337,47 +5841,65 @@ def cleanup_runtime(browser, wait_time=5):
 
 def setup_export_log(proj_name, form_type=None):
     """Setup the error log for each form type"""
-    # setup the form_type error log
-    if proj_name not in EXPORT_LOG:
-        if not form_type:
-            EXPORT_LOG[proj_name] = {
-                "export_done": False,
-                "proj_export_error": "",
-                "forms": {},
-            }
-        else:
-            EXPORT_LOG[proj_name] = {
-                "export_done": False,
-                "proj_export_error": "",
-                "forms": {
-                    form_type: {
-                        "total_forms": 0,
-                        "total_exported_forms": 0,
-                        "forms_export_error": "",
-                        "excel_exported": False,
-                        "excel_export_error": "",
-                        "pdfs_exported": False,
-                        "pdfs_export_error": [],
-                    }
-                },
-            }
-    else:
-        if not form_type:
-            EXPORT_LOG[proj_name] = {
-                "export_done": False,
-                "proj_export_error": "",
-                "forms": {},
-            }
+    with EXPORT_LOG_LOCK:
+        # setup the form_type error log
+        if proj_name not in EXPORT_LOG:
+            if not form_type:
+                EXPORT_LOG[proj_name] = {
+                    "export_done": False,
+                    "proj_export_error": "",
+                    "forms": {},
+                }
+            else:
+                EXPORT_LOG[proj_name] = {
+                    "export_done": False,
+                    "proj_export_error": "",
+                    "forms": {
+                        form_type: {
+                            "total_forms": 0,
+                            "total_exported_forms": 0,
+                            "forms_export_error": "",
+                            "excel_exported": False,
+                            "excel_export_error": "",
+                            "pdfs_exported": False,
+                            "pdfs_export_error": [],
+                        }
+                    },
+                }
         else:
-            EXPORT_LOG[proj_name]["forms"][form_type] = {
-                "total_forms": 0,
-                "total_exported_forms": 0,
-                "forms_export_error": "",
-                "excel_exported": False,
-                "excel_export_error": "",
-                "pdfs_exported": False,
-                "pdfs_export_error": [],
-            }
+            if not form_type:
+                EXPORT_LOG[proj_name] = {
+                    "export_done": False,
+                    "proj_export_error": "",
+                    "forms": {},
+                }
+            else:
+                EXPORT_LOG[proj_name]["forms"][form_type] = {
+                    "total_forms": 0,
+                    "total_exported_forms": 0,
+                    "forms_export_error": "",
+                    "excel_exported": False,
+                    "excel_export_error": "",
+                    "pdfs_exported": False,
+                    "pdfs_export_error": [],
+                }
+
+
+def update_export_log(proj_name, form_type=None, **values):
+    """Set values of the project's, or the form type's, export log"""
+    with EXPORT_LOG_LOCK:
+        log = EXPORT_LOG[proj_name]
+        if form_type:
+            log = log["forms"][form_type]
+        log.update(values)
+
+
+def add_pdfs_export_error(proj_name, form_type, page, error):
+    """Add a page failed to export to the form type's export log"""
+    with EXPORT_LOG_LOCK:
+        EXPORT_LOG[proj_name]["forms"][form_type]["pdfs_export_error"].append(
+            {"page": page, "error": error}
+        )
 
 
 def create_folders():
@@ -1385,16 +5907,24 @@ def create_folders():
     LOG.debug("Creating/Clearing output & temp folders...")
     if not os.path.exists(OUTPUT_PATH):
         os.makedirs(OUTPUT_PATH)
-    if not os.path.exists(TEMP_OUTPUT_PATH):
-        os.makedirs(TEMP_OUTPUT_PATH)
     if not os.path.exists(EXPORT_LOG_DIR):
         os.makedirs(EXPORT_LOG_DIR)
     # clear temp folder
-    for file in os.listdir(TEMP_OUTPUT_PATH):
-        file_path = os.path.join(TEMP_OUTPUT_PATH, file)
+    clear_folder(TEMP_OUTPUT_PATH)
+
+
+def clear_folder(folder_path):
+    """Create folder if it doesn't exist, delete all files in folder"""
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+    for file in os.listdir(folder_path):
+        file_path = os.path.join(folder_path, file)
         try:
             if os.path.isfile(file_path):
                 os.unlink(file_path)
+            elif os.path.isdir(file_path):
+                # leftover export download folders of previous runs
+                shutil.rmtree(file_path)
         except Exception as e:
             LOG.error(e)
 
@@ -1403,8 +5933,8 @@ def write_export_log_to_file(logs):
     """Write export logs to file"""
     if logs:
         LOG.debug("Saving Export Log...")
-        # write dictionary to file using json
-        with open(EXPORT_LOG_FILE, "w") as f:
+        # write dictionary to file using json, lock out workers while dumping
+        with EXPORT_LOG_LOCK, open(EXPORT_LOG_FILE, "w") as f:
             json.dump(logs, f, indent=4)
         # get the export log filename created when script started
         export_log_filename = os.path.basename(EXPORT_LOG_FILE)
@@ -1428,34 +5958,213 @@ def read_project_urls():
         return project_urls
 
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Export Synchro Forms from O1.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="number of browser sessions exporting projects in parallel "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("browser", "http"),
+        default="browser",
+        help="export through the browser ui, or through the web app's backend "
+        "api with the browser only used to login (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--download-handoff",
+        action="store_true",
+        help="hand off pdf downloads from the browser to a pool of http "
+        "connections, the browser moves on while files download",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="skip unchanged form types and only export pdfs of forms that "
+        "are new or changed since the last export",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="crawl the all projects page and every project's form types "
+        "into the project index, kept for DISCOVERY_TTL_HOURS, nothing is "
+        "exported unless --from-index is also given",
+    )
+    parser.add_argument(
+        "--from-index",
+        action="store_true",
+        help="export the projects in the project index instead of the "
+        "project urls file, skipping form type discovery on each project, "
+        "the index is crawled first if missing or stale",
+    )
+    parser.add_argument(
+        "--adaptive-timeouts",
+        action="store_true",
+        help="use timeouts learned from the times waits and downloads took in "
+        "this and past runs instead of fixed timeouts, download timeouts "
+        "scaled by the number of forms exported",
+    )
+    parser.add_argument(
+        "--keep-order",
+        action="store_true",
+        help="export projects in the order of the project urls file, instead "
+        "of longest first by their export time in past runs when running "
+        "several workers",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check the exported files of each form type against the export "
+        "state in a pool of processes after exporting, and re-export the "
+        "excel files and pdf pages that are missing or corrupt",
+    )
+    parser.add_argument(
+        "--content-store",
+        action="store_true",
+        help="store each exported file once by its content hash, with the "
+        "output folders and a snapshot of each run as hard links to it",
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="block images, fonts and analytics, turn off css animations and "
+        "run the browser in low memory mode",
+    )
+    parser.add_argument(
+        "--benchmark-lean",
+        action="store_true",
+        help="load the project pages with the default and the lean profile "
+        "and log the load time and memory of each, nothing is exported",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="record a span for each export step and webdriver command to "
+        "FILE, as a chrome trace if it ends with .json else as jsonl, and log "
+        "the top time sinks at the end of the run",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        metavar="PORT",
+        help="serve live metrics in prometheus text format on "
+        "http://127.0.0.1:PORT/metrics and a status page on / while exporting, "
+        "0 to turn off (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="start a logged in browser and keep it running for export runs "
+        "to attach to with --attach",
+    )
+    parser.add_argument(
+        "--attach",
+        action="store_true",
+        help="attach to the running browser daemon instead of starting a new "
+        "browser, detach when finished",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip projects, excel exports and pdf pages already exported "
+        "and found on disk in a previous run",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (args.discover or args.from_index) and (
+        args.engine == "http" or args.benchmark_lean
+    ):
+        # the project index is crawled and read with the export browser
+        parser.error(
+            "--discover and --from-index can't be used with --engine http "
+            "or --benchmark-lean"
+        )
+    if args.engine == "http":
+        if not API_BASE_URL:
+            # never guess the api host, requests would go to the live service
+            parser.error("--engine http needs API_BASE_URL set in the .env file")
+        if args.incremental:
+            # the api gives no form type fingerprints or changed forms
+            parser.error("--incremental can't be used with --engine http")
+    return args
+
+
 def main():
     """Main function"""
+    args = parse_args()
     msg = "DEV MODE: {}".format(env.get("dev_mode"))
     LOG.info(msg)
     # create folders if they don't exist
     create_folders()
+    # open export state, kept between runs
+    STATE_STORE.open()
+    TIMEOUTS.load()
+    STATE_STORE.resume = args.resume
+    STATE_STORE.incremental = args.incremental
+    DOWNLOAD_POOL.enabled = args.download_handoff
+    LEAN_PROFILE.enabled = args.lean
+    CONTENT_STORE.enabled = args.content_store
+    VERIFIER.enabled = args.verify
+    SCHEDULER.enabled = not args.keep_order
+    TIMEOUTS.enabled = args.adaptive_timeouts
+    PROJECT_INDEX.enabled = args.discover or args.from_index
+    PROJECT_INDEX.refresh = args.discover
+    PROJECT_INDEX.export = args.from_index
+    if args.trace:
+        TRACER.start(args.trace)
     browser = None
     try:
-        # read project urls from file
-        project_urls = read_project_urls()
+        if args.metrics_port:
+            try:
+                METRICS.start(args.metrics_port)
+            except OSError as e:
+                # export without metrics rather than not at all
+                LOG.error(
+                    "Metrics Port {} Unavailable! {}".format(args.metrics_port, e)
+                )
+        if args.daemon:
+            # keep a warm browser running till stopped
+            daemon_runtime()
+            return
+        # read project urls from file, unless taken from the project index
+        project_urls = None if PROJECT_INDEX.enabled else read_project_urls()
+        if args.benchmark_lean:
+            benchmark_runtime(project_urls)
+            return
+        if args.engine == "http":
+            # export without a browser
+            http_runtime(project_urls)
+            return
         # start webdriver only if project urls file is found
-        browser = webdriver.Chrome(options=OPTIONS)
-        # maximize browser window
-        browser.maximize_window()
-        # read cookies from file
-        cookies = read_cookies()
-        # checks cookies expiry and login if expired
-        check_cookies(cookies)
-        # load cookies into browser
-        load_cookies(browser, cookies)
+        browser = start_browser(attach=args.attach)
+        if getattr(browser, "daemon_attached", False):
+            # already logged in, checks the daemon's cookies expiry
+            check_cookies(browser.get_cookies())
+            SESSION.started()
+        else:
+            # read cookies from file
+            cookies = read_cookies()
+            # checks cookies expiry and login if expired
+            check_cookies(cookies)
+            # load cookies into browser
+            load_cookies(browser, cookies)
         # run script
-        main_runtime(browser, project_urls)
+        main_runtime(browser, project_urls, args.workers)
     except ProjectUrlsFileNotFoundError as e:
         LOG.error(e)
         LOG.error("Please ensure {} exists first!".format(PROJ_URLS_FILE))
+    except ApiResponseError as e:
+        LOG.error(e)
+        LOG.error("Please check the API paths in .env against the web app's api!")
     except (CookiesInvalidError, CookiesFileNotFoundError) as e:
         LOG.warning(e)
-        cookies_invalid_runtime(browser, project_urls)
+        cookies_invalid_runtime(browser, project_urls, args.workers)
     except KeyboardInterrupt:
         LOG.warning("Keyboard Interrupt!")
     except ALL_ERRORS as e:
@@ -0,0 +1,311 @@
+"""
+End-to-end export throughput benchmark against the local mock O1 web app.
+
+Starts 'mock_o1_server.py', runs the real export script against it once for
+each variant of script arguments, and reports forms exported per minute,
+p50/p95 latency of each traced step and peak memory of the script and its
+browsers.
+
+Usage:
+    python benchmark.py --form-types 4 --forms 120,30 \\
+        --variant "" --variant "--workers 2" --variant "--engine http"
+
+Peak memory of the whole process tree needs psutil (pip install psutil),
+without it only the largest single process is reported on linux/macos.
+"""
+import argparse
+import json
+import math
+import os
+import pickle
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from dotenv import dotenv_values
+
+import mock_o1_server
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_FILE = os.path.join(SCRIPT_DIR, "O1-Selenium-Export-Script.py")
+SAMPLE_ENV_FILE = os.path.join(SCRIPT_DIR, "sample.env")
+# interval in sec between memory samples of the script's process tree
+MEMORY_SAMPLE_INTERVAL = 0.5
+
+
+def get_script_env(base_url, work_dir, overrides=None):
+    """Environment of the export script, sample.env pointed at the mock app"""
+    script_env = dict(os.environ)
+    script_env.update(
+        {key: value for key, value in dotenv_values(SAMPLE_ENV_FILE).items() if value}
+    )
+    script_env.update(
+        {
+            "dev_mode": "false",
+            "BENTLEY_LOGIN_URL": base_url + "/login",
+            "ALL_SYNCHRO_URL": base_url + "/",
+            "PROJ_URL_PLACEHOLDER": base_url + "/",
+            "API_BASE_URL": base_url,
+            "COOKIES_FILE": os.path.join(work_dir, "cookies.pkl"),
+            "PROJ_URLS_FILE": os.path.join(work_dir, "project_urls.txt"),
+            # fail fast on the downloads the mock app drops
+            "DOWNLOAD_START_TIMEOUT": "20",
+            "DOWNLOAD_STALL_TIMEOUT": "20",
+        }
+    )
+    script_env.update(overrides or {})
+    return script_env
+
+
+def write_inputs(app, base_url, work_dir):
+    """Write the project urls and logged in cookies files of the mock app"""
+    with open(os.path.join(work_dir, "project_urls.txt"), "w") as f:
+        for project_id in app.projects:
+            f.write("{}/{}/\n".format(base_url, project_id))
+    cookies = [
+        {
+            "name": mock_o1_server.SESSION_COOKIE,
+            "value": "mock",
+            "path": "/",
+            "expiry": int(time.time()) + 365 * 24 * 3600,
+        }
+    ]
+    with open(os.path.join(work_dir, "cookies.pkl"), "wb") as f:
+        pickle.dump(cookies, f)
+
+
+def get_tree_rss(process):
+    """Total resident memory in MB of process and all of its children"""
+    total = 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total / 1024 / 1024
+
+
+def run_script(script_args, script_env, work_dir, log_file):
+    """Run the export script, returns wall time in sec and peak memory in MB"""
+    command = [sys.executable, SCRIPT_FILE] + script_args
+    start_time = time.time()
+    with open(log_file, "w") as log:
+        process = subprocess.Popen(
+            command, cwd=work_dir, env=script_env, stdout=log, stderr=subprocess.STDOUT
+        )
+        peak = {"rss": 0.0}
+        if psutil is not None:
+            tree = psutil.Process(process.pid)
+
+            def sample():
+                while process.poll() is None:
+                    try:
+                        peak["rss"] = max(peak["rss"], get_tree_rss(tree))
+                    except psutil.NoSuchProcess:
+                        break
+                    time.sleep(MEMORY_SAMPLE_INTERVAL)
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+        process.wait()
+    wall_time = time.time() - start_time
+    if psutil is None and hasattr(os, "wait4"):
+        import resource
+
+        # largest single child process, kB on linux and bytes on macos
+        max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        peak["rss"] = max_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+    return wall_time, peak["rss"], process.returncode
+
+
+def read_exported_forms(work_dir):
+    """Sum of exported forms in the export logs of the run"""
+    log_dir = os.path.join(work_dir, "Export_Logs")
+    exported_forms = 0
+    for file_name in os.listdir(log_dir) if os.path.isdir(log_dir) else []:
+        if not file_name.endswith(".log"):
+            continue
+        try:
+            with open(os.path.join(log_dir, file_name)) as f:
+                export_log = json.load(f)
+        except ValueError:
+            continue
+        for project in export_log.values():
+            for form_log in project.get("forms", {}).values():
+                exported_forms += form_log.get("total_exported_forms", 0)
+    return exported_forms
+
+
+def percentile(values, pct):
+    """Nearest rank percentile of values"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def read_trace(trace_file):
+    """
+    Durations in sec of the traced steps by step name, and the time in sec
+    from the first to the last traced event, the export time without the
+    script's start up and close down
+    """
+    steps = {}
+    first, last = None, None
+    if not os.path.exists(trace_file):
+        return steps, 0.0
+    with open(trace_file) as f:
+        for line in f:
+            event = json.loads(line)
+            first = event["ts"] if first is None else min(first, event["ts"])
+            last = max(last or 0, event["ts"] + event["dur"])
+            if event.get("cat") == "step":
+                steps.setdefault(event["name"], []).append(event["dur"] / 1e6)
+    return steps, ((last - first) / 1e6 if first is not None else 0.0)
+
+
+def run_variant(app, base_url, variant, keep=False):
+    """Run the export script with the variant's arguments and measure it"""
+    work_dir = tempfile.mkdtemp(prefix="o1_benchmark_")
+    try:
+        write_inputs(app, base_url, work_dir)
+        trace_file = os.path.join(work_dir, "trace.jsonl")
+        script_args = shlex.split(variant) + ["--trace", trace_file]
+        with app.lock:
+            stats_before = dict(app.stats)
+        wall_time, peak_rss, returncode = run_script(
+            script_args,
+            get_script_env(base_url, work_dir),
+            work_dir,
+            os.path.join(work_dir, "script_output.log"),
+        )
+        with app.lock:
+            server_stats = {
+                name: value - stats_before[name] for name, value in app.stats.items()
+            }
+        exported_forms = read_exported_forms(work_dir)
+        steps, export_time = read_trace(trace_file)
+        return {
+            "variant": variant or "(default)",
+            "returncode": returncode,
+            "wall_time": wall_time,
+            "export_time": export_time,
+            "exported_forms": exported_forms,
+            "forms_per_minute": exported_forms / export_time * 60 if export_time else 0,
+            "peak_rss_mb": peak_rss,
+            "steps": {
+                name: {
+                    "count": len(durations),
+                    "p50": percentile(durations, 50),
+                    "p95": percentile(durations, 95),
+                }
+                for name, durations in steps.items()
+            },
+            "server": server_stats,
+            "work_dir": work_dir if keep else None,
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(results, top):
+    """Print the results of each variant"""
+    total_forms = None
+    for result in results:
+        print()
+        print("Variant: {}".format(result["variant"]))
+        if result["returncode"]:
+            print("  Script exited with code {}".format(result["returncode"]))
+        print(
+            "  Exported Forms: {} in {:.1f}s ({:.1f}s total) | {:.1f} Forms/min | "
+            "Peak Memory: {:.0f}MB".format(
+                result["exported_forms"],
+                result["export_time"],
+                result["wall_time"],
+                result["forms_per_minute"],
+                result["peak_rss_mb"],
+            )
+        )
+        print(
+            "  Server: {pdf_exports} PDF Exports | {excel_exports} Excel Exports | "
+            "{failed_downloads} Failed Downloads | {ui_failures} UI Failures".format(
+                **result["server"]
+            )
+        )
+        steps = sorted(
+            result["steps"].items(),
+            key=lambda step: step[1]["p50"] * step[1]["count"],
+            reverse=True,
+        )[:top]
+        if steps:
+            print("  {:<34} {:>6} {:>9} {:>9}".format("Step", "Calls", "p50", "p95"))
+            for name, step in steps:
+                print(
+                    "  {:<34} {:>6} {:>8.2f}s {:>8.2f}s".format(
+                        name, step["count"], step["p50"], step["p95"]
+                    )
+                )
+        if result["work_dir"]:
+            print("  Output: {}".format(result["work_dir"]))
+        if total_forms is None:
+            total_forms = result["exported_forms"]
+        elif result["exported_forms"] != total_forms:
+            print("  Warning: exported forms differ from the first variant!")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the export script against the mock O1 web app."
+    )
+    mock_o1_server.add_app_args(parser)
+    parser.add_argument(
+        "--variant",
+        action="append",
+        help="export script arguments to benchmark, repeat to compare several "
+        '(default: one run with no arguments), e.g. --variant "--workers 2"',
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=12,
+        help="steps listed per variant (default: %(default)s)",
+    )
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the output folder of each run"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = mock_o1_server.create_app(args)
+    server = mock_o1_server.start_server(app)
+    base_url = "http://127.0.0.1:{}".format(server.server_port)
+    print("Mock O1 running on {}".format(base_url))
+    results = []
+    try:
+        for variant in args.variant or [""]:
+            print("Running: {}".format(variant or "(default)"))
+            results.append(run_variant(app, base_url, variant, args.keep))
+    finally:
+        server.shutdown()
+    print_report(results, args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
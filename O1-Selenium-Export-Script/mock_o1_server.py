@@ -0,0 +1,676 @@
+"""
+Local stand-in for the O1 web app, to measure export speed without hitting
+the real Bentley service.
+
+Serves a small single page app with the DOM structure the xpaths in
+'sample.env' target (work tab, form types nav bar, forms table, pagination,
+tippy menus and the export modal), a login page, and the backend api used by
+'--engine http', with zip/xlsx downloads. Form counts, latency and failure
+rates are set on the command line.
+
+The api is a shape stand-in only: it copies the placeholder paths, response
+shapes and request body the http export engine assumes, not the real O1 api.
+It gives '--engine http' something to run against for timing, it doesn't
+validate the engine in any way.
+
+Usage:
+    python mock_o1_server.py --port 8800 --projects 2 --form-types 4 --forms 120
+"""
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+# cookie set by the mock login, required by the api
+SESSION_COOKIE = "o1_session"
+# page sizes offered by the forms table
+PAGE_SIZES = (10, 25, 50, 100)
+
+
+class MockO1:
+    """Projects, form types and forms of the mock web app and its settings"""
+
+    def __init__(
+        self,
+        projects=1,
+        form_types=3,
+        forms=(60,),
+        archived=0,
+        empty=0,
+        latency=0.05,
+        render_delay=0.1,
+        export_time=0.01,
+        ui_fail_rate=0.0,
+        download_fail_rate=0.0,
+        pdf_kb=20,
+        seed=0,
+    ):
+        self.latency = latency
+        self.render_delay = render_delay
+        self.export_time = export_time
+        self.ui_fail_rate = ui_fail_rate
+        self.download_fail_rate = download_fail_rate
+        self.pdf_kb = pdf_kb
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {
+            "api_requests": 0,
+            "pdf_exports": 0,
+            "excel_exports": 0,
+            "exported_forms": 0,
+            "failed_downloads": 0,
+            "ui_failures": 0,
+        }
+        self.projects = {}
+        for p in range(1, projects + 1):
+            project_id = "proj{}".format(p)
+            types = []
+            for t in range(1, form_types + 1):
+                # last form types are the empty ones, before them the archived
+                if t > form_types - empty:
+                    state, total = "empty", 0
+                else:
+                    archived_from = form_types - empty - archived
+                    state = "archived" if t > archived_from else "active"
+                    total = forms[(t - 1) % len(forms)]
+                types.append(
+                    {
+                        "id": "ft{}".format(t),
+                        "name": "Form Type {}".format(t),
+                        "state": state,
+                        "total": total,
+                    }
+                )
+            self.projects[project_id] = {
+                "name": "Mock Project {}".format(p),
+                "form_types": types,
+            }
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+
+    def get_form_type(self, project_id, form_type_id):
+        for form_type in self.projects[project_id]["form_types"]:
+            if form_type["id"] == form_type_id:
+                return form_type
+        raise KeyError(form_type_id)
+
+    @staticmethod
+    def get_forms(project_id, form_type, start, stop):
+        """Forms of form type from index start to stop"""
+        statuses = ("Open", "Closed", "In Review")
+        return [
+            {
+                "id": "{}-{}-{:05d}".format(project_id, form_type["id"], n),
+                "title": "{} {}".format(form_type["name"], n),
+                "status": statuses[n % len(statuses)],
+                "updated": "2023-{:02d}-{:02d}".format(n % 12 + 1, n % 28 + 1),
+            }
+            for n in range(start + 1, min(stop, form_type["total"]) + 1)
+        ]
+
+    def wait(self, factor=1.0):
+        """Sleep for the configured latency, with some jitter"""
+        if self.latency:
+            time.sleep(self.latency * factor * self.random.uniform(0.5, 1.5))
+
+    def pdf_bytes(self, form_id):
+        body = bytes(self.random.getrandbits(8) for _ in range(64)) * (self.pdf_kb * 16)
+        return "%PDF-1.4\n% {}\n".format(form_id).encode() + body + b"\n%%EOF\n"
+
+    def export_pdf(self, form_ids):
+        """Return file name and content of the pdf export of the forms"""
+        if len(form_ids) == 1:
+            return "{}.pdf".format(form_ids[0]), self.pdf_bytes(form_ids[0])
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for form_id in form_ids:
+                zip_file.writestr("{}.pdf".format(form_id), self.pdf_bytes(form_id))
+        file_name = "SYNCHRO_export_{}.zip".format(time.strftime("%Y_%m_%d"))
+        return file_name, buffer.getvalue()
+
+    def export_excel(self, project_id, form_type):
+        """Return file name and content of the excel export of the form type"""
+        forms = self.get_forms(project_id, form_type, 0, form_type["total"])
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            # just enough of a workbook for the script's --verify checks
+            zip_file.writestr("[Content_Types].xml", "<Types/>")
+            zip_file.writestr("xl/workbook.xml", "<workbook/>")
+            zip_file.writestr("xl/forms.json", json.dumps(forms))
+        return "{}.xlsx".format(form_type["name"]), buffer.getvalue()
+
+
+class MockO1Handler(BaseHTTPRequestHandler):
+    """Routes requests of the browser and the http engine to the mock app"""
+
+    app = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # keep the benchmark output clean
+        pass
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def route(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            if not parts:
+                return self.send_html(render_home(self.app))
+            if parts == ["login"]:
+                return self.send_html(LOGIN_HTML)
+            if parts[0] == "api":
+                return self.route_api(method, parts[1:], query)
+            if parts[0] in self.app.projects:
+                return self.send_html(render_project(self.app, parts[0]))
+            self.send_json({"error": "Not Found"}, 404)
+        except (KeyError, ValueError) as e:
+            self.send_json({"error": str(e)}, 404)
+
+    def route_api(self, method, parts, query):
+        # placeholder endpoints copied from the http export engine, not O1's
+        if parts == ["mock", "stats"]:
+            with self.app.lock:
+                return self.send_json(dict(self.app.stats))
+        if parts == ["mock", "ui-failure"]:
+            self.app.count("ui_failures")
+            return self.send_json({})
+        if SESSION_COOKIE not in self.headers.get("Cookie", ""):
+            return self.send_json({"error": "Not Authorized"}, 401)
+        self.app.count("api_requests")
+        self.app.wait()
+        if len(parts) < 2 or parts[0] != "projects":
+            raise KeyError("/".join(parts))
+        project_id = parts[1]
+        project = self.app.projects[project_id]
+        if len(parts) == 2:
+            return self.send_json({"id": project_id, "name": project["name"]})
+        if len(parts) == 3 and parts[2] == "form-types":
+            return self.send_json(project["form_types"])
+        form_type = self.app.get_form_type(project_id, parts[3])
+        action = parts[4:]
+        if action == ["forms"]:
+            page = int(query.get("page", 1))
+            page_size = int(query.get("pageSize", 25))
+            start = (page - 1) * page_size
+            return self.send_json(
+                {
+                    "total": form_type["total"],
+                    "items": self.app.get_forms(
+                        project_id, form_type, start, start + page_size
+                    ),
+                }
+            )
+        if action == ["export", "excel"]:
+            self.app.count("excel_exports")
+            self.app.wait(2)
+            return self.send_download(*self.app.export_excel(project_id, form_type))
+        if action == ["export", "pdf"]:
+            if method == "POST":
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                form_ids = body.get("formIds", [])
+            else:
+                form_ids = [i for i in query.get("ids", "").split(",") if i]
+            if not form_ids:
+                return self.send_json({"error": "No forms selected"}, 400)
+            self.app.count("pdf_exports")
+            # generating the export takes longer with more forms
+            time.sleep(self.app.export_time * len(form_ids))
+            if self.app.random.random() < self.app.download_fail_rate:
+                self.app.count("failed_downloads")
+                return self.send_json({"error": "Export Failed"}, 500)
+            self.app.count("exported_forms", len(form_ids))
+            return self.send_download(*self.app.export_pdf(form_ids))
+        raise KeyError("/".join(parts))
+
+    def send_body(self, body, content_type, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, html):
+        self.send_body(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def send_json(self, data, status=200):
+        self.send_body(json.dumps(data).encode("utf-8"), "application/json", status)
+
+    def send_download(self, file_name, body):
+        self.send_body(
+            body,
+            "application/octet-stream",
+            headers={
+                "Content-Disposition": "attachment; filename=\"{}\"; "
+                "filename*=UTF-8''{}".format(file_name, quote(file_name))
+            },
+        )
+
+
+def render_home(app):
+    links = "".join(
+        '<li><a href="/{0}/home">{1}</a></li>'.format(project_id, project["name"])
+        for project_id, project in app.projects.items()
+    )
+    return HOME_HTML.replace("/*LINKS*/", links)
+
+
+def render_project(app, project_id):
+    config = {
+        "projectId": project_id,
+        "renderDelay": app.render_delay,
+        "uiFailRate": app.ui_fail_rate,
+        "pageSizes": PAGE_SIZES,
+    }
+    return APP_HTML.replace("/*CONFIG*/", json.dumps(config))
+
+
+def start_server(app, port=0):
+    """Start the mock server in a background thread, returns the server"""
+    handler = type("Handler", (MockO1Handler,), {"app": app})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+HOME_HTML = """<!DOCTYPE html>
+<html><head><title>All projects</title></head>
+<body><div id="app"><div>All projects</div><ul>/*LINKS*/</ul></div></body></html>
+"""
+
+LOGIN_HTML = """<!DOCTYPE html>
+<html><head><title>Sign in</title></head>
+<body><div id="login">
+<input id="identifierInput" type="email"><button id="sign-in-button">Next</button>
+</div>
+<script>
+document.getElementById("sign-in-button").onclick = function () {
+  const login = document.getElementById("login");
+  login.innerHTML = '<input id="password" type="password">' +
+    '<button id="sign-in-button">Sign in</button>';
+  document.getElementById("sign-in-button").onclick = function () {
+    document.cookie = "o1_session=mock; path=/; max-age=31536000";
+    login.innerHTML = '<div class="text device">PingID</div>';
+    setTimeout(function () {
+      login.innerHTML += '<button id="um-password-button">Change Password</button>';
+    }, 1000);
+  };
+};
+</script></body></html>
+"""
+
+# Single page app, the nesting of the divs under #app is what the absolute
+# xpaths in sample.env point to, don't change it without checking them
+APP_HTML = """<!DOCTYPE html>
+<html><head><title>Mock O1</title>
+<style>
+body { margin: 0; font: 13px sans-serif; }
+.header { height: 40px; display: flex; gap: 20px; align-items: center; padding: 0 10px; }
+.header li { display: inline-block; padding: 4px 10px; cursor: pointer; }
+.main { display: flex; }
+.side { width: 220px; }
+.bnt-link-wrapper { display: block; padding: 4px 10px; cursor: pointer; }
+.content { flex: 1; }
+.table-wrap { max-height: calc(100vh - 260px); overflow: auto; }
+tr { height: 20px; }
+.pagination span, .pagination i, .pagination button { display: inline-block; min-width: 16px; padding: 2px 6px; cursor: pointer; }
+.pagination .active { font-weight: bold; }
+.modal { position: fixed; top: 120px; left: 35%; width: 30%; background: #fff; border: 1px solid #888; padding: 10px; z-index: 900; }
+.menu { position: fixed; top: 90px; right: 40px; background: #fff; border: 1px solid #888; z-index: 1000; }
+.menu li { list-style: none; padding: 4px 12px; cursor: pointer; }
+</style></head>
+<body>
+<div id="app"><div><div>
+  <div class="header">
+    <span class="description-text" id="project-name"></span>
+    <ul><li data-key="1">Home</li><li data-key="2" id="work-tab">Work</li></ul>
+  </div>
+  <div class="main">
+    <div class="side" id="side"></div>
+    <div class="content">
+      <div id="titles"></div>
+      <div><div><div><div><div><div>
+        <div id="summary"></div>
+        <div><div>
+          <div id="modal-slot"></div>
+          <div id="form-type"></div>
+        </div></div>
+      </div></div></div></div></div></div>
+    </div>
+  </div>
+</div></div></div>
+<script>
+const CFG = /*CONFIG*/;
+const state = { formTypes: [], formType: null, page: 1, size: 25, forms: [], total: 0, selected: new Set() };
+const query = new URLSearchParams(location.search);
+
+function api(path) {
+  return fetch("/api/projects/" + CFG.projectId + path).then(function (r) {
+    if (!r.ok) { throw new Error(r.status); }
+    return r.json();
+  });
+}
+function later(fn) { setTimeout(fn, CFG.renderDelay * 1000); }
+function esc(text) {
+  return String(text).replace(/[&<>"']/g, function (c) { return "&#" + c.charCodeAt(0) + ";"; });
+}
+function uiFails() {
+  if (Math.random() < CFG.uiFailRate) {
+    fetch("/api/mock/ui-failure", { method: "POST" });
+    return true;
+  }
+  return false;
+}
+function download(path) {
+  const a = document.createElement("a");
+  a.href = "/api/projects/" + CFG.projectId + "/form-types/" + state.formType.id + path;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+}
+function closeMenu() {
+  document.querySelectorAll(".menu").forEach(function (menu) { menu.remove(); });
+}
+function openMenu(items) {
+  closeMenu();
+  const menu = document.createElement("div");
+  menu.id = "tippy-" + Date.now();
+  menu.className = "menu";
+  menu.innerHTML = "<div><div><ul>" + items.map(function (item, i) {
+    return '<li data-i="' + i + '">' + esc(item[0]) + "</li>";
+  }).join("") + "</ul></div></div>";
+  menu.querySelectorAll("li").forEach(function (li) {
+    li.onclick = function () { closeMenu(); items[li.dataset.i][1](); };
+  });
+  document.body.appendChild(menu);
+}
+document.addEventListener("keydown", function (e) { if (e.key === "Escape") { closeMenu(); } });
+
+function renderProject(project) {
+  const name = document.getElementById("project-name");
+  name.textContent = project.name;
+  name.title = project.name;
+  document.getElementById("titles").innerHTML = "<h2>My work</h2><h3 id='form-title'></h3>";
+}
+function openWork() {
+  return api("/form-types").then(function (formTypes) {
+    state.formTypes = formTypes;
+    later(function () {
+      const links = ["My work", "Work by items"].map(function (name) {
+        return '<div class="bnt-link-wrapper">' + name + "</div>";
+      }).concat(formTypes.map(function (formType) {
+        return '<div class="bnt-link-wrapper" data-id="' + formType.id + '">' + esc(formType.name) + "</div>";
+      }));
+      document.getElementById("side").innerHTML =
+        '<div class="bnt-hc-side-navigation-context-container">' +
+        '<div class="bnt-hc-side-navigation-child-item-container">' + links.join("") + "</div></div>";
+      document.querySelectorAll(".bnt-link-wrapper[data-id]").forEach(function (link) {
+        link.onclick = function () {
+          history.pushState(null, "", "?form_type=" + link.dataset.id);
+          openFormType(link.dataset.id, 1, 25);
+        };
+      });
+    });
+  });
+}
+function openFormType(formTypeId, page, size) {
+  state.formType = state.formTypes.find(function (formType) { return formType.id === formTypeId; });
+  state.page = page;
+  state.size = size;
+  document.getElementById("form-title").textContent = "";
+  document.getElementById("form-type").innerHTML = "";
+  document.getElementById("modal-slot").innerHTML = "";
+  loadPage();
+}
+function loadPage() {
+  const formType = state.formType;
+  api("/form-types/" + formType.id + "/forms?page=" + state.page + "&pageSize=" + state.size)
+    .then(function (data) {
+      state.forms = data.items;
+      state.total = data.total;
+      state.selected = new Set();
+      later(renderFormType);
+    });
+}
+function renderFormType() {
+  const formType = state.formType;
+  document.getElementById("form-title").textContent = formType.name;
+  const root = document.getElementById("form-type");
+  if (formType.state === "empty") {
+    root.innerHTML = '<div class="bnt-hc-empty-page-container">No forms</div>';
+    return;
+  }
+  const archived = formType.state === "archived";
+  const first = (state.page - 1) * state.size;
+  const pages = Math.max(1, Math.ceil(state.total / state.size));
+  const pageItems = [];
+  for (let n = 1; n <= pages; n++) {
+    if (n === 1 || n === pages || Math.abs(n - state.page) <= 2) {
+      pageItems.push('<span class="bnt-hc-pagination-page-item' + (n === state.page ? " active" : "") + '">' + n + "</span>");
+    } else if (pageItems[pageItems.length - 1] !== "<b>...</b>") {
+      pageItems.push("<b>...</b>");
+    }
+  }
+  root.innerHTML =
+    '<div class="toolbar">' +
+      (archived
+        ? '<div><div><div><button id="archive-pdf">Export to PDF</button></div><div></div>' +
+          '<div><button id="archive-excel">Export all data to Excel</button></div></div></div>' +
+          '<div><span class="bnt-hc-archived">Archived</span></div>'
+        : "<div></div><div><button class=\\"iui-button iwn-hc-adaptive-button\\">...</button></div>") +
+    "</div>" +
+    "<div><div><div><div>" +
+      "<div></div>" +
+      "<div>" +
+        '<div class="table-wrap"><table><thead><tr><th><label><input type="checkbox" id="select-all"></label></th>' +
+        "<th>Id</th><th>Title</th><th>Status</th><th>Updated</th></tr></thead><tbody>" +
+        state.forms.map(function (form, i) {
+          return '<tr><td><label><input type="checkbox" data-i="' + i + '"></label></td><td>' + esc(form.id) +
+            "</td><td>" + esc(form.title) + "</td><td>" + form.status + "</td><td>" + form.updated + "</td></tr>";
+        }).join("") +
+        "</tbody></table></div>" +
+        '<div class="pagination">' +
+          '<div class="btn-hc-pagination-page-tracker">' + (first + 1) + "-" + (first + state.forms.length) + " of " + state.total + "</div>" +
+          '<div class="btn-hc-pagination-page-size"><button>' + state.size + " per page</button></div>" +
+          pageItems.join("") +
+          '<i class="svg-icon btn-hc-pagination-next-page-button">&gt;</i>' +
+        "</div>" +
+      "</div>" +
+    "</div></div></div></div>";
+  const selectAll = document.getElementById("select-all");
+  const boxes = root.querySelectorAll("tbody input");
+  selectAll.onchange = function () {
+    boxes.forEach(function (box) { box.checked = selectAll.checked; });
+    state.selected = new Set(selectAll.checked ? state.forms.map(function (form) { return form.id; }) : []);
+  };
+  boxes.forEach(function (box) {
+    box.onchange = function () {
+      const formId = state.forms[box.dataset.i].id;
+      if (box.checked) { state.selected.add(formId); } else { state.selected.delete(formId); }
+      selectAll.checked = state.selected.size === state.forms.length;
+    };
+  });
+  root.querySelectorAll(".bnt-hc-pagination-page-item").forEach(function (item) {
+    item.onclick = function () { goPage(parseInt(item.textContent, 10)); };
+  });
+  root.querySelector(".btn-hc-pagination-next-page-button").onclick = function () {
+    if (state.page < pages) { goPage(state.page + 1); }
+  };
+  root.querySelector(".btn-hc-pagination-page-size button").onclick = function () {
+    openMenu(CFG.pageSizes.map(function (size) {
+      return [size + " per page", function () { state.size = size; goPage(1); }];
+    }));
+  };
+  if (archived) {
+    document.getElementById("archive-pdf").onclick = openExportModal;
+    document.getElementById("archive-excel").onclick = exportExcel;
+  } else {
+    root.querySelector(".iwn-hc-adaptive-button").onclick = function () {
+      openMenu([["Export to PDF", openExportModal], ["Export all data to Excel", exportExcel]]);
+    };
+  }
+}
+function goPage(page) {
+  state.page = page;
+  loadPage();
+}
+function exportExcel() {
+  if (uiFails()) { return; }
+  later(function () { download("/export/excel"); });
+}
+function openExportModal() {
+  if (uiFails()) { return; }
+  const options = ["Form details", "Comments", "Audit trail", "Images", "Signatures", "Export attachments"];
+  const slot = document.getElementById("modal-slot");
+  later(function () {
+    // split so the script's own text doesn't match the export modal xpath
+    slot.innerHTML = '<div class="modal"><div>Include into ' + 'PDF:</div>' +
+      options.map(function (option) {
+        return '<div><label><input type="checkbox"> ' + option + "</label></div>";
+      }).join("") +
+      "<div></div><div></div><div></div>" +
+      '<div><button id="export-btn">Export</button><button id="cancel-btn">Cancel</button></div></div>';
+    document.getElementById("cancel-btn").onclick = function () { slot.innerHTML = ""; };
+    document.getElementById("export-btn").onclick = function () {
+      const ids = Array.from(state.selected);
+      slot.innerHTML = "";
+      document.querySelectorAll("tbody input, #select-all").forEach(function (box) { box.checked = false; });
+      state.selected = new Set();
+      download("/export/pdf?ids=" + encodeURIComponent(ids.join(",")));
+    };
+  });
+}
+
+api("").then(function (project) {
+  later(function () {
+    renderProject(project);
+    document.getElementById("work-tab").onclick = openWork;
+    // reloading the page keeps the open form type, back on its first page
+    // unless the page and page size are in the url
+    if (query.get("form_type")) {
+      openWork().then(function () {
+        openFormType(query.get("form_type"), parseInt(query.get("page") || "1", 10), parseInt(query.get("size") || "25", 10));
+      });
+    }
+  });
+});
+</script></body></html>
+"""
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Mock O1 web app for benchmarks.")
+    add_app_args(parser)
+    parser.add_argument("--port", type=int, default=8800, help="(default: %(default)s)")
+    return parser.parse_args()
+
+
+def add_app_args(parser):
+    """Add the mock app settings to parser, shared with the benchmark"""
+    parser.add_argument(
+        "--projects", type=int, default=1, help="(default: %(default)s)"
+    )
+    parser.add_argument(
+        "--form-types", type=int, default=3, help="per project (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--forms",
+        default="60",
+        help="forms per form type, comma separated to vary them (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--archived", type=int, default=0, help="archived form types per project"
+    )
+    parser.add_argument(
+        "--empty", type=int, default=0, help="empty form types per project"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="api response time in sec (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--render-delay",
+        type=float,
+        default=0.1,
+        help="time in sec the app takes to render data (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--export-time",
+        type=float,
+        default=0.01,
+        help="time in sec to generate the pdf of a form (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--ui-fail-rate",
+        type=float,
+        default=0.0,
+        help="chance an export menu click does nothing (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--download-fail-rate",
+        type=float,
+        default=0.0,
+        help="chance a pdf export download fails (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pdf-kb", type=int, default=20, help="size of each pdf (default: %(default)s)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="(default: %(default)s)")
+
+
+def create_app(args):
+    """Create the mock app from the parsed command line arguments"""
+    return MockO1(
+        projects=args.projects,
+        form_types=args.form_types,
+        forms=[int(forms) for forms in re.split(r"[,\s]+", args.forms) if forms],
+        archived=args.archived,
+        empty=args.empty,
+        latency=args.latency,
+        render_delay=args.render_delay,
+        export_time=args.export_time,
+        ui_fail_rate=args.ui_fail_rate,
+        download_fail_rate=args.download_fail_rate,
+        pdf_kb=args.pdf_kb,
+        seed=args.seed,
+    )
+
+
+def main():
+    args = parse_args()
+    app = create_app(args)
+    server = start_server(app, args.port)
+    base_url = "http://127.0.0.1:{}".format(server.server_port)
+    print("Mock O1 running on {}".format(base_url))
+    for project_id in app.projects:
+        print("{}/{}/".format(base_url, project_id))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Fixtures of the unit tests, the export script is loaded as a module with the
+settings of 'sample.env'
+"""
+import importlib.util
+import os
+
+import pytest
+from dotenv import load_dotenv
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_FILE = os.path.join(SCRIPT_DIR, "O1-Selenium-Export-Script.py")
+
+
+@pytest.fixture(scope="session")
+def export(tmp_path_factory):
+    """The export script module"""
+    load_dotenv(os.path.join(SCRIPT_DIR, "sample.env"))
+    # output folders and the log file are made in the working folder
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("run"))
+    try:
+        spec = importlib.util.spec_from_file_location("export_script", SCRIPT_FILE)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+    return module
+
+
+@pytest.fixture
+def store(export, tmp_path, monkeypatch):
+    """Empty export state, used as the script's export state"""
+    monkeypatch.setattr(export, "OUTPUT_PATH", str(tmp_path / "output"))
+    os.makedirs(export.OUTPUT_PATH)
+    state_store = export.ExportStateStore(str(tmp_path / "export_state.db"))
+    state_store.open()
+    monkeypatch.setattr(export, "STATE_STORE", state_store)
+    yield state_store
+    state_store.close()
+
+
+@pytest.fixture
+def write_output(export):
+    """Write a file relative to the output folder, returns its path"""
+
+    def write(rel_path, content=b"%PDF-1.4\n%%EOF\n"):
+        file_path = os.path.join(export.OUTPUT_PATH, rel_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(content)
+        return file_path
+
+    return write
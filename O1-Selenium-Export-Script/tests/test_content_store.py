@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def content_store(export, store, tmp_path):
+    content_store = export.ContentStore(
+        str(tmp_path / "store"), str(tmp_path / "snapshots")
+    )
+    content_store.enabled = True
+    return content_store
+
+
+def test_same_content_stored_once(content_store, write_output):
+    first = write_output("Proj/A/Form-1.pdf", b"same")
+    second = write_output("Proj/B/Form-1.pdf", b"same")
+    other = write_output("Proj/B/Form-2.pdf", b"other")
+    for file_path in (first, second, other):
+        content_store.add(file_path)
+    assert os.path.samefile(first, second)
+    assert not os.path.samefile(first, other)
+    assert content_store.stats == {"stored": 2, "linked": 1, "saved": 4}
+    with open(second, "rb") as f:
+        assert f.read() == b"same"
+
+
+def test_add_again_is_a_no_op(content_store, write_output):
+    file_path = write_output("Proj/A/Form-1.pdf", b"same")
+    content_store.add(file_path)
+    content_store.add(file_path)
+    assert content_store.stats == {"stored": 1, "linked": 0, "saved": 0}
+
+
+def test_disabled_store_leaves_files(content_store, write_output):
+    content_store.enabled = False
+    first = write_output("Proj/A/Form-1.pdf", b"same")
+    second = write_output("Proj/B/Form-1.pdf", b"same")
+    content_store.add(first)
+    content_store.add(second)
+    assert not os.path.samefile(first, second)
+
+
+def test_snapshot_links_project_files(export, content_store, write_output):
+    file_path = write_output("Proj/A/Form-1.pdf", b"same")
+    content_store.snapshot(["Proj"])
+    snapshot_file = os.path.join(
+        content_store.snapshot_dir, content_store.run_name, "Proj", "A", "Form-1.pdf"
+    )
+    assert os.path.samefile(file_path, snapshot_file)
+    # files not in the store yet are stored first
+    assert content_store.stats["stored"] == 1
@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def metrics(export):
+    metrics = export.Metrics()
+    metrics.enabled = True
+    return metrics
+
+
+def test_counters_rendered(metrics):
+    metrics.inc("projects_done")
+    metrics.inc("projects_done")
+    metrics.inc("retries", step="pdf")
+    text = metrics.render_prometheus(metrics.snapshot())
+    assert "# TYPE o1_export_projects_done_total counter\n" in text
+    assert "\no1_export_projects_done_total 2\n" in text
+    assert "\no1_export_projects_failed_total 0\n" in text
+    assert '\no1_export_retries_total{step="pdf"} 1\n' in text
+    assert text.endswith("\n")
+
+
+def test_counters_off_until_enabled(export):
+    metrics = export.Metrics()
+    metrics.inc("projects_done")
+    assert metrics.snapshot()["projects_done"] == 0
+
+
+def test_worker_labels_escaped(metrics):
+    metrics.set_status(project='Proj "1"\\a', form_type="Form\nType", page=3)
+    text = metrics.render_prometheus(metrics.snapshot())
+    assert 'project="Proj \\"1\\"\\\\a",form_type="Form\\nType"} 3\n' in text
+
+
+def test_eta_unknown_without_rate(metrics):
+    metrics.set_projects_total(2)
+    metrics.set_form_total("Proj", "Form", 100)
+    text = metrics.render_prometheus(metrics.snapshot())
+    assert "\no1_export_eta_seconds NaN\n" in text
+    assert "\no1_export_projects 2\n" in text
+    assert "\no1_export_forms 100\n" in text
+
+
+def test_queue_depth_read_on_render(metrics):
+    depth = [3]
+    metrics.add_queue("downloads", lambda: depth[0])
+    assert '\no1_export_queue_depth{queue="downloads"} 3\n' in (
+        metrics.render_prometheus(metrics.snapshot())
+    )
+    depth[0] = 0
+    assert '\no1_export_queue_depth{queue="downloads"} 0\n' in (
+        metrics.render_prometheus(metrics.snapshot())
+    )
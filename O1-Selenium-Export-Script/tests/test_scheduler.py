@@ -0,0 +1,74 @@
+import pytest
+
+
+def record_project(store, project_url, duration, forms):
+    """Record a full export of a project with one form type of forms"""
+    proj_name = project_url.split("/")[-2]
+    store.set_project_started(project_url, proj_name)
+    store.set_form_type_started(proj_name, "Form", forms)
+    store.set_project_done(project_url, duration)
+
+
+@pytest.fixture
+def scheduler(export, store):
+    return export.ProjectScheduler()
+
+
+def test_no_history_keeps_order(scheduler):
+    project_urls = ["https://host/a/home", "https://host/b/home"]
+    assert scheduler.schedule(project_urls, workers=2) == project_urls
+
+
+def test_longest_first_with_workers(scheduler, store):
+    record_project(store, "https://host/short/home", 10.0, 10)
+    record_project(store, "https://host/long/home", 100.0, 100)
+    record_project(store, "https://host/middle/home", 50.0, 50)
+    project_urls = [
+        "https://host/short/home",
+        "https://host/long/home",
+        "https://host/middle/home",
+    ]
+    assert scheduler.schedule(project_urls, workers=2) == [
+        "https://host/long/home",
+        "https://host/middle/home",
+        "https://host/short/home",
+    ]
+    # a single browser exports in file order either way
+    assert scheduler.schedule(project_urls, workers=1) == project_urls
+    scheduler.enabled = False
+    assert scheduler.schedule(project_urls, workers=2) == project_urls
+
+
+def test_estimate_of_new_project_is_median_of_run(scheduler, store):
+    record_project(store, "https://host/a/home", 10.0, 10)
+    record_project(store, "https://host/b/home", 30.0, 30)
+    record_project(store, "https://host/c/home", 20.0, 20)
+    project_urls = [
+        "https://host/a/home",
+        "https://host/b/home",
+        "https://host/c/home",
+        "https://host/new/home",
+    ]
+    assert scheduler.estimate(project_urls)["https://host/new/home"] == 20.0
+
+
+def test_estimate_scaled_by_indexed_forms(scheduler, store):
+    record_project(store, "https://host/a/home", 10.0, 10)
+    store.set_indexed_project(
+        "https://host/a/home",
+        "a",
+        "a",
+        False,
+        [{"name": "Form", "state": "active", "total_forms": 30}],
+        0,
+    )
+    assert scheduler.estimate(["https://host/a/home"]) == {"https://host/a/home": 30.0}
+
+
+def test_makespan(export):
+    makespan = export.ProjectScheduler.makespan
+    assert makespan([4.0, 3.0, 3.0], 2) == 6.0
+    # longest first finishes the workers together
+    assert makespan([1.0, 1.0, 4.0], 2) == 5.0
+    assert makespan([4.0, 1.0, 1.0], 2) == 4.0
+    assert makespan([], 4) == 0.0
@@ -0,0 +1,119 @@
+import os
+import threading
+
+EXCEL_FILE = "Proj/Form/Form.xlsx"
+PDF_FILES = ["Proj/Form/Form-1.pdf", "Proj/Form/Form-2.pdf"]
+
+
+def record_form_type(store, files=PDF_FILES):
+    """Record the form type Form of Proj as exported in one page of 2 forms"""
+    store.set_form_type_started("Proj", "Form", 2)
+    store.set_excel_done("Proj", "Form", EXCEL_FILE)
+    store.set_page_done("Proj", "Form", 1, 1, 2, files)
+    store.set_pdfs_done("Proj", "Form")
+
+
+def write_files(write_output):
+    write_output(EXCEL_FILE, b"xlsx")
+    for file in PDF_FILES:
+        write_output(file)
+
+
+def test_resume_off_by_default(store):
+    assert store.resume is False
+    assert store.get_resume_since() is None
+
+
+def test_resume_returns_done_work_with_files_on_disk(export, store, write_output):
+    write_files(write_output)
+    record_form_type(store)
+    store.resume = True
+    assert store.get_done_page("Proj", "Form", 1, 1) == 2
+    assert store.get_done_form_type("Proj", "Form") == 2
+    # a page recorded with another number of pages isn't the same page
+    assert store.get_done_page("Proj", "Form", 1, 2) is None
+    os.remove(os.path.join(export.OUTPUT_PATH, PDF_FILES[0]))
+    assert store.get_done_page("Proj", "Form", 1, 1) is None
+    assert store.get_done_form_type("Proj", "Form") is None
+
+
+def test_resume_from_skips_only_work_recorded_since(export, store, write_output):
+    write_files(write_output)
+    started_at = export.time.time()
+    record_form_type(store)
+    store.resume_from(started_at + 60)
+    assert store.resume is True
+    assert store.get_done_form_type("Proj", "Form") is None
+    store.resume_from(started_at)
+    assert store.get_done_form_type("Proj", "Form") == 2
+    store.resume_from(None)
+    assert store.resume is False
+
+
+def test_resume_from_is_per_thread(store):
+    store.resume_from(100.0)
+    since = []
+    thread = threading.Thread(target=lambda: since.append(store.get_resume_since()))
+    thread.start()
+    thread.join()
+    assert since == [None]
+    assert store.get_resume_since() == 100.0
+
+
+def test_done_form_type_ignores_pages_recorded_before_since(
+    export, store, write_output, monkeypatch
+):
+    write_files(write_output)
+    # page of an earlier export with another page size, its file is gone
+    monkeypatch.setattr(export.time, "time", lambda: 100.0)
+    store.set_form_type_started("Proj", "Form", 2)
+    store.set_page_done("Proj", "Form", 2, 2, 1, ["Proj/Form/Gone.pdf"])
+    monkeypatch.setattr(export.time, "time", lambda: 200.0)
+    record_form_type(store)
+    assert store.get_done_form_type("Proj", "Form", since=150.0) == 2
+    assert store.get_done_form_type("Proj", "Form", since=0) is None
+
+
+def test_form_type_started_again_is_exported_again(store, write_output):
+    write_files(write_output)
+    record_form_type(store)
+    store.set_form_type_started("Proj", "Form", 2)
+    assert store.is_excel_done("Proj", "Form") is False
+    assert store.get_done_form_type("Proj", "Form") is None
+
+
+def test_form_type_started_again_keeps_done_work_when_resuming(store, write_output):
+    write_files(write_output)
+    record_form_type(store)
+    store.resume = True
+    store.set_form_type_started("Proj", "Form", 2)
+    assert store.get_done_form_type("Proj", "Form") == 2
+
+
+def test_form_type_without_forms_is_done_without_excel_file(store):
+    store.set_form_type_started("Proj", "Empty", 0)
+    store.set_excel_done("Proj", "Empty", None)
+    store.set_pdfs_done("Proj", "Empty")
+    store.resume = True
+    assert store.get_done_form_type("Proj", "Empty") == 0
+
+
+def test_project_done_needs_its_form_types_on_disk(export, store, write_output):
+    write_files(write_output)
+    store.set_project_started("https://host/p1/home", "Proj")
+    record_form_type(store)
+    store.set_project_done("https://host/p1/home", 60.0)
+    store.resume = True
+    assert store.is_project_done("https://host/p1/home") is True
+    os.remove(os.path.join(export.OUTPUT_PATH, EXCEL_FILE))
+    assert store.is_project_done("https://host/p1/home") is False
+
+
+def test_resume_all_restores_run_settings(store):
+    store.resume_since = 50.0
+    store.incremental = True
+    with store.resume_all():
+        assert store.get_resume_since() == 0
+        assert store.incremental is False
+    assert store.get_resume_since() == 50.0
+    assert store.incremental is True
@@ -0,0 +1,72 @@
+import pytest
+
+
+@pytest.fixture
+def timeouts(export):
+    timeouts = export.AdaptiveTimeouts()
+    timeouts.enabled = True
+    return timeouts
+
+
+def observe(export, timeouts, operation, seconds):
+    for _ in range(export.ADAPTIVE_TIMEOUT_MIN_SAMPLES):
+        timeouts.observe(operation, seconds)
+
+
+def test_fixed_timeout_until_enough_samples(export, timeouts):
+    timeouts.observe("wait:1", 1.0)
+    assert timeouts.percentile("wait:1") is None
+    assert timeouts.timeout("wait:1", 30) == 30
+
+
+def test_learned_timeout_from_samples(export, timeouts):
+    observe(export, timeouts, "wait:1", 4.0)
+    assert timeouts.percentile("wait:1") == 4.0
+    assert timeouts.timeout("wait:1", 30) == max(
+        4.0 * export.ADAPTIVE_TIMEOUT_FACTOR, export.ADAPTIVE_TIMEOUT_MIN
+    )
+    # not learned unless enabled, the samples are still kept
+    timeouts.enabled = False
+    assert timeouts.timeout("wait:1", 30) == 30
+
+
+def test_learned_timeout_within_bounds(export, timeouts):
+    observe(export, timeouts, "fast:1", 0.01)
+    assert timeouts.timeout("fast:1", 30) == export.ADAPTIVE_TIMEOUT_MIN
+    observe(export, timeouts, "slow:1", 1000.0)
+    assert timeouts.timeout("slow:1", 30) == 30 * export.ADAPTIVE_TIMEOUT_MAX_SCALE
+
+
+def test_percentile_is_nearest_rank(export, timeouts):
+    samples = list(range(1, export.ADAPTIVE_TIMEOUT_MIN_SAMPLES + 1))
+    for seconds in samples:
+        timeouts.observe("wait:1", float(seconds))
+    assert timeouts.percentile("wait:1", pct=50) == samples[len(samples) // 2 - 1]
+    assert timeouts.percentile("wait:1") == samples[-1]
+
+
+def test_timed_out_at_learned_timeout_falls_back_to_fixed(export, timeouts):
+    observe(export, timeouts, "wait:1", 1.0)
+    learned = timeouts.timeout("wait:1", 30)
+    assert learned < 30
+    timeouts.timed_out("wait:1", learned)
+    assert timeouts.timeout("wait:1", 30) == 30
+
+
+def test_timed_out_at_fixed_timeout_keeps_learning(export, timeouts):
+    observe(export, timeouts, "wait:1", 1.0)
+    timeouts.timeout("wait:1", 5)
+    timeouts.timed_out("wait:1", 5)
+    assert "wait:1" not in timeouts.fallbacks
+
+
+def test_download_timeouts_scale_with_forms(export, timeouts):
+    assert timeouts.download_timeouts("pdf", "Form", 10) == (
+        export.DOWNLOAD_TIMEOUT,
+        export.DOWNLOAD_START_TIMEOUT,
+    )
+    for _ in range(export.ADAPTIVE_TIMEOUT_MIN_SAMPLES):
+        timeouts.observe_download("pdf", "Form", 10, 10.0, 30.0)
+    timeout, start_timeout = timeouts.download_timeouts("pdf", "Form", 100)
+    assert start_timeout == timeouts.learned(100.0, export.DOWNLOAD_START_TIMEOUT)
+    assert timeout == timeouts.learned(300.0, export.DOWNLOAD_TIMEOUT)
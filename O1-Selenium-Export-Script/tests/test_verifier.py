@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+PROJECT_URL = "https://host/p1/home"
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+@pytest.fixture
+def exported(export, store, write_output):
+    """Proj with form types A (2 forms, one page) and B (1 form), on disk"""
+    store.set_project_started(PROJECT_URL, "Proj")
+    for form_type, forms in (("A", 2), ("B", 1)):
+        files = ["Proj/{}/Form-{}.pdf".format(form_type, n) for n in range(forms)]
+        excel_file = "Proj/{}/{}.xlsx".format(form_type, form_type)
+        store.set_form_type_started("Proj", form_type, forms)
+        write_output(excel_file, b"xlsx")
+        store.set_excel_done("Proj", form_type, excel_file)
+        for file in files:
+            write_output(file, PDF)
+        store.set_page_done("Proj", form_type, 1, 1, forms, files)
+        store.set_pdfs_done("Proj", form_type)
+        store.add_manifest(
+            "Proj",
+            form_type,
+            [
+                (file,) + export.hash_file(os.path.join(export.OUTPUT_PATH, file))
+                for file in files
+            ],
+        )
+    return store
+
+
+def get_job(store, form_type):
+    jobs = {job["form_type"]: job for job in store.get_verify_jobs(PROJECT_URL)}
+    job = jobs[form_type]
+    # the excel file isn't a real xlsx, only the pdfs are checked
+    job["excel_file"] = None
+    return job
+
+
+def test_manifest_of_job_has_only_its_form_type(exported):
+    jobs = {job["form_type"]: job for job in exported.get_verify_jobs(PROJECT_URL)}
+    assert set(jobs) == {"A", "B"}
+    assert set(jobs["A"]["manifest"]) == {"Proj/A/Form-0.pdf", "Proj/A/Form-1.pdf"}
+    assert set(jobs["B"]["manifest"]) == {"Proj/B/Form-0.pdf"}
+
+
+def test_unknown_project_has_no_jobs(exported):
+    assert exported.get_verify_jobs("https://host/other/home") == []
+
+
+def test_exported_files_pass(export, exported):
+    result = export.verify_form_type(get_job(exported, "A"))
+    assert result["excel_error"] is None
+    assert result["page_errors"] == {}
+    assert result["pdfs"] == 2
+
+
+def test_changed_file_fails_checksum(export, exported, write_output):
+    write_output("Proj/A/Form-1.pdf", PDF.replace(b"1.4", b"1.5"))
+    result = export.verify_form_type(get_job(exported, "A"))
+    assert result["page_errors"] == {1: "Proj/A/Form-1.pdf: Checksum mismatch"}
+
+
+def test_fewer_pdfs_than_forms_fails_page(export, exported):
+    job = get_job(exported, "A")
+    job["pages"][0]["files"] = ["Proj/A/Form-1.pdf"]
+    job["count_pdfs"] = True
+    result = export.verify_form_type(job)
+    assert result["page_errors"] == {1: "1 of 2 PDFs"}
+
+
+def test_pdfs_not_counted_with_attachments(export, exported):
+    job = get_job(exported, "A")
+    job["pages"][0]["files"] = ["Proj/A/Form-1.pdf"]
+    job["count_pdfs"] = False
+    assert export.verify_form_type(job)["page_errors"] == {}
+
+
+def test_missing_pdf_fails_page(export, exported):
+    os.remove(os.path.join(export.OUTPUT_PATH, "Proj/A/Form-0.pdf"))
+    result = export.verify_form_type(get_job(exported, "A"))
+    assert result["page_errors"] == {1: "Proj/A/Form-0.pdf: Missing"}
+
+
+def test_form_type_without_pages_is_not_exported(export, exported):
+    job = get_job(exported, "A")
+    job["pages"] = []
+    assert export.verify_form_type(job)["page_errors"] == {1: "Not exported"}